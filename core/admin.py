@@ -1,3 +1,38 @@
 from django.contrib import admin
+from .lookups import users_of
+from .models import ChangeRecord, ImportJob, KpiCounter, Lookup
 
-# Register your models here.
+
+@admin.register(ImportJob)
+class ImportJobAdmin(admin.ModelAdmin):
+    list_display = ('id', 'kind', 'status', 'file_name', 'processed_rows', 'created_count', 'error_count', 'created_by', 'created_at')
+    list_filter = ('kind', 'status')
+    search_fields = ('file_name', 'created_by__username')
+    readonly_fields = ('error_records',)
+
+
+@admin.register(KpiCounter)
+class KpiCounterAdmin(admin.ModelAdmin):
+    list_display = ('model_label', 'dimension', 'value', 'count')
+    list_filter = ('model_label', 'dimension')
+
+
+@admin.register(ChangeRecord)
+class ChangeRecordAdmin(admin.ModelAdmin):
+    list_display = ('changed_at', 'model_label', 'object_pk', 'action', 'user')
+    list_filter = ('model_label', 'action')
+    search_fields = ('object_pk', 'user__username')
+    readonly_fields = ('model_label', 'object_pk', 'action', 'changes', 'user', 'changed_at')
+    list_select_related = ('user',)
+
+
+@admin.register(Lookup)
+class LookupAdmin(admin.ModelAdmin):
+    list_display = ('kind', 'name', 'id')
+    list_filter = ('kind',)
+    search_fields = ('name',)
+
+    def has_delete_permission(self, request, obj=None):
+        # Records keep the id without a foreign key: only unused values can go,
+        # one at a time (see core.lookups.users_of)
+        return obj is not None and not users_of(obj) and super().has_delete_permission(request, obj)
@@ -0,0 +1,257 @@
+"""
+Lightweight JSON API shared by the materials and suppliers apps.
+
+A resource describes a model the same way the CSV importers do (model,
+form_class, unique_field) plus the permission module and the filters of
+its list view:
+
+    class MaterialResource(ApiResource):
+        model = Material
+        form_class = MaterialForm
+        unique_field = 'id_material'
+        module = 'materials'
+
+Reads serialize straight from values_list(), so no model instances are
+built; lookup fields (core.lookups) are returned by name. ?fields=a,b
+selects a sparse fieldset and pages are keyset based: ?after=<id>&limit=<n>,
+with the URL of the next page in `next`. Writes take lookup values by name
+or id.
+
+Batch writes take {"records": [...]} and validate every record with
+core.validation.RowValidator before a single bulk_create() (POST) or
+bulk_update() (PATCH, records matched by `unique_field`). Valid records
+are written even when others fail; failures are reported by index.
+
+Endpoints use the session of a logged-in user, so writes need the CSRF
+token in an X-CSRFToken header like any other POST.
+"""
+
+import json
+from functools import wraps
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.http import JsonResponse
+from django.utils import timezone
+
+from users.permissions import get_module_permission
+from .lookups import display_function
+from .signals import bulk_created, bulk_updated
+from .validation import RowValidator
+
+
+class ApiError(Exception):
+    """Error returned to the client as {"error": message} with `status`."""
+
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.message = message
+        self.status = status
+
+
+def api_view(module):
+    """
+    Decorator for API views of a permission module.
+
+    Anonymous users get 401 instead of the login redirect, users without
+    read access to `module` get 403, and ApiError becomes a JSON response.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if not request.user.is_authenticated:
+                return JsonResponse({'error': 'Authentication required.'}, status=401)
+            if get_module_permission(request, module) < 1:
+                return JsonResponse({'error': 'Permission denied.'}, status=403)
+            try:
+                return view(request, *args, **kwargs)
+            except ApiError as exc:
+                return JsonResponse({'error': exc.message}, status=exc.status)
+        return wrapper
+    return decorator
+
+
+def _int_param(params, name, default):
+    value = params.get(name)
+    if value in (None, ''):
+        return default
+    try:
+        return int(value)
+    except ValueError:
+        raise ApiError(f"'{name}' must be an integer.")
+
+
+class ApiResource:
+    """
+    Base class for API resources.
+
+    Attributes:
+        model: Model exposed by the resource
+        form_class: ModelForm whose fields are the writable fields
+        unique_field: Natural key matching records in batch updates
+        module: Permission module checked for reads (1) and writes (2)
+        lookups: Read-only fields and the lookups that read them
+    """
+
+    model = None
+    form_class = None
+    unique_field = None
+    module = None
+    lookups = {
+        'created_by': 'created_by__username',
+        'created_at': 'created_at',
+        'updated_at': 'updated_at',
+    }
+
+    def __init__(self):
+        self.fields = list(self.form_class._meta.fields)
+        self.readable = {'id': 'pk'}
+        self.readable.update({name: name for name in self.fields})
+        self.readable.update(self.lookups)
+
+    def filter(self, queryset, params):
+        """Apply the list view filters in `params`; override per resource."""
+        return queryset
+
+    # Reads
+
+    def selected_fields(self, value):
+        if not value:
+            return list(self.readable)
+        fields = [name.strip() for name in value.split(',') if name.strip()]
+        unknown = [name for name in fields if name not in self.readable]
+        if unknown:
+            raise ApiError(f"Unknown fields: {', '.join(unknown)}.")
+        return fields
+
+    def list(self, request):
+        """Return one keyset page of records as JSON."""
+        params = request.GET
+        fields = self.selected_fields(params.get('fields'))
+        default_limit = getattr(settings, 'API_PAGE_SIZE', 100)
+        limit = min(max(_int_param(params, 'limit', default_limit), 1), getattr(settings, 'API_MAX_PAGE_SIZE', 1000))
+        after = _int_param(params, 'after', None)
+
+        queryset = self.filter(self.model.objects.all(), params)
+        if after is not None:
+            queryset = queryset.filter(pk__gt=after)
+        rows = list(
+            queryset.order_by('pk').values_list('pk', *[self.readable[name] for name in fields])[:limit + 1]
+        )
+        has_next = len(rows) > limit
+        rows = rows[:limit]
+        # Lookup fields are read as ids and returned as names (see core.lookups)
+        converters = [display_function(self.model, self.readable[name]) for name in fields]
+        if any(converters):
+            rows = [
+                (row[0], *(convert(value) if convert else value for value, convert in zip(row[1:], converters)))
+                for row in rows
+            ]
+
+        next_url = None
+        if has_next:
+            query = params.copy()
+            query['after'] = rows[-1][0]
+            next_url = request.build_absolute_uri(f'{request.path}?{query.urlencode()}')
+        return JsonResponse({
+            'results': [dict(zip(fields, row[1:])) for row in rows],
+            'next': next_url,
+        })
+
+    # Writes
+
+    def read_records(self, request):
+        if get_module_permission(request, self.module) < 2:
+            raise ApiError('Permission denied.', status=403)
+        try:
+            payload = json.loads(request.body)
+        except ValueError:
+            raise ApiError('Request body must be JSON.')
+        records = payload.get('records') if isinstance(payload, dict) else None
+        if not isinstance(records, list) or not all(isinstance(record, dict) for record in records):
+            raise ApiError("Expected {\"records\": [...]} with one object per record.")
+        limit = getattr(settings, 'API_BATCH_LIMIT', 2000)
+        if len(records) > limit:
+            raise ApiError(f'At most {limit} records per request.')
+        return records
+
+    def unknown_fields(self, record):
+        return {name: 'Unknown field.' for name in record if name not in self.fields}
+
+    def batch_size(self):
+        return getattr(settings, 'IMPORT_BATCH_SIZE', 1000)
+
+    def create(self, request):
+        """Insert valid records with bulk_create() and report the others."""
+        records = self.read_records(request)
+        errors = []
+        instances = []
+        results = RowValidator(self.model, self.fields).validate(records)
+        for index, (record, (cleaned, row_errors)) in enumerate(zip(records, results)):
+            row_errors = {**self.unknown_fields(record), **row_errors}
+            if row_errors:
+                errors.append({'index': index, 'errors': row_errors})
+            else:
+                instances.append(self.model(**cleaned, created_by=request.user))
+
+        if instances:
+            try:
+                with transaction.atomic():
+                    self.model.objects.bulk_create(instances, batch_size=self.batch_size())
+            except IntegrityError as exc:
+                raise ApiError(str(exc), status=409)
+            bulk_created.send(sender=self.model, instances=instances)
+        return JsonResponse({'created': len(instances), 'errors': errors}, status=201 if instances else 400)
+
+    def update(self, request):
+        """Update records matched by `unique_field` with bulk_update()."""
+        records = self.read_records(request)
+        key = self.unique_field
+        keys = [str(record[key]) for record in records if record.get(key) not in (None, '')]
+        stored = {
+            values[key]: values
+            for values in self.model.objects.filter(**{f'{key}__in': keys}).values('pk', *self.fields)
+        }
+
+        errors = []
+        rows = []
+        for index, record in enumerate(records):
+            current = stored.get(str(record.get(key)))
+            if current is None:
+                errors.append({'index': index, 'errors': {key: 'Not found.'}})
+                continue
+            unknown = self.unknown_fields(record)
+            if unknown:
+                errors.append({'index': index, 'errors': unknown})
+                continue
+            # Fields missing from the record keep their stored value
+            rows.append((index, current, {**{name: current[name] for name in self.fields}, **record}))
+
+        validator = RowValidator(self.model, self.fields, unique_fields=[key])
+        results = validator.validate([row for _, _, row in rows], check_existing=False)
+        now = timezone.now()
+        instances, changes, unchanged = [], [], 0
+        update_fields = set()
+        for (index, current, _), (cleaned, row_errors) in zip(rows, results):
+            if row_errors:
+                errors.append({'index': index, 'errors': row_errors})
+                continue
+            changed = [name for name in self.fields if current[name] != cleaned[name]]
+            if not changed:
+                unchanged += 1
+                continue
+            update_fields.update(changed)
+            instances.append(self.model(pk=current['pk'], updated_at=now, **cleaned))
+            changes.append((current, cleaned))
+
+        if instances:
+            try:
+                with transaction.atomic():
+                    self.model.objects.bulk_update(
+                        instances, sorted(update_fields) + ['updated_at'], batch_size=self.batch_size()
+                    )
+            except IntegrityError as exc:
+                raise ApiError(str(exc), status=409)
+            bulk_updated.send(sender=self.model, changes=changes)
+        errors.sort(key=lambda error: error['index'])
+        return JsonResponse({'updated': len(instances), 'unchanged': unchanged, 'errors': errors})
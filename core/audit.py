@@ -0,0 +1,377 @@
+"""
+Field-level change history (core.models.ChangeRecord).
+
+Tracked models record who created, updated or deleted a row and, for
+updates and deletes, the old and new value of every field that changed:
+
+- post_save and post_delete turn a single save into a record, diffing an
+  update against the stored values read by core.snapshots;
+- core.signals.bulk_created / bulk_updated produce the records of bulk
+  writes (imports, the JSON API);
+- core.signals.soft_deleted / restored those of soft deletes and undos.
+
+Records are built once the transaction commits and handed to an
+AuditBuffer instead of being inserted by the request or import job that
+made the change: a bounded in-process queue that a background thread drains
+with one bulk_create() per AUDIT_BATCH_SIZE records. A full queue makes the
+writer of the change (a large import, say) wait for room. Only when the
+database write fails, or the writer thread is gone or stuck for
+AUDIT_PUT_TIMEOUT seconds, are records appended as JSON lines to
+AUDIT_FALLBACK_FILE; `manage.py replay_audit_log` loads them later.
+
+The user is taken from the request (AuditMiddleware) or, in import jobs,
+from the job (acting_as()). Models are registered from their
+AppConfig.ready():
+
+    track_changes(Material)
+"""
+
+import atexit
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from pathlib import Path
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import DatabaseError, close_old_connections, transaction
+from django.db.models.signals import post_delete, post_save
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .models import ChangeRecord
+from .signals import bulk_created, bulk_updated, restored, soft_deleted
+from .snapshots import previous_values, watch
+
+logger = logging.getLogger(__name__)
+
+_tracked = {}
+_actor = ContextVar('audit_actor', default=None)
+
+
+# Who makes the changes
+
+@contextmanager
+def acting_as(user):
+    """Attribute the changes made inside the block to `user`."""
+    token = _actor.set(lambda: user)
+    try:
+        yield
+    finally:
+        _actor.reset(token)
+
+
+@contextmanager
+def request_actor(request):
+    """Attribute the changes made inside the block to the user of `request`, read when a change is recorded."""
+    token = _actor.set(lambda: request.user)
+    try:
+        yield
+    finally:
+        _actor.reset(token)
+
+
+def _actor_id():
+    get_user = _actor.get()
+    user = get_user() if get_user is not None else None
+    if user is None or not user.is_authenticated:
+        return None
+    return user.pk
+
+
+# Buffered writes
+
+def _fallback_path():
+    return Path(getattr(settings, 'AUDIT_FALLBACK_FILE', settings.BASE_DIR / 'var' / 'audit' / 'fallback.jsonl'))
+
+
+def spill(records, path=None):
+    """Append records to the fallback file as JSON lines."""
+    path = Path(path or _fallback_path())
+    path.parent.mkdir(parents=True, exist_ok=True)
+    # isoformat() keeps the microseconds that DjangoJSONEncoder drops
+    lines = ''.join(
+        json.dumps(dict(record, changed_at=record['changed_at'].isoformat()), cls=DjangoJSONEncoder) + '\n'
+        for record in records
+    )
+    with open(path, 'a', encoding='utf-8') as fallback:
+        fallback.write(lines)
+        fallback.flush()
+        os.fsync(fallback.fileno())
+
+
+def write(records):
+    """Insert records in one bulk_create(); on failure spill them to the fallback file."""
+    try:
+        ChangeRecord.objects.bulk_create([ChangeRecord(**record) for record in records])
+    except DatabaseError:
+        logger.exception('Writing %s change records failed; spilling them to %s', len(records), _fallback_path())
+        spill(records)
+
+
+class AuditBuffer:
+    """
+    Bounded queue of change records drained by a background thread.
+
+    Args:
+        maxsize: Records held in memory; put() waits for room beyond that
+        batch_size: Records written per bulk_create()
+        interval: Seconds a partial batch waits for more records
+        put_timeout: Seconds put() waits for the writer to free a slot
+            before spilling the rest to the fallback file
+    """
+
+    def __init__(self, maxsize=10000, batch_size=500, interval=1.0, put_timeout=10.0):
+        self.queue = queue.Queue(maxsize)
+        self.batch_size = batch_size
+        self.interval = interval
+        self.put_timeout = put_timeout
+        self._thread = None
+        self._lock = threading.Lock()
+        self._stopping = threading.Event()
+
+    def put(self, records):
+        """Queue records, waiting for room while the writer thread drains the queue."""
+        for index, record in enumerate(records):
+            try:
+                if self.writing():
+                    self.queue.put(record, timeout=self.put_timeout)
+                else:
+                    self.queue.put_nowait(record)
+            except queue.Full:
+                # No writer, or one stuck on the database: don't hold up the caller any longer
+                overflow = records[index:]
+                logger.warning('Audit queue full; spilling %s change records', len(overflow))
+                spill(overflow)
+                return
+
+    def writing(self):
+        """Whether the writer thread is running and draining the queue."""
+        return self._thread is not None and self._thread.is_alive() and not self._stopping.is_set()
+
+    def take(self, timeout=0):
+        """Return up to batch_size queued records, waiting at most `timeout` seconds for them."""
+        batch = []
+        deadline = time.monotonic() + timeout
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                batch.append(self.queue.get(timeout=remaining) if remaining > 0 else self.queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def flush(self):
+        """Write every queued record from the calling thread."""
+        while batch := self.take():
+            write(batch)
+
+    def start(self):
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='audit-writer', daemon=True)
+                self._thread.start()
+                atexit.register(self.stop)
+
+    def stop(self):
+        """Stop the writer thread and write what is left in the queue."""
+        self._stopping.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.interval * 2)
+        self.flush()
+
+    def _run(self):
+        while not self._stopping.is_set():
+            batch = self.take(self.interval)
+            if batch:
+                # A long-lived thread: drop connections that went stale between batches
+                close_old_connections()
+                write(batch)
+        close_old_connections()
+
+
+_buffer = None
+_buffer_lock = threading.Lock()
+
+
+def get_buffer():
+    global _buffer
+    if _buffer is None:
+        with _buffer_lock:
+            if _buffer is None:
+                _buffer = AuditBuffer(
+                    maxsize=getattr(settings, 'AUDIT_QUEUE_SIZE', 10000),
+                    batch_size=getattr(settings, 'AUDIT_BATCH_SIZE', 500),
+                    interval=getattr(settings, 'AUDIT_FLUSH_INTERVAL', 1.0),
+                    put_timeout=getattr(settings, 'AUDIT_PUT_TIMEOUT', 10.0),
+                )
+                _buffer.start()
+    return _buffer
+
+
+def submit(records):
+    """Queue records for writing once the current transaction commits."""
+    if not records:
+        return
+    if getattr(settings, 'AUDIT_EAGER', False):
+        transaction.on_commit(lambda: write(records))
+    else:
+        transaction.on_commit(lambda: get_buffer().put(records))
+
+
+def replay(path=None):
+    """
+    Insert the records of the fallback file and remove it.
+
+    The file is renamed first, so records spilled meanwhile start a new one.
+
+    Returns:
+        int: Number of records written
+    """
+    path = Path(path or _fallback_path())
+    if not path.exists():
+        return 0
+    replaying = path.with_suffix(path.suffix + '.replaying')
+    path.rename(replaying)
+    records = []
+    with open(replaying, encoding='utf-8') as fallback:
+        for line in fallback:
+            if line.strip():
+                record = json.loads(line)
+                record['changed_at'] = parse_datetime(record['changed_at'])
+                records.append(record)
+    batch_size = getattr(settings, 'AUDIT_BATCH_SIZE', 500)
+    with transaction.atomic():
+        ChangeRecord.objects.bulk_create(
+            [ChangeRecord(**record) for record in records], batch_size=batch_size
+        )
+    os.remove(replaying)
+    return len(records)
+
+
+# Capturing changes
+
+def _record(model, pk, action, changes, user_id, changed_at):
+    return {
+        'model_label': model._meta.label_lower,
+        'object_pk': str(pk),
+        'action': action,
+        'changes': changes,
+        'user_id': user_id,
+        'changed_at': changed_at,
+    }
+
+
+def _diff(fields, old, new):
+    # Bulk updates only carry the fields they write
+    return {field: [old.get(field), new[field]] for field in fields if field in new and old.get(field) != new[field]}
+
+
+def _instance_values(instance, fields):
+    return {field: getattr(instance, field) for field in fields}
+
+
+def _record_saved(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    fields = _tracked[sender]
+    previous = previous_values(instance)
+    if created or previous is None:
+        record = _record(sender, instance.pk, ChangeRecord.ACTION_CREATE, {}, _actor_id(), timezone.now())
+    else:
+        changes = _diff(fields, previous, _instance_values(instance, fields))
+        if not changes:
+            return
+        record = _record(sender, instance.pk, ChangeRecord.ACTION_UPDATE, changes, _actor_id(), timezone.now())
+    submit([record])
+
+
+def _deleted_changes(instance, fields):
+    return {field: [value, None] for field, value in _instance_values(instance, fields).items()}
+
+
+def _record_deleted(sender, instance, **kwargs):
+    # Purging a soft-deleted row: its deletion is already recorded
+    if getattr(instance, 'is_deleted', False):
+        return
+    changes = _deleted_changes(instance, _tracked[sender])
+    submit([_record(sender, instance.pk, ChangeRecord.ACTION_DELETE, changes, _actor_id(), timezone.now())])
+
+
+def _record_soft_deleted(sender, instances, **kwargs):
+    if sender not in _tracked:
+        return
+    fields = _tracked[sender]
+    user_id, now = _actor_id(), timezone.now()
+    submit([
+        _record(sender, instance.pk, ChangeRecord.ACTION_DELETE, _deleted_changes(instance, fields), user_id, now)
+        for instance in instances
+    ])
+
+
+def _record_restored(sender, instances, **kwargs):
+    if sender not in _tracked:
+        return
+    user_id, now = _actor_id(), timezone.now()
+    submit([
+        _record(sender, instance.pk, ChangeRecord.ACTION_UPDATE, {'is_deleted': [True, False]}, user_id, now)
+        for instance in instances
+    ])
+
+
+def _record_bulk_created(sender, instances, **kwargs):
+    if sender not in _tracked:
+        return
+    user_id, now = _actor_id(), timezone.now()
+    submit([
+        _record(sender, instance.pk, ChangeRecord.ACTION_CREATE, {}, user_id, now)
+        for instance in instances if instance.pk is not None
+    ])
+
+
+def _record_bulk_updated(sender, changes, **kwargs):
+    if sender not in _tracked:
+        return
+    fields = _tracked[sender]
+    user_id, now = _actor_id(), timezone.now()
+    records = []
+    for old, new in changes:
+        diff = _diff(fields, old, new)
+        if old.get('is_deleted'):
+            # An upsert restored a soft-deleted row
+            diff['is_deleted'] = [True, False]
+        records.append(_record(sender, old['pk'], ChangeRecord.ACTION_UPDATE, diff, user_id, now))
+    submit(records)
+
+
+def default_fields(model):
+    """Concrete editable fields of `model`, without the primary key and automatic timestamps."""
+    return [
+        field.attname for field in model._meta.concrete_fields
+        if not field.primary_key and field.editable and not getattr(field, 'auto_now', False)
+        and not getattr(field, 'auto_now_add', False)
+    ]
+
+
+def track_changes(model, fields=None):
+    """Record the history of `model`, diffing `fields` (default_fields() if omitted)."""
+    _tracked[model] = list(fields) if fields is not None else default_fields(model)
+    uid = f'audit-{model._meta.label_lower}'
+    watch(model, _tracked[model])
+    post_save.connect(_record_saved, sender=model, dispatch_uid=uid)
+    post_delete.connect(_record_deleted, sender=model, dispatch_uid=uid)
+    bulk_created.connect(_record_bulk_created, dispatch_uid='audit')
+    bulk_updated.connect(_record_bulk_updated, dispatch_uid='audit')
+    soft_deleted.connect(_record_soft_deleted, dispatch_uid='audit')
+    restored.connect(_record_restored, dispatch_uid='audit')
+
+
+def tracked_models():
+    return list(_tracked)
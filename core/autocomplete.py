@@ -0,0 +1,411 @@
+"""
+Typeahead for the search box of the navigation bar.
+
+Each registered model keeps an in-process prefix index: a sorted list of
+(term, pk) pairs, searched with bisect, so a lookup costs a binary search
+plus the matches returned whatever the size of the table, and no query.
+The terms of a row are its normalized (casefolded, whitespace collapsed)
+field values and the word suffixes of each ("acme steel corp", "steel
+corp", "corp"), so "steel" finds it too.
+
+Models are registered from their AppConfig.ready():
+
+    track_autocomplete(Material, ['id_material', 'name'], module='materials',
+                       list_url='materials:materials', edit_url='materials:material_edit')
+
+The first field is the record's code and, with the second, its label.
+
+An index is built on the first search of the process and then kept up to
+date by the model signals and core.signals, applied once the write
+commits. Every applied write also increments a per-model version in the
+default cache (an atomic incr): a process applies its own write only when
+the version moved by exactly one since its index was current, and
+otherwise rebuilds, so writes of other processes are never skipped. Idle
+processes notice those writes when a check, at most every
+AUTOCOMPLETE_CHECK_INTERVAL seconds, finds a newer version. Like
+core.generations, this needs a shared cache backend across processes.
+
+Memory is bounded by AUTOCOMPLETE_MAX_ROWS rows per model and
+AUTOCOMPLETE_TERM_LENGTH characters per term. A larger table is searched
+in the database through its trigram index (core.search.search_any()),
+which is slower than memory and degrades the suggestions: only its
+SEARCH_FIELDS are searched, terms need MIN_TERM_LENGTH characters, and
+matches are picked from a bounded set of candidates, so some may be
+missing.
+"""
+
+import threading
+import time
+from bisect import bisect_left, insort
+from functools import partial
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.urls import reverse
+
+from .search import search_any
+from .signals import bulk_created, bulk_updated, restored, soft_deleted
+
+# Word suffixes indexed per value, after the whole value
+MAX_WORDS = 3
+
+# Rows read per result wanted when a table too large for memory is searched in the database
+FALLBACK_CANDIDATES = 5
+
+# Writes of more rows are merged into the index in one pass (bulk imports)
+INSERT_BATCH_SIZE = 16
+
+_indexes = {}
+
+
+def _version_key(model):
+    return f'autocomplete:{model._meta.label_lower}'
+
+
+def get_version(model):
+    """Return the write version of `model`, starting one if needed."""
+    key = _version_key(model)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, 1, None)
+        version = cache.get(key, 1)
+    return version
+
+
+def bump_version(model):
+    """Count one write to `model`; return the new version, or None if it was lost (evicted)."""
+    try:
+        return cache.incr(_version_key(model))
+    except ValueError:
+        cache.add(_version_key(model), 1, None)
+        return None
+
+
+def _term_length():
+    return getattr(settings, 'AUTOCOMPLETE_TERM_LENGTH', 40)
+
+
+def normalize(value):
+    """Form of `value` stored in and searched against the index."""
+    return ' '.join(str(value).split()).casefold()[:_term_length()]
+
+
+def _terms(values):
+    terms = set()
+    for value in values:
+        if value is None:
+            continue
+        words = normalize(value).split(' ')
+        for start in range(min(len(words), MAX_WORDS + 1)):
+            term = ' '.join(words[start:])
+            if term:
+                terms.add(term)
+    return terms
+
+
+def _merged(entries, removed, added):
+    """
+    Return sorted `entries` without `removed` and with `added` (both sorted).
+
+    Positions are found with bisect and the runs between them copied as
+    slices, so a batch costs one copy of the list plus a binary search
+    per changed entry.
+    """
+    kept = []
+    start = 0
+    for entry in removed:
+        position = bisect_left(entries, entry, start)
+        kept.extend(entries[start:position])
+        start = position + 1 if position < len(entries) and entries[position] == entry else position
+    kept.extend(entries[start:])
+
+    result = []
+    start = 0
+    for entry in added:
+        position = bisect_left(kept, entry, start)
+        result.extend(kept[start:position])
+        result.append(entry)
+        start = position
+    result.extend(kept[start:])
+    return result
+
+
+class PrefixIndex:
+    """Sorted prefix index over `fields` of one model."""
+
+    def __init__(self, model, fields, module, list_url, edit_url=None):
+        self.model = model
+        self.fields = list(fields)
+        self.module = module
+        self.list_url = list_url
+        self.edit_url = edit_url
+        self.too_large = False
+        # Sorted (term, pk) pairs and {pk: (code, label, terms)}
+        self._entries = None
+        self._rows = {}
+        self._version = None
+        # Counts changes to _entries, so a merge computed outside the lock can tell it's still current
+        self._mutations = 0
+        self._checked = 0.0
+        self._lock = threading.Lock()
+        self._build_lock = threading.Lock()
+
+    def clear(self):
+        """Drop the index; the next search rebuilds it."""
+        with self._lock:
+            self._drop()
+            self.too_large = False
+
+    def _row(self, values):
+        code = values[0]
+        label = ' · '.join(str(value) for value in values[:2] if value not in (None, ''))
+        return code, label, _terms(values)
+
+    def build(self):
+        """Load every row of the model, unless there are more than AUTOCOMPLETE_MAX_ROWS."""
+        with self._build_lock:
+            # Read first: a write landing during the load moves it and triggers another rebuild
+            version = get_version(self.model)
+            max_rows = getattr(settings, 'AUTOCOMPLETE_MAX_ROWS', 200000)
+            rows = list(self.model.objects.values_list('pk', *self.fields)[:max_rows + 1])
+            if len(rows) > max_rows:
+                entries, rows_by_pk = None, {}
+            else:
+                rows_by_pk = {values[0]: self._row(values[1:]) for values in rows}
+                entries = sorted((term, pk) for pk, (_, _, terms) in rows_by_pk.items() for term in terms)
+            with self._lock:
+                self._entries = entries
+                self._rows = rows_by_pk
+                self.too_large = entries is None
+                self._version = version
+                self._mutations += 1
+                self._checked = time.monotonic()
+
+    def _refresh(self):
+        now = time.monotonic()
+        if self._entries is not None or self.too_large:
+            if now - self._checked < getattr(settings, 'AUTOCOMPLETE_CHECK_INTERVAL', 5.0):
+                return
+            self._checked = now
+            if get_version(self.model) == self._version:
+                return
+        self.build()
+
+    # Incremental updates
+
+    def _remove(self, pk):
+        row = self._rows.pop(pk, None)
+        if row is None:
+            return
+        for term in row[2]:
+            position = bisect_left(self._entries, (term, pk))
+            if position < len(self._entries) and self._entries[position] == (term, pk):
+                del self._entries[position]
+
+    def apply(self, updates, version):
+        """
+        Apply a committed write: [(pk, values or None to remove), ...].
+
+        `version` is the write version it produced; unless the index was
+        current just before it, another process wrote in between and the
+        index is dropped to be rebuilt on the next search instead.
+        """
+        updates = [(pk, values) for pk, values in updates if pk is not None]
+        # Terms are computed before taking the lock
+        rows = {pk: self._row(values) for pk, values in updates if values is not None}
+        with self._lock:
+            if self._entries is None:
+                return
+            if version is None or self._version is None or version != self._version + 1:
+                self._drop()
+                return
+            self._version = version
+            if len(updates) <= INSERT_BATCH_SIZE:
+                for pk, _ in updates:
+                    self._remove(pk)
+                    row = rows.get(pk)
+                    if row is not None:
+                        self._rows[pk] = row
+                        for term in row[2]:
+                            insort(self._entries, (term, pk))
+                self._mutations += 1
+                return
+            entries, mutations = self._entries, self._mutations
+            removed = sorted(
+                (term, pk) for pk, _ in updates if pk in self._rows for term in self._rows[pk][2]
+            )
+
+        # Bulk writes: merge in one pass outside the lock, instead of an
+        # O(n) insort per term that would block searches for the whole import
+        added = sorted((term, pk) for pk, (_, _, terms) in rows.items() for term in terms)
+        merged = _merged(entries, removed, added)
+        with self._lock:
+            if self._mutations != mutations:
+                # Changed meanwhile by another thread: rebuild rather than lose its write
+                self._drop()
+                return
+            for pk, _ in updates:
+                self._rows.pop(pk, None)
+            self._rows.update(rows)
+            self._entries = merged
+            self._mutations += 1
+
+    def _drop(self):
+        self._entries = None
+        self._rows = {}
+        self._mutations += 1
+
+    # Search
+
+    def search(self, term, limit):
+        """
+        Up to `limit` rows having a term starting with `term` (normalized).
+
+        Returns:
+            list: (matched term, pk, code, label), sorted by matched term.
+        """
+        self._refresh()
+        with self._lock:
+            if self._entries is not None:
+                return self._scan(term, limit)
+            too_large = self.too_large
+        if not too_large:
+            # Dropped by a concurrent apply() since the refresh: rebuild once
+            self.build()
+            with self._lock:
+                if self._entries is not None:
+                    return self._scan(term, limit)
+        return self._search_database(term, limit)
+
+    def _scan(self, term, limit):
+        # Called with the lock held
+        matches = []
+        seen = set()
+        position = bisect_left(self._entries, (term,))
+        while position < len(self._entries) and len(matches) < limit:
+            key, pk = self._entries[position]
+            if not key.startswith(term):
+                break
+            if pk not in seen:
+                seen.add(pk)
+                code, label, _ = self._rows[pk]
+                matches.append((key, pk, code, label))
+            position += 1
+        return matches
+
+    def _search_database(self, term, limit):
+        # Candidates containing the term come from the trigram index (core.search);
+        # the same word-prefix rule as the in-memory index then picks the matches
+        queryset = search_any(self.model.objects.all(), self.fields, term)
+        if queryset is None:
+            return []
+        matches = []
+        for values in queryset.order_by().values_list('pk', *self.fields)[:limit * FALLBACK_CANDIDATES]:
+            code, label, terms = self._row(values[1:])
+            matched = [key for key in terms if key.startswith(term)]
+            if matched:
+                matches.append((min(matched), values[0], code, label))
+        matches.sort()
+        return matches[:limit]
+
+    def result(self, pk, code, label, level):
+        """JSON result linking to the edit page, or to the filtered list for read-only users."""
+        if self.edit_url and level >= 2:
+            url = reverse(self.edit_url, args=[pk])
+        else:
+            url = f'{reverse(self.list_url)}?{urlencode({self.fields[0]: code})}'
+        return {'type': str(self.model._meta.verbose_name).capitalize(), 'label': label, 'url': url}
+
+
+def search(query, permissions, limit=None):
+    """
+    Return the best matches of `query` over the models the user can read.
+
+    Args:
+        query: Text typed in the search box
+        permissions: {module: level} of the user (users.permissions)
+        limit: Maximum results (AUTOCOMPLETE_LIMIT by default)
+    """
+    limit = limit or getattr(settings, 'AUTOCOMPLETE_LIMIT', 10)
+    term = normalize(query)
+    if not term:
+        return []
+    matches = []
+    for index in _indexes.values():
+        level = permissions.get(index.module, 0)
+        if level < 1:
+            continue
+        for key, pk, code, label in index.search(term, limit):
+            matches.append((key, index, pk, code, label, level))
+    matches.sort(key=lambda match: match[0])
+    return [index.result(pk, code, label, level) for _, index, pk, code, label, level in matches[:limit]]
+
+
+def clear():
+    """Drop every index (tests)."""
+    for index in _indexes.values():
+        index.clear()
+
+
+# Signal handlers: applied on commit, so rolled back writes never show up
+
+def _apply(index, updates):
+    index.apply(updates, bump_version(index.model))
+
+
+def _schedule(sender, updates):
+    index = _indexes.get(sender)
+    if index is not None and updates:
+        transaction.on_commit(partial(_apply, index, updates))
+
+
+def _instance_values(sender, instance):
+    if getattr(instance, 'is_deleted', False):
+        return None
+    return [getattr(instance, field) for field in _indexes[sender].fields]
+
+
+def _index_saved(sender, instance, raw=False, **kwargs):
+    if not raw:
+        _schedule(sender, [(instance.pk, _instance_values(sender, instance))])
+
+
+def _index_deleted(sender, instance, **kwargs):
+    _schedule(sender, [(instance.pk, None)])
+
+
+def _index_bulk_created(sender, instances, **kwargs):
+    if sender in _indexes:
+        _schedule(sender, [(instance.pk, _instance_values(sender, instance)) for instance in instances])
+
+
+def _index_bulk_updated(sender, changes, **kwargs):
+    if sender in _indexes:
+        fields = _indexes[sender].fields
+        _schedule(sender, [(old['pk'], [{**old, **new}.get(field) for field in fields]) for old, new in changes])
+
+
+def _index_soft_deleted(sender, instances, **kwargs):
+    if sender in _indexes:
+        _schedule(sender, [(instance.pk, None) for instance in instances])
+
+
+def _index_restored(sender, instances, **kwargs):
+    if sender in _indexes:
+        fields = _indexes[sender].fields
+        _schedule(sender, [(instance.pk, [getattr(instance, field) for field in fields]) for instance in instances])
+
+
+def track_autocomplete(model, fields, module, list_url, edit_url=None):
+    """Offer `model` in the search box, matching `fields` (code first), for users with read access to `module`."""
+    _indexes[model] = PrefixIndex(model, fields, module, list_url, edit_url)
+    uid = f'autocomplete-{model._meta.label_lower}'
+    post_save.connect(_index_saved, sender=model, dispatch_uid=uid)
+    post_delete.connect(_index_deleted, sender=model, dispatch_uid=uid)
+    bulk_created.connect(_index_bulk_created, dispatch_uid='autocomplete')
+    bulk_updated.connect(_index_bulk_updated, dispatch_uid='autocomplete')
+    soft_deleted.connect(_index_soft_deleted, dispatch_uid='autocomplete')
+    restored.connect(_index_restored, dispatch_uid='autocomplete')
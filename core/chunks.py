@@ -0,0 +1,106 @@
+"""
+Record-aligned chunking and parsing of CSV files for core.importers.
+
+Nothing here imports models at module level: parse_chunk() and
+init_worker() are unpickled by freshly spawned worker processes before
+Django is set up.
+"""
+
+import codecs
+import csv
+import io
+
+from django.apps import apps
+
+from .validation import RowValidator
+
+FALLBACK_ENCODING = 'ISO-8859-1'
+ENCODING_SAMPLE_SIZE = 64 * 1024
+
+
+def detect_encoding(path, sample_size=ENCODING_SAMPLE_SIZE):
+    """Return 'utf-8-sig' if the start of the file decodes as UTF-8, else the Latin-1 fallback."""
+    with open(path, 'rb') as source:
+        sample = source.read(sample_size)
+    try:
+        # Not final: the sample may end in the middle of a character
+        codecs.getincrementaldecoder('utf-8')().decode(sample, final=False)
+    except UnicodeDecodeError:
+        return FALLBACK_ENCODING
+    return 'utf-8-sig'
+
+
+def decode_chunk(data, encoding):
+    # The sample can't rule out Latin-1 bytes further on; decode that chunk as Latin-1
+    try:
+        return data.decode(encoding)
+    except UnicodeDecodeError:
+        return data.decode(FALLBACK_ENCODING)
+
+
+def clean_fieldnames(fieldnames):
+    """Normalize CSV headers the way the upload template expects them."""
+    return [key.lstrip('\ufeff').strip().lower() for key in fieldnames]
+
+
+def split_records(data, start, chunk_bytes):
+    """
+    Yield (start, end) byte ranges of about `chunk_bytes` that hold whole records.
+
+    A range ends at the first newline after `start + chunk_bytes` preceded
+    by an even number of quote characters since `start` (escaped quotes
+    count twice), i.e. one outside any quoted field.
+    """
+    size = len(data)
+    while start < size:
+        end = min(start + chunk_bytes, size)
+        quotes = data[start:end].count(b'"')
+        while end < size:
+            newline = data.find(b'\n', end)
+            if newline == -1:
+                end = size
+                break
+            quotes += data[end:newline + 1].count(b'"')
+            end = newline + 1
+            if quotes % 2 == 0:
+                break
+        yield start, end
+        start = end
+
+
+_validators = {}
+
+
+def init_worker(lookups=None):
+    # Spawned workers start from a fresh interpreter
+    import django
+    django.setup()
+    if lookups is not None:
+        # Lookup names are resolved from the parent's registry, without the database
+        from .lookups import registry
+        registry.load(lookups)
+
+
+def parse_chunk(path, start, end, encoding, fieldnames, model_label, fields):
+    """
+    Parse and clean the records in one byte range of a CSV file.
+
+    Runs in a worker process and never touches the database.
+
+    Returns:
+        tuple: (rows, cleaned_rows, errors), lists with one item per record
+        (see RowValidator.clean()).
+    """
+    with open(path, 'rb') as source:
+        source.seek(start)
+        data = source.read(end - start)
+    reader = csv.DictReader(io.StringIO(decode_chunk(data, encoding), newline=''), fieldnames=fieldnames)
+    rows = [
+        {key: value.strip() if isinstance(value, str) else value for key, value in row.items()}
+        for row in reader
+    ]
+    key = (model_label, tuple(fields))
+    if key not in _validators:
+        _validators[key] = RowValidator(apps.get_model(model_label), fields)
+    cleaned_rows, errors = _validators[key].clean(rows)
+    return rows, cleaned_rows, errors
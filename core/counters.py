@@ -0,0 +1,204 @@
+"""
+Incrementally maintained record counts for the dashboard.
+
+Counting materials by status or suppliers by country with GROUP BY on every
+dashboard hit doesn't scale, so the counts are kept in the KpiCounter table
+and adjusted as rows change:
+
+- post_save / post_delete adjust the counters of a single instance (the
+  previous values of an update come from core.snapshots);
+- core.signals.bulk_created / bulk_updated adjust them for bulk writes.
+
+Soft-deleted rows (core.models.SoftDeleteModel) aren't counted: the
+soft_deleted / restored signals take them out and put them back.
+
+Lookup fields (core.lookups.LookupField) are counted by id; summary()
+shows their names.
+
+Writes that bypass all of these (queryset.update(), raw SQL) make the counters
+drift; `manage.py rebuild_kpi_counters` recomputes them from scratch.
+
+Models are registered from their AppConfig.ready():
+
+    track_counts(Material, ['status', 'material_type'])
+"""
+
+from collections import Counter
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F
+from django.db.models.signals import post_delete, post_save
+
+from .lookups import display_function
+from .models import KpiCounter
+from .signals import bulk_created, bulk_updated, restored, soft_deleted
+from .snapshots import previous_values, watch
+
+_tracked = {}
+
+
+def _value(value):
+    return '' if value is None else str(value)
+
+
+def apply_deltas(deltas):
+    """
+    Add each delta to its (model_label, dimension, value) counter.
+
+    Costs one UPDATE per distinct key, however many rows the deltas
+    summarize, plus one INSERT for the keys seen for the first time.
+    """
+    missing = []
+    with transaction.atomic():
+        for (label, dimension, value), delta in deltas.items():
+            if not delta:
+                continue
+            lookup = {'model_label': label, 'dimension': dimension, 'value': value}
+            if not KpiCounter.objects.filter(**lookup).update(count=F('count') + delta):
+                missing.append(KpiCounter(count=delta, **lookup))
+        if missing:
+            try:
+                with transaction.atomic():
+                    KpiCounter.objects.bulk_create(missing)
+            except IntegrityError:
+                # Some were created concurrently; add to those instead
+                for counter in missing:
+                    lookup = {'model_label': counter.model_label, 'dimension': counter.dimension, 'value': counter.value}
+                    if not KpiCounter.objects.filter(**lookup).update(count=F('count') + counter.count):
+                        KpiCounter.objects.create(count=counter.count, **lookup)
+
+
+def _deltas(label, fields, values, sign, deltas=None):
+    deltas = Counter() if deltas is None else deltas
+    if values.get('is_deleted'):
+        return deltas
+    for field in fields:
+        deltas[(label, field, _value(values.get(field)))] += sign
+    return deltas
+
+
+def _read_fields(model):
+    # Soft-deletable rows also carry their deleted flag
+    fields = _tracked[model]
+    return fields + ['is_deleted'] if hasattr(model, 'all_objects') else fields
+
+
+def _instance_values(instance, fields):
+    return {field: getattr(instance, field) for field in fields}
+
+
+def _count_saved(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    fields = _tracked[sender]
+    label = sender._meta.label_lower
+    deltas = _deltas(label, fields, _instance_values(instance, _read_fields(sender)), 1)
+    previous = previous_values(instance)
+    if not created and previous is not None:
+        _deltas(label, fields, previous, -1, deltas)
+    apply_deltas(deltas)
+
+
+def _count_deleted(sender, instance, **kwargs):
+    # Purging a soft-deleted row changes nothing: it was already taken out
+    fields = _tracked[sender]
+    apply_deltas(_deltas(sender._meta.label_lower, fields, _instance_values(instance, _read_fields(sender)), -1))
+
+
+def _count_instances(sender, instances, sign):
+    if sender not in _tracked:
+        return
+    fields = _tracked[sender]
+    label = sender._meta.label_lower
+    deltas = Counter()
+    for instance in instances:
+        _deltas(label, fields, _instance_values(instance, fields), sign, deltas)
+    apply_deltas(deltas)
+
+
+def _count_bulk_created(sender, instances, **kwargs):
+    _count_instances(sender, instances, 1)
+
+
+def _count_bulk_updated(sender, changes, **kwargs):
+    if sender not in _tracked:
+        return
+    fields = _tracked[sender]
+    label = sender._meta.label_lower
+    deltas = Counter()
+    for old, new in changes:
+        _deltas(label, fields, old, -1, deltas)
+        _deltas(label, fields, new, 1, deltas)
+    apply_deltas(deltas)
+
+
+def _count_soft_deleted(sender, instances, **kwargs):
+    _count_instances(sender, instances, -1)
+
+
+def _count_restored(sender, instances, **kwargs):
+    _count_instances(sender, instances, 1)
+
+
+def track_counts(model, fields):
+    """Maintain KPI counters of `model` for each of `fields`."""
+    _tracked[model] = list(fields)
+    uid = f'kpi-counters-{model._meta.label_lower}'
+    watch(model, _read_fields(model))
+    post_save.connect(_count_saved, sender=model, dispatch_uid=uid)
+    post_delete.connect(_count_deleted, sender=model, dispatch_uid=uid)
+    bulk_created.connect(_count_bulk_created, dispatch_uid='kpi-counters')
+    bulk_updated.connect(_count_bulk_updated, dispatch_uid='kpi-counters')
+    soft_deleted.connect(_count_soft_deleted, dispatch_uid='kpi-counters')
+    restored.connect(_count_restored, dispatch_uid='kpi-counters')
+
+
+def tracked_models():
+    return list(_tracked)
+
+
+def rebuild(model=None):
+    """Recompute the counters of one tracked model, or of all of them, with GROUP BY."""
+    models = [model] if model is not None else list(_tracked)
+    with transaction.atomic():
+        for tracked in models:
+            label = tracked._meta.label_lower
+            KpiCounter.objects.filter(model_label=label).delete()
+            counters = []
+            for field in _tracked[tracked]:
+                rows = tracked._default_manager.values(field).annotate(total=Count('pk')).order_by()
+                counters.extend(
+                    KpiCounter(model_label=label, dimension=field, value=_value(row[field]), count=row['total'])
+                    for row in rows
+                )
+            KpiCounter.objects.bulk_create(counters)
+
+
+def _display_functions():
+    # Lookup dimensions are counted by id and shown by name
+    functions = {}
+    for model, fields in _tracked.items():
+        for field in fields:
+            display = display_function(model, field)
+            if display is not None:
+                functions[(model._meta.label_lower, field)] = display
+    return functions
+
+
+def summary():
+    """
+    Return the current counters grouped for display.
+
+    Returns:
+        dict: {model_label: {dimension: [(value, count), ...]}}, values
+        sorted by count, descending; empty groups are omitted.
+    """
+    report = {}
+    displays = _display_functions()
+    for counter in KpiCounter.objects.filter(count__gt=0).order_by('-count', 'value'):
+        value = counter.value
+        display = displays.get((counter.model_label, counter.dimension))
+        if display is not None and value.isdigit():
+            value = display(int(value))
+        report.setdefault(counter.model_label, {}).setdefault(counter.dimension, []).append((value, counter.count))
+    return report
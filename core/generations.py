@@ -0,0 +1,154 @@
+"""
+Per-model generation numbers for cached list pages.
+
+Every save, delete or bulk write of a tracked model moves its generation
+forward (see track_generation()). Anything derived from the table can then be
+cached under a key that includes the generation and never needs explicit
+invalidation:
+
+- the rendered table and pagination of the list views ({% cache %} keyed on
+  fragment_key());
+- page totals (core.pagination.cached_count);
+- the ETag / Last-Modified validators of the list views (list_condition()),
+  so a browser revalidating an unchanged page gets a 304.
+
+The generation is the time of the last write, so it doubles as a
+Last-Modified value that also covers deletes. Generations live in the
+default cache: deployments with several processes need a shared backend
+(Redis, Memcached) for writes in one process to reach the others.
+"""
+
+import hashlib
+import time
+from datetime import datetime, timezone as dt_timezone
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Max
+from django.db.models.signals import post_delete, post_save
+from django.middleware.csrf import get_token
+from django.views.decorators.http import condition
+
+from users.permissions import aget_module_permission, get_module_permission, get_version
+from .signals import bulk_created, bulk_updated, restored, soft_deleted
+
+_tracked = set()
+
+
+def _key(model):
+    return f'generation:{model._meta.label_lower}'
+
+
+def timeout():
+    return getattr(settings, 'LIST_CACHE_TIMEOUT', 300)
+
+
+def get_generation(model):
+    """Return the current generation of a model, starting one if needed."""
+    key = _key(model)
+    generation = cache.get(key)
+    if generation is None:
+        cache.add(key, time.time(), None)
+        generation = cache.get(key, 0)
+    return generation
+
+
+def bump_generation(model):
+    """Invalidate everything cached under the current generation of `model`."""
+    previous = cache.get(_key(model)) or 0
+    # Always move forward, even if the clock didn't
+    cache.set(_key(model), max(time.time(), previous + 0.001), None)
+
+
+def _bump(sender, **kwargs):
+    if sender in _tracked:
+        bump_generation(sender)
+
+
+def track_generation(model):
+    """Bump the generation of `model` on every save, delete or bulk write."""
+    _tracked.add(model)
+    uid = f'generation-{model._meta.label_lower}'
+    post_save.connect(_bump, sender=model, dispatch_uid=uid)
+    post_delete.connect(_bump, sender=model, dispatch_uid=uid)
+    bulk_created.connect(_bump, dispatch_uid='generation')
+    bulk_updated.connect(_bump, dispatch_uid='generation')
+    soft_deleted.connect(_bump, dispatch_uid='generation')
+    restored.connect(_bump, dispatch_uid='generation')
+
+
+def _query_string(request):
+    # Same filters in a different order share an entry
+    return '&'.join(sorted(request.GET.urlencode().split('&')))
+
+
+def fragment_key(request, model, permission):
+    """Vary-on value for the cached table fragment of a list page."""
+    return f'{get_generation(model)}:{permission}:{_query_string(request)}'
+
+
+def last_modified(model):
+    """Latest of Max('updated_at') and the last write seen, cached per generation."""
+    generation = get_generation(model)
+    key = f'lastmod:{model._meta.label_lower}:{generation}'
+    latest = cache.get(key)
+    if latest is None:
+        latest = model.objects.aggregate(latest=Max('updated_at'))['latest']
+        written = datetime.fromtimestamp(generation, tz=dt_timezone.utc)
+        latest = max(latest, written) if latest else written
+        cache.set(key, latest, timeout())
+    return latest
+
+
+def list_condition(model, module, variant=None, bypass=None):
+    """
+    Decorator adding ETag / Last-Modified to a list view of `model`.
+
+    The ETag covers everything the page depends on: the model generation,
+    the query string, the user and their permissions (including the
+    permissions cache version) and the CSRF secret the page embeds, plus
+    `variant(request)` when the same URL renders more than one body. Users
+    without access to `module` get no validators, nor do requests for which
+    `bypass(request)` is true (a page showing one-time messages must render).
+    """
+    def etag(request, *args, **kwargs):
+        permission = get_module_permission(request, module)
+        if not permission or (bypass and bypass(request)):
+            return None
+        # Make sure the secret exists now, not only once the page renders its form
+        get_token(request)
+        parts = [
+            get_generation(model),
+            permission,
+            get_version(),
+            request.user.pk,
+            request.META.get('CSRF_COOKIE', ''),
+            _query_string(request),
+            variant(request) if variant else None,
+        ]
+        return hashlib.md5(repr(parts).encode('utf-8')).hexdigest()
+
+    def modified(request, *args, **kwargs):
+        if not get_module_permission(request, module) or (bypass and bypass(request)):
+            return None
+        return last_modified(model)
+
+    def decorator(view):
+        if not iscoroutinefunction(view):
+            return condition(etag_func=etag, last_modified_func=modified)(view)
+
+        # The validators may query the database, so compute them in a thread first
+        def validators(request, *args, **kwargs):
+            return etag(request, *args, **kwargs), modified(request, *args, **kwargs)
+
+        @wraps(view)
+        async def wrapper(request, *args, **kwargs):
+            await aget_module_permission(request, module)
+            tag, latest = await sync_to_async(validators)(request, *args, **kwargs)
+            conditional = condition(etag_func=lambda *a, **kw: tag, last_modified_func=lambda *a, **kw: latest)
+            return await conditional(view)(request, *args, **kwargs)
+        return wrapper
+
+    return decorator
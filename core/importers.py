@@ -0,0 +1,290 @@
+"""
+Chunked CSV import engine used by the background import jobs.
+
+An importer reads a spooled CSV file in chunks, validates rows and inserts
+the valid ones with batched bulk_create() calls, committing one batch at a
+time and recording progress on its ImportJob. Subclasses only describe the
+target model and the form whose fields make up a row:
+
+    class SupplierImporter(CsvImporter):
+        model = Suppliers
+        form_class = SupplierForm
+
+The file is memory-mapped and cut into byte ranges of about
+IMPORT_CHUNK_BYTES that end on record boundaries (a newline outside quoted
+fields). Each range is decoded, parsed and cleaned on its own (see
+core.chunks), in a pool of IMPORT_PARSE_PROCESSES worker processes for files
+of at least IMPORT_PARALLEL_MIN_BYTES, inline otherwise.
+Results come back in file order, so row numbers in the error report are
+those of the original file. Uniqueness checks and writes, which need the
+database, stay in the job's thread.
+
+In upsert mode (ImportJob.MODE_UPSERT) rows whose `unique_field` already
+exists are compared with the stored values: unchanged rows are skipped and
+changed ones are written back in one set-based statement per batch
+(INSERT ... ON CONFLICT DO UPDATE where the database supports it, otherwise
+bulk_update()). Soft-deleted records matched by a row are restored.
+
+Bulk writes skip the model signals, so every committed batch is announced
+with core.signals.bulk_created / bulk_updated instead.
+"""
+
+import csv
+import io
+import mmap
+import multiprocessing
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from django.conf import settings
+from django.db import IntegrityError, connections, transaction
+from django.utils import timezone
+
+from .chunks import clean_fieldnames, decode_chunk, detect_encoding, init_worker, parse_chunk, split_records
+from .lookups import registry
+from .models import ImportJob, SoftDeleteModel
+from .signals import bulk_created, bulk_updated
+from .validation import RowValidator
+
+class CsvImporter:
+    """
+    Base class for CSV importers.
+
+    Attributes:
+        model: Model the rows are inserted into
+        form_class: ModelForm whose fields are read from each row
+        unique_field: Natural key used to match rows in upsert mode
+        batch_size: Rows validated and inserted per transaction
+        chunk_bytes: Approximate size of the byte ranges parsed at once
+    """
+
+    model = None
+    form_class = None
+    unique_field = None
+    batch_size = None
+    chunk_bytes = None
+
+    def __init__(self, job):
+        self.job = job
+        self.user = job.created_by
+        self.processed_rows = 0
+        self.created_count = 0
+        self.updated_count = 0
+        self.unchanged_count = 0
+        self.error_records = []
+        self.upsert = job.mode == ImportJob.MODE_UPSERT
+        if self.batch_size is None:
+            self.batch_size = getattr(settings, 'IMPORT_BATCH_SIZE', 1000)
+        if self.chunk_bytes is None:
+            self.chunk_bytes = getattr(settings, 'IMPORT_CHUNK_BYTES', 4 * 1024 * 1024)
+        self.validator = RowValidator(self.model, self.form_class._meta.fields)
+        self.restores = issubclass(self.model, SoftDeleteModel)
+
+    def parsed_chunks(self):
+        """Yield the (rows, cleaned_rows, errors) of each chunk of the file, in order."""
+        path = self.job.file_path
+        size = os.path.getsize(path)
+        if not size:
+            return
+        encoding = detect_encoding(path)
+        with open(path, 'rb') as source, mmap.mmap(source.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            header_end = next(split_records(data, 0, 0))[1]
+            ranges = list(split_records(data, header_end, self.chunk_bytes))
+            header = next(csv.reader(io.StringIO(decode_chunk(data[:header_end], encoding), newline='')), [])
+        fieldnames = clean_fieldnames(header)
+        tasks = [
+            (path, start, end, encoding, fieldnames, self.model._meta.label, self.validator.fields)
+            for start, end in ranges
+        ]
+
+        processes = getattr(settings, 'IMPORT_PARSE_PROCESSES', 2)
+        if processes < 2 or len(tasks) < 2 or size < getattr(settings, 'IMPORT_PARALLEL_MIN_BYTES', 32 * 1024 * 1024):
+            for task in tasks:
+                yield parse_chunk(*task)
+            return
+
+        # Spawn rather than fork: the web process has other threads and open connections
+        with ProcessPoolExecutor(
+            max_workers=processes,
+            mp_context=multiprocessing.get_context('spawn'),
+            initializer=init_worker,
+            initargs=(registry.snapshot(),),
+        ) as pool:
+            # Keep a few chunks in flight so parsed rows don't pile up while batches are written
+            pending = deque()
+            for task in tasks:
+                pending.append(pool.submit(parse_chunk, *task))
+                if len(pending) >= processes * 2:
+                    yield pending.popleft().result()
+            while pending:
+                yield pending.popleft().result()
+
+    def build(self, cleaned):
+        """Return an unsaved instance for a validated row."""
+        return self.model(**cleaned, created_by=self.user)
+
+    def add_error(self, row_number, data, errors):
+        self.error_records.append({
+            'row': row_number,
+            'data': data,
+            'errors': errors,
+        })
+
+    def save_batch(self, batch):
+        """Insert a batch of (row_number, data, instance) in a single transaction."""
+        try:
+            instances = [instance for _, _, instance in batch]
+            with transaction.atomic():
+                self.model.objects.bulk_create(instances, batch_size=self.batch_size)
+            self.created_count += len(batch)
+            bulk_created.send(sender=self.model, instances=instances)
+        except IntegrityError:
+            # Find the offending rows one by one so the rest of the batch is kept
+            for row_number, data, instance in batch:
+                try:
+                    with transaction.atomic():
+                        instance.save()
+                    self.created_count += 1
+                except IntegrityError as exc:
+                    self.add_error(row_number, data, {'__all__': str(exc)})
+
+    def split_existing(self, batch):
+        """
+        Split validated rows into new ones and changed existing ones.
+
+        Returns:
+            tuple: (new, changed) lists of (row_number, data, cleaned),
+            changed rows followed by their stored values; rows identical
+            to the stored record are only counted. Soft-deleted records
+            count as changed: the upsert restores them.
+        """
+        key = self.unique_field
+        fields = self.validator.fields
+        stored = {
+            values[key]: values
+            for values in self.model._base_manager.filter(
+                **{f'{key}__in': [cleaned[key] for _, _, cleaned in batch]}
+            ).values('pk', *fields, *(['is_deleted'] if self.restores else []))
+        }
+
+        new, changed = [], []
+        for row_number, data, cleaned in batch:
+            current = stored.get(cleaned[key])
+            if current is None:
+                new.append((row_number, data, cleaned))
+            elif current.get('is_deleted') or any(current[field] != cleaned[field] for field in fields):
+                changed.append((row_number, data, cleaned, current))
+            else:
+                self.unchanged_count += 1
+        return new, changed
+
+    def update_batch(self, changed):
+        """Write changed existing rows back with one statement per batch."""
+        update_fields = [field for field in self.validator.fields if field != self.unique_field] + ['updated_at']
+        if self.restores:
+            # build() leaves the deleted flag unset
+            update_fields += ['is_deleted', 'deleted_at']
+        try:
+            self.write_updates(changed, update_fields)
+        except IntegrityError:
+            # Find the offending rows one by one so the rest of the batch is kept
+            written = []
+            for row_number, data, cleaned, current in changed:
+                instance = self.build(cleaned)
+                instance.updated_at = timezone.now()
+                try:
+                    with transaction.atomic():
+                        self.model._base_manager.filter(
+                            **{self.unique_field: cleaned[self.unique_field]}
+                        ).update(**{field: getattr(instance, field) for field in update_fields})
+                    written.append((row_number, data, cleaned, current))
+                except IntegrityError as exc:
+                    self.add_error(row_number, data, {'__all__': str(exc)})
+            changed = written
+        self.updated_count += len(changed)
+        bulk_updated.send(sender=self.model, changes=[(current, cleaned) for _, _, cleaned, current in changed])
+
+    def write_updates(self, changed, update_fields):
+        """Update rows in bulk: an upsert where the database supports it, bulk_update() otherwise."""
+        connection = connections[self.model._base_manager.db]
+        if connection.features.supports_update_conflicts_with_target:
+            with transaction.atomic():
+                self.model._base_manager.bulk_create(
+                    [self.build(cleaned) for _, _, cleaned, _ in changed],
+                    batch_size=self.batch_size,
+                    update_conflicts=True,
+                    unique_fields=[self.unique_field],
+                    update_fields=update_fields,
+                )
+        else:
+            now = timezone.now()
+            pks = dict(self.model._base_manager.filter(
+                **{f'{self.unique_field}__in': [cleaned[self.unique_field] for _, _, cleaned, _ in changed]}
+            ).values_list(self.unique_field, 'pk'))
+            instances = []
+            for _, _, cleaned, _ in changed:
+                instance = self.model(pk=pks[cleaned[self.unique_field]], updated_at=now, **cleaned)
+                instances.append(instance)
+            with transaction.atomic():
+                self.model._base_manager.bulk_update(instances, update_fields, batch_size=self.batch_size)
+
+    def report_progress(self):
+        ImportJob.objects.filter(pk=self.job.pk).update(
+            processed_rows=self.processed_rows,
+            created_count=self.created_count,
+            updated_count=self.updated_count,
+            unchanged_count=self.unchanged_count,
+            error_count=len(self.error_records),
+            # Heartbeat read by fail_stale_jobs
+            updated_at=timezone.now(),
+        )
+
+    def process_batch(self, rows):
+        """Check uniqueness of and write a batch of (row_number, data, cleaned, errors)."""
+        valid = []
+        results = self.validator.check_unique(
+            [cleaned for _, _, cleaned, _ in rows],
+            [errors for _, _, _, errors in rows],
+            check_existing=not self.upsert,
+        )
+        for (row_number, data, _, _), (cleaned, errors) in zip(rows, results):
+            if errors:
+                self.add_error(row_number, data, errors)
+            else:
+                valid.append((row_number, data, cleaned))
+
+        if self.upsert and valid:
+            valid, changed = self.split_existing(valid)
+            if changed:
+                self.update_batch(changed)
+
+        batch = [(row_number, data, self.build(cleaned)) for row_number, data, cleaned in valid]
+        if batch:
+            self.save_batch(batch)
+        self.processed_rows += len(rows)
+        self.report_progress()
+
+    def run(self):
+        # Row 1 is the header
+        row_number = 1
+        rows = []
+        for chunk in self.parsed_chunks():
+            for data, cleaned, errors in zip(*chunk):
+                row_number += 1
+                rows.append((row_number, data, cleaned, errors))
+                if len(rows) >= self.batch_size:
+                    self.process_batch(rows)
+                    rows = []
+        if rows:
+            self.process_batch(rows)
+
+        self.error_records.sort(key=lambda record: record['row'])
+        ImportJob.objects.filter(pk=self.job.pk).update(
+            processed_rows=self.processed_rows,
+            created_count=self.created_count,
+            updated_count=self.updated_count,
+            unchanged_count=self.unchanged_count,
+            error_count=len(self.error_records),
+            error_records=self.error_records,
+        )
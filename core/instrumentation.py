@@ -0,0 +1,185 @@
+"""
+Per-view performance instrumentation.
+
+InstrumentationMiddleware (core.middleware) opens a RequestMetrics for each
+request, installs a database execute wrapper that times every query and
+records how long templates take to render. The finished sample is added to
+an in-process, bounded store keyed by view name, from which the admin-only
+endpoint reports percentiles.
+
+Everything here is per process: with several workers each one reports its
+own traffic.
+"""
+
+import contextvars
+import logging
+import threading
+import time
+from collections import Counter, defaultdict, deque
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+_current = contextvars.ContextVar('request_metrics', default=None)
+
+
+class RequestMetrics:
+    """Counters collected while a single request is being handled."""
+
+    def __init__(self):
+        self.view_name = None
+        self.started = time.perf_counter()
+        self.duration = 0.0
+        self.query_count = 0
+        self.sql_time = 0.0
+        self.template_time = 0.0
+        self.template_depth = 0
+        self.response_size = None
+        self.statements = Counter()
+
+    @property
+    def duplicate_queries(self):
+        """Number of queries that repeated an earlier statement with the same parameters."""
+        return sum(count - 1 for count in self.statements.values() if count > 1)
+
+    def top_duplicates(self, limit=3):
+        return [(sql, count) for sql, count in self.statements.most_common(limit) if count > 1]
+
+    def __call__(self, execute, sql, params, many, context):
+        # connection.execute_wrapper() hook
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.sql_time += time.perf_counter() - start
+            self.query_count += 1
+            try:
+                self.statements[(sql, repr(params))] += 1
+            except Exception:
+                pass
+
+    def as_sample(self):
+        return {
+            'duration': self.duration,
+            'queries': self.query_count,
+            'sql_time': self.sql_time,
+            'template_time': self.template_time,
+            'response_size': self.response_size,
+            'duplicates': self.duplicate_queries,
+        }
+
+
+def start():
+    metrics = RequestMetrics()
+    token = _current.set(metrics)
+    return metrics, token
+
+
+def finish(token):
+    _current.reset(token)
+
+
+def current():
+    return _current.get()
+
+
+def instrument_templates():
+    """Wrap Template.render so the outermost render of each request is timed."""
+    from django.template.base import Template
+
+    if getattr(Template.render, 'instrumented', False):
+        return
+    original = Template.render
+
+    def render(self, context):
+        metrics = _current.get()
+        if metrics is None:
+            return original(self, context)
+        metrics.template_depth += 1
+        start = time.perf_counter()
+        try:
+            return original(self, context)
+        finally:
+            metrics.template_depth -= 1
+            if metrics.template_depth == 0:
+                metrics.template_time += time.perf_counter() - start
+
+    render.instrumented = True
+    Template.render = render
+
+
+class MetricsStore:
+    """Thread-safe, bounded store of recent samples per view."""
+
+    def __init__(self, size):
+        self.size = size
+        self.lock = threading.Lock()
+        self.samples = defaultdict(lambda: deque(maxlen=self.size))
+        self.duplicates = defaultdict(Counter)
+
+    def add(self, metrics):
+        with self.lock:
+            self.samples[metrics.view_name].append(metrics.as_sample())
+            for (sql, _), count in metrics.top_duplicates():
+                self.duplicates[metrics.view_name][sql] += count - 1
+
+    def clear(self):
+        with self.lock:
+            self.samples.clear()
+            self.duplicates.clear()
+
+    def summary(self):
+        """Return per-view request counts, percentiles and the most repeated statements."""
+        with self.lock:
+            snapshot = {name: list(samples) for name, samples in self.samples.items()}
+            duplicates = {name: counter.most_common(5) for name, counter in self.duplicates.items()}
+
+        report = {}
+        for name, samples in sorted(snapshot.items()):
+            report[name] = {
+                'requests': len(samples),
+                'duration_ms': _percentiles([s['duration'] * 1000 for s in samples]),
+                'sql_time_ms': _percentiles([s['sql_time'] * 1000 for s in samples]),
+                'template_time_ms': _percentiles([s['template_time'] * 1000 for s in samples]),
+                'queries': _percentiles([s['queries'] for s in samples]),
+                'response_bytes': _percentiles([s['response_size'] for s in samples if s['response_size'] is not None]),
+                'duplicate_queries': _percentiles([s['duplicates'] for s in samples]),
+                'top_duplicates': [{'sql': sql, 'repeats': count} for sql, count in duplicates.get(name, [])],
+            }
+        return report
+
+
+def _percentiles(values):
+    if not values:
+        return None
+    values = sorted(values)
+
+    def pick(p):
+        return round(values[min(int(p * len(values)), len(values) - 1)], 2)
+
+    return {'p50': pick(0.50), 'p90': pick(0.90), 'p99': pick(0.99), 'max': round(values[-1], 2)}
+
+
+store = MetricsStore(getattr(settings, 'INSTRUMENTATION_SAMPLE_SIZE', 1000))
+
+
+def record(metrics):
+    """Add a finished request to the store and warn about repeated queries."""
+    store.add(metrics)
+    threshold = getattr(settings, 'INSTRUMENTATION_DUPLICATE_THRESHOLD', 5)
+    if metrics.duplicate_queries >= threshold:
+        logger.warning(
+            '%s ran %d duplicate queries (%d total); most repeated: %s',
+            metrics.view_name, metrics.duplicate_queries, metrics.query_count,
+            metrics.top_duplicates(1)[0][0][0],
+        )
+
+
+def server_timing(metrics):
+    """Format a Server-Timing header value for a finished request."""
+    return ', '.join([
+        f'db;dur={metrics.sql_time * 1000:.1f};desc="{metrics.query_count} queries"',
+        f'tpl;dur={metrics.template_time * 1000:.1f}',
+        f'total;dur={metrics.duration * 1000:.1f}',
+    ])
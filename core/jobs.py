@@ -0,0 +1,145 @@
+"""
+Background import jobs.
+
+Uploads are spooled to disk and recorded as an ImportJob row; a small
+in-process thread pool then runs the importer registered for the job kind,
+which updates the row as it goes. The job row doubles as the progress and
+error report read by the status endpoint, so no external broker is needed.
+
+Jobs queued or running when their process stops are never picked up again;
+the fail_stale_jobs command marks them failed once they stop reporting
+progress, so their status pages show an error instead of waiting forever.
+
+Importers are registered from each app's AppConfig.ready():
+
+    register_importer('suppliers', 'suppliers.importers.SupplierImporter')
+"""
+
+import logging
+import os
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from pathlib import Path
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from . import audit
+from .models import ImportJob
+
+logger = logging.getLogger(__name__)
+
+_importers = {}
+_executor = None
+
+
+def register_importer(kind, path):
+    """Register the importer class (dotted path) that handles jobs of `kind`."""
+    _importers[kind] = path
+
+
+def get_importer(kind):
+    return import_string(_importers[kind])
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=getattr(settings, 'IMPORT_WORKERS', 2),
+            thread_name_prefix='import-job',
+        )
+    return _executor
+
+
+def spool_upload(uploaded_file):
+    """Write an uploaded file to the spool directory and return its path."""
+    spool_dir = Path(getattr(settings, 'IMPORT_SPOOL_DIR', settings.BASE_DIR / 'var' / 'imports'))
+    spool_dir.mkdir(parents=True, exist_ok=True)
+    path = spool_dir / f'{uuid.uuid4().hex}.csv'
+    with open(path, 'wb') as destination:
+        for chunk in uploaded_file.chunks():
+            destination.write(chunk)
+    return str(path)
+
+
+def create_job(kind, uploaded_file, user, mode=ImportJob.MODE_INSERT):
+    """Spool an upload, create its ImportJob and queue it for processing."""
+    job = ImportJob.objects.create(
+        kind=kind,
+        mode=mode,
+        file_path=spool_upload(uploaded_file),
+        file_name=uploaded_file.name,
+        created_by=user,
+    )
+    if getattr(settings, 'IMPORT_JOBS_EAGER', False):
+        run_job(job.pk)
+    else:
+        transaction.on_commit(lambda: _get_executor().submit(_run_in_worker, job.pk))
+    return job
+
+
+def _run_in_worker(job_id):
+    # Worker threads get their own connections; release them when done
+    close_old_connections()
+    try:
+        run_job(job_id)
+    finally:
+        close_old_connections()
+
+
+def run_job(job_id):
+    """Run an import job to completion, recording failures on the job row."""
+    job = ImportJob.objects.get(pk=job_id)
+    ImportJob.objects.filter(pk=job_id).update(status=ImportJob.STATUS_RUNNING, updated_at=timezone.now())
+    try:
+        importer = get_importer(job.kind)(job)
+        with audit.acting_as(job.created_by):
+            importer.run()
+    except Exception as exc:
+        logger.exception('Import job %s failed', job_id)
+        ImportJob.objects.filter(pk=job_id).update(
+            status=ImportJob.STATUS_FAILED,
+            message=str(exc),
+            finished_at=timezone.now(),
+        )
+    else:
+        ImportJob.objects.filter(pk=job_id).update(
+            status=ImportJob.STATUS_DONE,
+            finished_at=timezone.now(),
+        )
+    finally:
+        try:
+            os.remove(job.file_path)
+        except OSError:
+            pass
+
+
+def fail_stale_jobs(minutes):
+    """
+    Mark pending or running jobs that made no progress for `minutes` as
+    failed and remove their spooled files. Returns the number of jobs failed.
+    """
+    cutoff = timezone.now() - timedelta(minutes=minutes)
+    stale = ImportJob.objects.filter(
+        status__in=[ImportJob.STATUS_PENDING, ImportJob.STATUS_RUNNING],
+        updated_at__lt=cutoff,
+    )
+    failed = 0
+    for job in stale:
+        # Re-checked so a job that reported progress meanwhile is left alone
+        if not ImportJob.objects.filter(pk=job.pk, status=job.status, updated_at=job.updated_at).update(
+            status=ImportJob.STATUS_FAILED,
+            message=f"Interrupted: no progress for {minutes} minutes. Upload the file again.",
+            finished_at=timezone.now(),
+        ):
+            continue
+        failed += 1
+        try:
+            os.remove(job.file_path)
+        except OSError:
+            pass
+    return failed
@@ -0,0 +1,148 @@
+"""
+List pages shared by the materials and suppliers apps.
+
+A list page declares its model and permission module, the columns its
+table shows and the columns its CSV export writes:
+
+    class MaterialList(ModuleListView):
+        model = Material
+        module = 'materials'
+        template_name = 'materials/materials_list.html'
+        fragment_template_name = 'materials/materials_table.html'
+        table_fields = ['id_material', 'name', 'status']
+        export_columns = EXPORT_COLUMNS
+        export_filename = 'materials.csv'
+
+    materials_list = MaterialList.as_view()
+
+The table is read with only() on `table_fields` plus the creator's username,
+joined in the same query, so columns the page doesn't show are neither
+transferred nor loaded into the instances. The export reads `export_columns`
+with values_list() (see core.exports), so no instances are built at all.
+
+Filtering and paging in the browser (core/static/js/script.js) ask for a
+fragment: the X-Fragment request header or the ?fragment=1 flag returns
+only `fragment_template_name`, the table and its pagination, without the
+layout, navigation and filter form around it. The page and its fragment
+share the cached table, but not their ETag.
+
+Deleting a record offers to undo it on the next list page: the view calls
+offer_undo(request, message, restore_url), kept in the session apart from
+the messages framework, and the page shows the message with an Undo button.
+Pages with pending messages get no ETag, so a 304 never swallows them.
+"""
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth.decorators import login_required
+from django.contrib.messages import get_messages
+from django.shortcuts import redirect, render
+from django.utils.cache import patch_vary_headers
+from django.utils.functional import SimpleLazyObject
+
+from users.permissions import aget_module_permission
+from .exports import is_asgi, stream_csv
+from .generations import fragment_key, list_condition, timeout as list_cache_timeout
+from .pagination import paginate
+from .routers import use_replica
+
+FRAGMENT_HEADER = 'X-Fragment'
+FRAGMENT_PARAM = 'fragment'
+UNDO_SESSION_KEY = 'list_undo'
+
+
+def is_fragment(request):
+    """Whether `request` asks for the table fragment rather than the whole page."""
+    return FRAGMENT_HEADER in request.headers or FRAGMENT_PARAM in request.GET
+
+
+def offer_undo(request, message, url):
+    """Show `message` with an Undo button posting to `url` on the next list page."""
+    request.session[UNDO_SESSION_KEY] = {'message': message, 'url': url}
+
+
+def has_notices(request):
+    """Whether the next page rendered shows messages or an undo offer, once."""
+    return UNDO_SESSION_KEY in request.session or len(get_messages(request)) > 0
+
+
+class ModuleListView:
+    """
+    Base class for the list pages. Not a django.views.View: as_view() returns
+    an async function view behind login, replica routing and conditional GET.
+
+    Attributes:
+        model: Model listed by the page
+        module: Permission module; users without read access go to the dashboard
+        template_name: Template rendering the filters and the table
+        fragment_template_name: Template rendering only the table and pagination
+        table_fields: Model fields the table shows (the primary key is always read)
+        related_fields: Lookups on related models the table shows, read with a join
+        export_columns: Columns of the CSV export, as passed to core.exports.stream_csv()
+        export_filename: Name of the downloaded CSV file
+        per_page: Rows per page
+    """
+
+    model = None
+    module = None
+    template_name = None
+    fragment_template_name = None
+    table_fields = []
+    related_fields = ['created_by__username']
+    export_columns = []
+    export_filename = None
+    per_page = 10
+
+    def filter(self, queryset, params):
+        """Apply the filters in `params`; override per page."""
+        return queryset
+
+    def table_queryset(self, queryset):
+        """Restrict `queryset` to the columns the table renders."""
+        relations = {lookup.rsplit('__', 1)[0] for lookup in self.related_fields}
+        return queryset.select_related(*relations).only(*self.table_fields, *self.related_fields)
+
+    async def get(self, request):
+        max_permission = await aget_module_permission(request, self.module)
+        if max_permission == 0:
+            return redirect('dashboard')
+
+        fragment = is_fragment(request)
+        if FRAGMENT_PARAM in request.GET:
+            # Keep the flag out of the filters, the cache key and the pagination links
+            request.GET = request.GET.copy()
+            del request.GET[FRAGMENT_PARAM]
+
+        queryset = await sync_to_async(self.filter)(self.model.objects.all(), request.GET)
+
+        if request.GET.get('export') == 'csv':
+            return stream_csv(queryset, self.export_columns, self.export_filename, asynchronous=is_asgi(request))
+
+        # Only evaluated when the cached table fragment is missing
+        page_obj = SimpleLazyObject(lambda: paginate(request, self.table_queryset(queryset), self.per_page))
+
+        # The undo offer is shown, and consumed, by the whole page only
+        undo = None if fragment else await sync_to_async(request.session.pop)(UNDO_SESSION_KEY, None)
+
+        # Rendering evaluates the page (when not cached), so it runs in a thread
+        template_name = self.fragment_template_name if fragment else self.template_name
+        response = await sync_to_async(render)(request, template_name, {
+            'page_obj': page_obj,
+            'undo': undo,
+            'list_cache_timeout': list_cache_timeout(),
+            'list_cache_key': fragment_key(request, self.model, max_permission),
+        })
+        # Same URL, different body: keep the browser from reusing one for the other
+        patch_vary_headers(response, [FRAGMENT_HEADER])
+        return response
+
+    @classmethod
+    def as_view(cls):
+        """Return the page as an async function view with the list page decorators."""
+        page = cls()
+
+        async def view(request):
+            return await page.get(request)
+
+        view.__name__ = view.__qualname__ = cls.__name__
+        view.__module__ = cls.__module__
+        return login_required(use_replica(list_condition(cls.model, cls.module, variant=is_fragment, bypass=has_notices)(view)))
@@ -0,0 +1,402 @@
+"""
+Normalized enumerations: statuses, units, types, categories, currencies...
+
+Their values live in core.models.Lookup and records store the id of one in
+a LookupField, a small integer column, so rows no longer repeat the name
+and filters compare integers:
+
+    status = LookupField(Lookup.KIND_STATUS, verbose_name="Status")
+
+Ids are turned into names (and names into ids) by an in-process registry
+holding every Lookup, loaded with one query. Saving or deleting a Lookup
+bumps a version in the default cache; each process reloads its registry
+when it sees a new version, checking at most every LOOKUP_CHECK_INTERVAL
+seconds. It also moves the generation of every model with a LookupField
+(core.generations), so cached list pages show the new names. Deployments
+with several processes need a shared cache backend for renames to reach
+all of them.
+
+There is no foreign key, so a value stored by any row, soft-deleted ones
+included, can't be deleted (ProtectedError): rename it instead, or change
+the rows first.
+
+A LookupField accepts names as well as ids when it is assigned, filtered
+on or cleaned by a form, so CSV imports and the JSON API keep taking
+"Active" or "kg", and model instances get a get_<field>_display() method:
+
+    Material(status='Active', ...).save()
+    Material.objects.filter(status='Active')
+    material.get_status_display()
+"""
+
+import threading
+import time
+
+from django import forms
+from django.apps import apps
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.db import models
+from django.db.models import ProtectedError
+from django.db.models.signals import post_delete, post_save
+
+from .models import Lookup
+
+VERSION_KEY = 'lookups:version'
+
+
+def get_version():
+    """Return the current lookups version, creating it if needed."""
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        cache.add(VERSION_KEY, 1, None)
+        version = cache.get(VERSION_KEY, 1)
+    return version
+
+
+def bump_version():
+    """Make every process reload its registry."""
+    try:
+        cache.incr(VERSION_KEY)
+    except ValueError:
+        cache.set(VERSION_KEY, 2, None)
+
+
+def _normalize(name):
+    return ' '.join(str(name).split()).casefold()
+
+
+class LookupRegistry:
+    """In-process map of every Lookup, by kind, id and name."""
+
+    def __init__(self):
+        # ({kind: {id: name}}, {kind: {normalized name: id}}), replaced as a whole
+        self._data = None
+        self._version = None
+        self._checked = 0.0
+        self._pinned = False
+        self._lock = threading.Lock()
+
+    def clear(self):
+        """Drop the loaded values; the next access reloads them."""
+        self._data = None
+        self._pinned = False
+
+    def snapshot(self):
+        """Every value as {kind: [(id, name), ...]}, for load() in another process."""
+        names, _ = self._load()
+        return {kind: list(values.items()) for kind, values in names.items()}
+
+    def load(self, snapshot):
+        """Use `snapshot` and never query the database or cache (import worker processes)."""
+        self._set({kind: dict(pairs) for kind, pairs in snapshot.items()}, None)
+        self._pinned = True
+
+    def _set(self, names, version):
+        ids = {kind: {_normalize(name): pk for pk, name in values.items()} for kind, values in names.items()}
+        self._data = (names, ids)
+        self._version = version
+        self._checked = time.monotonic()
+        return self._data
+
+    def _load(self):
+        data = self._data
+        if self._pinned:
+            return data
+        now = time.monotonic()
+        if data is not None and now - self._checked < getattr(settings, 'LOOKUP_CHECK_INTERVAL', 1.0):
+            return data
+        version = get_version()
+        if data is not None and version == self._version:
+            self._checked = now
+            return data
+        with self._lock:
+            names = {}
+            for pk, kind, name in Lookup.objects.order_by('name').values_list('pk', 'kind', 'name'):
+                names.setdefault(kind, {})[pk] = name
+            return self._set(names, version)
+
+    def names(self, kind):
+        """{id: name} of every value of `kind`, sorted by name."""
+        return self._load()[0].get(kind, {})
+
+    def choices(self, kind):
+        return list(self.names(kind).items())
+
+    def name(self, kind, pk):
+        """Name of value `pk` of `kind`, or None if there is none."""
+        return self.names(kind).get(pk)
+
+    def id(self, kind, value):
+        """
+        Id of the value of `kind` given by id (an int) or (case-insensitive) name.
+
+        A string is looked up as a name first, so a value named "30" is
+        found by its name; a string of digits naming nothing is read as an
+        id (query strings and API clients may pass ids).
+
+        Returns:
+            int or None: None when no such value exists.
+        """
+        if value is None or value == '':
+            return None
+        names, ids = self._load()
+        if isinstance(value, int):
+            return value if value in names.get(kind, {}) else None
+        pk = ids.get(kind, {}).get(_normalize(value))
+        if pk is None and isinstance(value, str) and value.strip().isdigit():
+            pk = int(value)
+            if pk not in names.get(kind, {}):
+                return None
+        return pk
+
+
+registry = LookupRegistry()
+
+
+def ensure(kind, name):
+    """Return the id of value `name` of `kind`, creating the value if needed."""
+    pk = registry.id(kind, name)
+    if pk is None:
+        pk = Lookup.objects.get_or_create(kind=kind, name=' '.join(str(name).split()))[0].pk
+    return pk
+
+
+def _invalidate(sender, **kwargs):
+    from .generations import bump_generation
+
+    registry.clear()
+    bump_version()
+    # Cached list tables and their ETags show the names
+    for model in apps.get_models():
+        if lookup_fields(model):
+            bump_generation(model)
+
+
+def users_of(lookup):
+    """Labels of the models having rows, soft-deleted ones included, that store `lookup`."""
+    return [
+        model._meta.label
+        for model in apps.get_models()
+        for name, field in lookup_fields(model).items()
+        if field.kind == lookup.kind and model._base_manager.filter(**{name: lookup.pk}).exists()
+    ]
+
+
+def protect(lookups):
+    """Raise ProtectedError if any of `lookups` is stored by a row (see Lookup.delete)."""
+    for lookup in lookups:
+        used_by = users_of(lookup)
+        if used_by:
+            raise ProtectedError(
+                f"Lookup value {lookup} is used by {', '.join(used_by)}; rename it instead.", {lookup},
+            )
+
+
+def connect_signals():
+    post_save.connect(_invalidate, sender=Lookup, dispatch_uid='lookups')
+    post_delete.connect(_invalidate, sender=Lookup, dispatch_uid='lookups')
+
+
+# Fields
+
+class LookupChoiceField(forms.TypedChoiceField):
+    """Select of the values of one kind; also accepts a value's name instead of its id."""
+
+    def __init__(self, kind, **kwargs):
+        self.kind = kind
+        kwargs.setdefault('coerce', int)
+        kwargs.setdefault('empty_value', None)
+        super().__init__(choices=self.lookup_choices, **kwargs)
+
+    def lookup_choices(self):
+        return [('', '---------')] + registry.choices(self.kind)
+
+    def to_python(self, value):
+        value = super().to_python(value)
+        if value:
+            pk = registry.id(self.kind, value)
+            if pk is not None:
+                value = str(pk)
+        return value
+
+
+class LookupField(models.PositiveSmallIntegerField):
+    """
+    Id of a core.models.Lookup value of `kind`.
+
+    A plain integer column, without a foreign key, so reading a row never
+    needs a join: names come from the registry.
+    """
+
+    description = "Lookup value"
+
+    def __init__(self, kind=None, *args, **kwargs):
+        self.kind = kind
+        super().__init__(*args, **kwargs)
+
+    def deconstruct(self):
+        name, path, args, kwargs = super().deconstruct()
+        kwargs['kind'] = self.kind
+        return name, path, args, kwargs
+
+    def contribute_to_class(self, cls, name, private_only=False):
+        super().contribute_to_class(cls, name, private_only)
+        display = f'get_{name}_display'
+        if display not in cls.__dict__:
+            setattr(cls, display, lambda instance: self.display(getattr(instance, self.attname)))
+
+    def display(self, value):
+        """Name of `value` (an id or a name), '' when unset."""
+        if value is None or value == '':
+            return ''
+        pk = registry.id(self.kind, value)
+        return registry.name(self.kind, pk) if pk is not None else str(value)
+
+    def _resolve(self, value):
+        # Strings are names first (see LookupRegistry.id); an unknown id is kept for validate() to reject
+        pk = registry.id(self.kind, value)
+        if pk is None and value.strip().isdigit():
+            pk = int(value)
+        return pk
+
+    def get_prep_value(self, value):
+        if isinstance(value, str) and value.strip():
+            pk = self._resolve(value)
+            if pk is None:
+                raise ValueError(f"Field '{self.name}' has no {self.kind} named {value!r}.")
+            value = pk
+        return super().get_prep_value(value)
+
+    def to_python(self, value):
+        if isinstance(value, str) and value.strip():
+            pk = self._resolve(value)
+            if pk is None:
+                raise ValidationError(
+                    self.error_messages['invalid_choice'], code='invalid_choice', params={'value': value},
+                )
+            return pk
+        return super().to_python(value)
+
+    def pre_save(self, model_instance, add):
+        # Names assigned to the instance are stored, and left on it, as ids
+        value = getattr(model_instance, self.attname)
+        if value is not None and not isinstance(value, int):
+            value = self.get_prep_value(value)
+            setattr(model_instance, self.attname, value)
+        return value
+
+    def validate(self, value, model_instance):
+        super().validate(value, model_instance)
+        if value is not None and registry.name(self.kind, value) is None:
+            raise ValidationError(self.error_messages['invalid_choice'], code='invalid_choice', params={'value': value})
+
+    def formfield(self, **kwargs):
+        return models.Field.formfield(self, **{
+            'form_class': LookupChoiceField,
+            'choices_form_class': LookupChoiceField,
+            'kind': self.kind,
+            **kwargs,
+        })
+
+
+def lookup_fields(model):
+    """{field name: LookupField} of `model`."""
+    return {field.name: field for field in model._meta.concrete_fields if isinstance(field, LookupField)}
+
+
+def filter_lookups(queryset, params, fields):
+    """
+    Filter `queryset` on the lookup `fields` given in `params`, by id or name.
+
+    Each is an integer equality; a value that doesn't exist matches nothing.
+    """
+    lookups = lookup_fields(queryset.model)
+    for name in fields:
+        value = params.get(name)
+        if value is None or value == '':
+            continue
+        pk = registry.id(lookups[name].kind, value)
+        if pk is None:
+            return queryset.none()
+        queryset = queryset.filter(**{name: pk})
+    return queryset
+
+
+def display_function(model, name):
+    """Function turning the stored ids of field `name` into names, or None for other fields."""
+    field = lookup_fields(model).get(name)
+    if field is None:
+        return None
+    names = registry.names(field.kind)
+    return lambda value: names.get(value, value)
+
+
+# Data migrations from free-text columns
+
+def names_to_ids(apps, model_label, fields):
+    """
+    Store lookup ids in place of the names held by `fields` ({field: kind}).
+
+    Creates a Lookup for each distinct name, merging names that only differ
+    in case or spacing (the most common spelling wins). The ids are written
+    into the text columns; an AlterField to LookupField then converts them.
+    Blank values become NULL.
+    """
+    historical_lookup = apps.get_model('core', 'Lookup')
+    model = apps.get_model(model_label)
+    for field, kind in fields.items():
+        counts = model._base_manager.values_list(field).annotate(rows=models.Count('pk')).order_by('-rows')
+        values = [value for value, _ in counts if value is not None]
+        spellings = {}
+        for value in values:
+            if value.strip():
+                spellings.setdefault(_normalize(value), ' '.join(value.split()))
+
+        existing = {_normalize(name) for name in historical_lookup.objects.filter(kind=kind).values_list('name', flat=True)}
+        historical_lookup.objects.bulk_create([
+            historical_lookup(kind=kind, name=name) for key, name in spellings.items() if key not in existing
+        ])
+        ids = {
+            _normalize(name): pk
+            for pk, name in historical_lookup.objects.filter(kind=kind).values_list('pk', 'name')
+        }
+        # One CASE over the old values, so a name that looks like an id can't be converted twice
+        whens = [
+            models.When(**{field: value}, then=models.Value(str(ids[_normalize(value)])))
+            for value in values if value.strip()
+        ]
+        if whens:
+            model._base_manager.update(**{field: models.Case(*whens, default=models.Value(None))})
+        else:
+            model._base_manager.update(**{field: None})
+
+
+def ids_to_names(apps, model_label, fields):
+    """Reverse of names_to_ids(): put the names back into the (text) columns."""
+    historical_lookup = apps.get_model('core', 'Lookup')
+    model = apps.get_model(model_label)
+    for field, kind in fields.items():
+        whens = [
+            models.When(**{field: str(pk)}, then=models.Value(name))
+            for pk, name in historical_lookup.objects.filter(kind=kind).values_list('pk', 'name')
+        ]
+        model._base_manager.update(**{field: models.Case(*whens, default=models.Value(''))})
+
+
+def recount(apps, model_label, dimensions):
+    """Rebuild the KPI counters of `dimensions` after their stored values changed (see core.counters)."""
+    counter = apps.get_model('core', 'KpiCounter')
+    model = apps.get_model(model_label)
+    label = model._meta.label_lower
+    for dimension in dimensions:
+        counter.objects.filter(model_label=label, dimension=dimension).delete()
+        rows = (
+            model._base_manager.filter(is_deleted=False).values_list(dimension)
+            .annotate(total=models.Count('pk')).order_by()
+        )
+        counter.objects.bulk_create([
+            counter(model_label=label, dimension=dimension, value='' if value is None else str(value), count=total)
+            for value, total in rows
+        ])
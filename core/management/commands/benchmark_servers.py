@@ -0,0 +1,182 @@
+"""
+Compare WSGI and ASGI throughput of one URL under concurrent clients.
+
+Both Django handlers are driven in-process, without a real server or
+network: WSGI requests are served by a fixed pool of worker threads (like
+gunicorn --threads), ASGI requests by one event loop. Every response is read
+to the end, so long streaming exports count in full.
+
+    python manage.py benchmark_servers --username admin --path "/materials/?export=csv" \\
+        --requests 40 --concurrency 20 --wsgi-threads 4
+"""
+
+import asyncio
+import io
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.handlers.asgi import ASGIHandler
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client
+
+HOST = 'localhost'
+
+
+class ThreadSampler:
+    """Record the highest number of live threads while running."""
+
+    def __init__(self):
+        self.peak = threading.active_count()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+
+    def _sample(self):
+        while not self._stop.wait(0.01):
+            self.peak = max(self.peak, threading.active_count())
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stop.set()
+        self._thread.join()
+
+
+class Command(BaseCommand):
+    help = "Benchmark a URL through the WSGI and the ASGI handler with concurrent clients."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--username', required=True, help="User whose session makes the requests.")
+        parser.add_argument('--path', default='/materials/?export=csv', help="URL to request.")
+        parser.add_argument('--requests', type=int, default=40, help="Total requests per handler.")
+        parser.add_argument('--concurrency', type=int, default=20, help="Clients requesting at the same time.")
+        parser.add_argument('--wsgi-threads', type=int, default=4, help="Worker threads serving WSGI requests.")
+
+    def handle(self, *args, **options):
+        try:
+            user = get_user_model().objects.get(username=options['username'])
+        except get_user_model().DoesNotExist:
+            raise CommandError(f"User {options['username']!r} does not exist.")
+        if HOST not in settings.ALLOWED_HOSTS and not settings.DEBUG:
+            raise CommandError(f"Add {HOST!r} to ALLOWED_HOSTS to run the benchmark.")
+
+        client = Client()
+        client.force_login(user)
+        cookie = f"{settings.SESSION_COOKIE_NAME}={client.cookies[settings.SESSION_COOKIE_NAME].value}"
+        url = urlsplit(options['path'])
+
+        results = [
+            self.run_wsgi(url, cookie, options['requests'], options['concurrency'], options['wsgi_threads']),
+            self.run_asgi(url, cookie, options['requests'], options['concurrency']),
+        ]
+
+        self.stdout.write(f"{'handler':<8}{'req/s':>10}{'p50 s':>10}{'p90 s':>10}{'MB':>10}{'threads':>10}{'errors':>8}")
+        for name, seconds, latencies, size, threads, errors in results:
+            latencies.sort()
+            self.stdout.write(
+                f"{name:<8}{len(latencies) / seconds:>10.1f}{statistics.median(latencies):>10.3f}"
+                f"{latencies[int(len(latencies) * 0.9) - 1]:>10.3f}{size / 1e6:>10.1f}{threads:>10}{errors:>8}"
+            )
+
+    def run_wsgi(self, url, cookie, requests, concurrency, threads):
+        handler = WSGIHandler()
+        # Only `threads` requests run at once; the other clients wait in the queue
+        pool = ThreadPoolExecutor(max_workers=threads)
+        errors = []
+
+        def request(submitted):
+            status = []
+            environ = {
+                'REQUEST_METHOD': 'GET',
+                'PATH_INFO': url.path,
+                'QUERY_STRING': url.query,
+                'SERVER_NAME': HOST,
+                'SERVER_PORT': '80',
+                'HTTP_HOST': HOST,
+                'HTTP_COOKIE': cookie,
+                'wsgi.input': io.BytesIO(),
+                'wsgi.url_scheme': 'http',
+                'wsgi.errors': io.StringIO(),
+            }
+            response = handler(environ, lambda code, headers: status.append(code))
+            try:
+                size = sum(len(chunk) for chunk in response)
+            finally:
+                response.close()
+            if not status[0].startswith('200'):
+                errors.append(status[0])
+            return time.perf_counter() - submitted, size
+
+        def client_loop(count):
+            return [pool.submit(request, time.perf_counter()).result() for _ in range(count)]
+
+        with ThreadSampler() as sampler:
+            start = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=concurrency) as clients:
+                shares = [requests // concurrency + (i < requests % concurrency) for i in range(concurrency)]
+                done = [result for results in clients.map(client_loop, shares) for result in results]
+            seconds = time.perf_counter() - start
+        pool.shutdown()
+        # Client threads aren't server threads
+        return ('wsgi', seconds, [latency for latency, _ in done], sum(size for _, size in done),
+                min(sampler.peak - concurrency, threads + 1), len(errors))
+
+    def run_asgi(self, url, cookie, requests, concurrency):
+        handler = ASGIHandler()
+        errors = []
+
+        async def request(semaphore):
+            async with semaphore:
+                submitted = time.perf_counter()
+                scope = {
+                    'type': 'http',
+                    'asgi': {'version': '3.0'},
+                    'http_version': '1.1',
+                    'method': 'GET',
+                    'scheme': 'http',
+                    'path': url.path,
+                    'raw_path': url.path.encode(),
+                    'query_string': url.query.encode(),
+                    'headers': [(b'host', HOST.encode()), (b'cookie', cookie.encode())],
+                    'server': (HOST, 80),
+                    'client': ('127.0.0.1', 0),
+                }
+                sent = {'size': 0}
+                body_sent = asyncio.Event()
+
+                async def receive():
+                    if not sent.get('request'):
+                        sent['request'] = True
+                        return {'type': 'http.request', 'body': b'', 'more_body': False}
+                    # The client stays connected until the response is complete
+                    await body_sent.wait()
+                    return {'type': 'http.disconnect'}
+
+                async def send(message):
+                    if message['type'] == 'http.response.start' and message['status'] != 200:
+                        errors.append(message['status'])
+                    elif message['type'] == 'http.response.body':
+                        sent['size'] += len(message.get('body', b''))
+                        if not message.get('more_body'):
+                            body_sent.set()
+
+                await handler(scope, receive, send)
+                return time.perf_counter() - submitted, sent['size']
+
+        async def run():
+            semaphore = asyncio.Semaphore(concurrency)
+            return await asyncio.gather(*(request(semaphore) for _ in range(requests)))
+
+        with ThreadSampler() as sampler:
+            start = time.perf_counter()
+            done = asyncio.run(run())
+            seconds = time.perf_counter() - start
+        return ('asgi', seconds, [latency for latency, _ in done], sum(size for _, size in done),
+                sampler.peak - 1, len(errors))
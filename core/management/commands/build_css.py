@@ -0,0 +1,47 @@
+"""
+Build core/static/css/app.css from core/assets/tailwind.css.
+
+The stylesheet only holds the Tailwind classes found in the apps' templates
+and scripts, so rebuild it (and commit the result) after changing them:
+
+    python manage.py build_css
+    python manage.py build_css --watch
+
+Needs the standalone Tailwind CLI on PATH: `pip install tailwindcss-bin`
+or `npm install -g @tailwindcss/cli`.
+"""
+
+import shutil
+import subprocess
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+CORE_DIR = Path(__file__).resolve().parents[2]
+SOURCE = CORE_DIR / 'assets' / 'tailwind.css'
+OUTPUT = CORE_DIR / 'static' / 'css' / 'app.css'
+
+
+class Command(BaseCommand):
+    help = "Build the purged, minified Tailwind stylesheet served as css/app.css."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--watch', action='store_true', help="Rebuild whenever a template or script changes.")
+        parser.add_argument('--no-minify', action='store_true', help="Keep the output readable.")
+
+    def handle(self, *args, **options):
+        binary = shutil.which('tailwindcss')
+        if binary is None:
+            raise CommandError(
+                "The tailwindcss CLI was not found; install it with `pip install tailwindcss-bin`."
+            )
+        command = [binary, '--input', str(SOURCE), '--output', str(OUTPUT)]
+        if not options['no_minify']:
+            command.append('--minify')
+        if options['watch']:
+            command.append('--watch')
+        try:
+            subprocess.run(command, check=True)
+        except subprocess.CalledProcessError as exc:
+            raise CommandError(f"tailwindcss exited with status {exc.returncode}.")
+        self.stdout.write(self.style.SUCCESS(f"Built {OUTPUT.relative_to(CORE_DIR.parent)} ({OUTPUT.stat().st_size} bytes)."))
@@ -0,0 +1,21 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from core.jobs import fail_stale_jobs
+
+
+class Command(BaseCommand):
+    help = (
+        "Mark import jobs left pending or running by a stopped process as failed. "
+        "Meant to run at deploy time and from cron."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--minutes', type=int, default=getattr(settings, 'IMPORT_JOB_STALE_MINUTES', 30),
+            help="Fail jobs that reported no progress for this many minutes.",
+        )
+
+    def handle(self, *args, **options):
+        failed = fail_stale_jobs(options['minutes'])
+        self.stdout.write(self.style.SUCCESS(f"Marked {failed} stale import jobs as failed."))
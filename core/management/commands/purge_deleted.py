@@ -0,0 +1,72 @@
+import time
+from datetime import timedelta
+
+from django.apps import apps
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from core.models import SoftDeleteModel
+
+
+def soft_delete_models():
+    return [model for model in apps.get_models() if issubclass(model, SoftDeleteModel)]
+
+
+class Command(BaseCommand):
+    help = (
+        "Permanently delete rows soft-deleted more than --days ago, a small batch per "
+        "transaction so the table is never locked for long. Meant to run from cron."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'models', nargs='*',
+            help="Models to purge as app_label.ModelName (default: all soft-deletable models).",
+        )
+        parser.add_argument(
+            '--days', type=int, default=getattr(settings, 'SOFT_DELETE_RETENTION_DAYS', 30),
+            help="Keep rows deleted less than this many days ago (they can still be restored).",
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=getattr(settings, 'PURGE_BATCH_SIZE', 500),
+            help="Rows deleted per transaction.",
+        )
+        parser.add_argument(
+            '--pause', type=float, default=0.1,
+            help="Seconds to wait between batches, letting other writers in.",
+        )
+
+    def handle(self, *args, **options):
+        models = []
+        for label in options['models']:
+            try:
+                model = apps.get_model(label)
+            except (LookupError, ValueError) as exc:
+                raise CommandError(str(exc))
+            if not issubclass(model, SoftDeleteModel):
+                raise CommandError(f"{label} is not soft-deletable.")
+            models.append(model)
+
+        cutoff = timezone.now() - timedelta(days=options['days'])
+        for model in models or soft_delete_models():
+            purged = 0
+            while True:
+                # Served by the partial index on deleted_at
+                pks = list(
+                    model.all_objects.filter(is_deleted=True, deleted_at__lt=cutoff)
+                    .order_by('deleted_at').values_list('pk', flat=True)[:options['batch_size']]
+                )
+                if not pks:
+                    break
+                with transaction.atomic():
+                    # Re-checked: a row restored since the SELECT above is kept
+                    _, deleted = model.all_objects.filter(
+                        pk__in=pks, is_deleted=True, deleted_at__lt=cutoff,
+                    ).delete()
+                purged += deleted.get(model._meta.label, 0)
+                if options['pause']:
+                    time.sleep(options['pause'])
+            self.stdout.write(f"Purged {purged} {model._meta.verbose_name_plural}.")
+        self.stdout.write(self.style.SUCCESS("Soft-deleted rows purged."))
@@ -0,0 +1,30 @@
+from django.apps import apps
+from django.core.management.base import BaseCommand, CommandError
+
+from core import counters
+
+
+class Command(BaseCommand):
+    help = "Recompute the dashboard KPI counters from the tracked tables."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'models', nargs='*',
+            help="Models to rebuild as app_label.ModelName (default: all tracked models).",
+        )
+
+    def handle(self, *args, **options):
+        models = []
+        for label in options['models']:
+            try:
+                model = apps.get_model(label)
+            except (LookupError, ValueError) as exc:
+                raise CommandError(str(exc))
+            if model not in counters.tracked_models():
+                raise CommandError(f"{label} has no KPI counters.")
+            models.append(model)
+
+        for model in models or counters.tracked_models():
+            counters.rebuild(model)
+            self.stdout.write(f"Rebuilt counters for {model._meta.label}.")
+        self.stdout.write(self.style.SUCCESS("KPI counters rebuilt."))
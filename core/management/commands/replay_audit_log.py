@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from core import audit
+
+
+class Command(BaseCommand):
+    help = "Load the change records spilled to the audit fallback file into the database."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--file',
+            help="Fallback file to replay (default: settings.AUDIT_FALLBACK_FILE).",
+        )
+
+    def handle(self, *args, **options):
+        count = audit.replay(options['file'])
+        self.stdout.write(self.style.SUCCESS(f"Replayed {count} change records."))
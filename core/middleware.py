@@ -0,0 +1,249 @@
+from contextlib import ExitStack
+import json
+import mimetypes
+import os
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.http import FileResponse, HttpResponse, HttpResponseNotModified
+from django.utils.http import http_date
+from django.views.static import was_modified_since
+
+from . import audit, instrumentation, routers
+
+
+class InstrumentationMiddleware:
+    """
+    Record query count, SQL time, template time and response size per view.
+
+    Enabled with settings.INSTRUMENTATION_ENABLED; set
+    INSTRUMENTATION_SERVER_TIMING to also return the numbers in a
+    Server-Timing header. Aggregates are served by core.views.instrumentation_view.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'INSTRUMENTATION_ENABLED', False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.server_timing = getattr(settings, 'INSTRUMENTATION_SERVER_TIMING', False)
+        instrumentation.instrument_templates()
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        metrics, token = instrumentation.start()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(metrics))
+                response = self.get_response(request)
+        finally:
+            instrumentation.finish(token)
+        return self.process_metrics(request, response, metrics)
+
+    async def __acall__(self, request):
+        metrics, token = instrumentation.start()
+        try:
+            # Connections are context-local, so sync_to_async threads of this request see the wrappers
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(metrics))
+                response = await self.get_response(request)
+        finally:
+            instrumentation.finish(token)
+        return self.process_metrics(request, response, metrics)
+
+    def process_metrics(self, request, response, metrics):
+        metrics.duration = time.perf_counter() - metrics.started
+        match = getattr(request, 'resolver_match', None)
+        metrics.view_name = match.view_name if match else 'unresolved'
+        if not response.streaming:
+            metrics.response_size = len(response.content)
+
+        instrumentation.record(metrics)
+        if self.server_timing:
+            response['Server-Timing'] = instrumentation.server_timing(metrics)
+        return response
+
+
+class ReplicaPinMiddleware:
+    """
+    Pin a client to the primary database for a few seconds after it writes.
+
+    Any unsafe request (POST, PUT, PATCH, DELETE) sets a short-lived cookie
+    that core.routers.use_replica checks, so the next pages read from
+    'default' until the replicas have caught up.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not routers.replicas():
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.pin_seconds = getattr(settings, 'REPLICA_PIN_SECONDS', 5)
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        return self.pin(request, self.get_response(request))
+
+    async def __acall__(self, request):
+        return self.pin(request, await self.get_response(request))
+
+    def pin(self, request, response):
+        if request.method not in ('GET', 'HEAD', 'OPTIONS', 'TRACE'):
+            response.set_cookie(routers.PIN_COOKIE, '1', max_age=self.pin_seconds, httponly=True, samesite='Lax')
+        return response
+
+
+class AuditMiddleware:
+    """
+    Attribute the changes a request makes to its user in the change history.
+
+    Must come after AuthenticationMiddleware; see core.audit.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        with audit.request_actor(request):
+            return self.get_response(request)
+
+    async def __acall__(self, request):
+        with audit.request_actor(request):
+            return await self.get_response(request)
+
+
+class StaticFilesMiddleware:
+    """
+    Serve the files collected in STATIC_ROOT before the rest of the stack runs.
+
+    Files listed under their content-hashed name in the collectstatic
+    manifest never change, so they are sent with a one-year immutable
+    Cache-Control; other files get STATIC_MAX_AGE. The .br/.gz copies
+    written by core.storage are sent to clients whose Accept-Encoding allows
+    them (q=0 refuses an encoding), and files are streamed, never read whole
+    into memory. The file list is read once at startup: restart after collectstatic.
+
+    Off in DEBUG (runserver serves the app directories) and when STATIC_ROOT
+    has not been collected.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    IMMUTABLE = 'public, max-age=31536000, immutable'
+    # Preferred first
+    ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+
+    def __init__(self, get_response):
+        root = getattr(settings, 'STATIC_ROOT', None)
+        if settings.DEBUG or not getattr(settings, 'STATIC_SERVE', True) or not root or not os.path.isdir(root):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.prefix = '/' + settings.STATIC_URL.lstrip('/')
+        self.max_age = f"public, max-age={getattr(settings, 'STATIC_MAX_AGE', 60)}"
+        self.files, self.immutable = self.index(root)
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    @staticmethod
+    def index(root):
+        """Map every collected file's name to its path, and find the hashed names."""
+        files = {}
+        for directory, _, filenames in os.walk(root):
+            for filename in filenames:
+                path = os.path.join(directory, filename)
+                files[os.path.relpath(path, root).replace(os.sep, '/')] = path
+        immutable = set()
+        manifest = files.get(ManifestStaticFilesStorage.manifest_name)
+        if manifest is not None:
+            with open(manifest, encoding='utf-8') as handle:
+                immutable.update(json.load(handle).get('paths', {}).values())
+        return files, immutable
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        return self.serve(request) or self.get_response(request)
+
+    async def __acall__(self, request):
+        return self.serve(request) or await self.get_response(request)
+
+    def serve(self, request):
+        """Return the response for a collected file, or None to let the request through."""
+        if request.method not in ('GET', 'HEAD') or not request.path_info.startswith(self.prefix):
+            return None
+        name = request.path_info[len(self.prefix):]
+        path = self.files.get(name)
+        if path is None:
+            return None
+
+        stat = os.stat(path)
+        headers = {
+            'Cache-Control': self.IMMUTABLE if name in self.immutable else self.max_age,
+            'Last-Modified': http_date(stat.st_mtime),
+            'Vary': 'Accept-Encoding',
+            'X-Content-Type-Options': 'nosniff',
+        }
+        if not was_modified_since(request.META.get('HTTP_IF_MODIFIED_SINCE'), stat.st_mtime):
+            return HttpResponseNotModified(headers=headers)
+
+        content_type, _ = mimetypes.guess_type(name)
+        content_type = content_type or 'application/octet-stream'
+        if content_type.startswith('text/') or content_type in ('application/javascript', 'image/svg+xml'):
+            content_type += '; charset=utf-8'
+        accepted = self.accepted_encodings(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+        for encoding, extension in self.ENCODINGS:
+            if accepted.get(encoding, accepted.get('*', 0)) > 0 and name + extension in self.files:
+                path = self.files[name + extension]
+                headers['Content-Encoding'] = encoding
+                break
+
+        if request.method == 'HEAD':
+            headers['Content-Length'] = os.path.getsize(path)
+            return HttpResponse(content_type=content_type, headers=headers)
+        response = FileResponse(open(path, 'rb'), content_type=content_type, headers=headers)
+        # Not a download: FileResponse would name the .br/.gz copy
+        del response['Content-Disposition']
+        return response
+
+    @staticmethod
+    def accepted_encodings(header):
+        """Map each coding of an Accept-Encoding header to its q-value."""
+        accepted = {}
+        for item in header.split(','):
+            coding, *params = [part.strip() for part in item.split(';')]
+            if not coding:
+                continue
+            q = 1.0
+            for param in params:
+                key, _, value = param.partition('=')
+                if key.strip().lower() == 'q':
+                    try:
+                        q = float(value)
+                    except ValueError:
+                        q = 0.0
+            accepted[coding.lower()] = q
+        return accepted
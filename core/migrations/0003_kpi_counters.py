@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0002_import_job_upsert'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='KpiCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('model_label', models.CharField(max_length=100, verbose_name='Model')),
+                ('dimension', models.CharField(max_length=50, verbose_name='Dimension')),
+                ('value', models.CharField(blank=True, max_length=150, verbose_name='Value')),
+                ('count', models.BigIntegerField(default=0, verbose_name='Count')),
+            ],
+            options={
+                'verbose_name': 'KPI counter',
+                'verbose_name_plural': 'KPI counters',
+                'constraints': [models.UniqueConstraint(fields=('model_label', 'dimension', 'value'), name='kpi_counter_unique')],
+            },
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:29
+
+import django.core.serializers.json
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0003_kpi_counters'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ChangeRecord',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('model_label', models.CharField(max_length=100, verbose_name='Model')),
+                ('object_pk', models.CharField(max_length=64, verbose_name='Object ID')),
+                ('action', models.CharField(choices=[('create', 'Created'), ('update', 'Updated'), ('delete', 'Deleted')], max_length=10, verbose_name='Action')),
+                ('changes', models.JSONField(blank=True, default=dict, encoder=django.core.serializers.json.DjangoJSONEncoder, verbose_name='Changes')),
+                ('changed_at', models.DateTimeField(verbose_name='Changed at')),
+                ('user', models.ForeignKey(blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'change record',
+                'verbose_name_plural': 'change records',
+                'ordering': ['-changed_at'],
+                'indexes': [models.Index(fields=['model_label', 'object_pk'], name='change_record_object'), models.Index(fields=['changed_at'], name='change_record_changed_at')],
+            },
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0004_change_records'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Lookup',
+            fields=[
+                ('id', models.SmallAutoField(primary_key=True, serialize=False)),
+                ('kind', models.CharField(choices=[('status', 'Status'), ('unit', 'Unit measure'), ('material_type', 'Material type'), ('category', 'Category'), ('payment_terms', 'Payment terms'), ('currency', 'Currency'), ('payment_method', 'Payment method')], max_length=30, verbose_name='Kind')),
+                ('name', models.CharField(max_length=150, verbose_name='Name')),
+            ],
+            options={
+                'verbose_name': 'lookup value',
+                'verbose_name_plural': 'lookup values',
+                'ordering': ['kind', 'name'],
+                'constraints': [models.UniqueConstraint(fields=('kind', 'name'), name='lookup_kind_name_unique')],
+            },
+        ),
+    ]
@@ -0,0 +1,36 @@
+from django.db import migrations
+
+# Starting values of each kind, so the selects of the forms aren't empty on
+# a new database. Kinds that already have values (converted from existing
+# rows) are left alone; values are renamed or added in the admin.
+DEFAULTS = {
+    'status': ['Active', 'Inactive'],
+    'unit': ['Unit', 'kg', 'g', 't', 'l', 'ml', 'm', 'm2', 'm3'],
+    'material_type': ['Raw material', 'Component', 'Consumable', 'Packaging', 'Finished good'],
+    'category': ['General', 'Goods', 'Services'],
+    'payment_terms': ['Immediate', '15 days', '30 days', '60 days', '90 days'],
+    'currency': ['USD', 'EUR'],
+    'payment_method': ['Transfer', 'Cash', 'Check', 'Card'],
+}
+
+
+def seed(apps, schema_editor):
+    lookup = apps.get_model('core', 'Lookup')
+    existing = set(lookup.objects.values_list('kind', flat=True).distinct())
+    lookup.objects.bulk_create([
+        lookup(kind=kind, name=name)
+        for kind, names in DEFAULTS.items() if kind not in existing
+        for name in names
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_lookups'),
+    ]
+
+    # Not reversed: the values may be referenced by rows
+    operations = [
+        migrations.RunPython(seed, migrations.RunPython.noop),
+    ]
@@ -1,3 +1,264 @@
-from django.db import models
+import uuid
 
-# Create your models here.
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import models, transaction
+from django.utils import timezone
+
+from .signals import restored, soft_deleted
+
+
+class ImportJob(models.Model):
+    STATUS_PENDING = 'pending'
+    STATUS_RUNNING = 'running'
+    STATUS_DONE = 'done'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = [
+        (STATUS_PENDING, 'Pending'),
+        (STATUS_RUNNING, 'Running'),
+        (STATUS_DONE, 'Done'),
+        (STATUS_FAILED, 'Failed'),
+    ]
+
+    MODE_INSERT = 'insert'
+    MODE_UPSERT = 'upsert'
+    MODE_CHOICES = [
+        (MODE_INSERT, 'Create new records only'),
+        (MODE_UPSERT, 'Create new and update existing records'),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    kind = models.CharField(max_length=50, verbose_name="Kind")
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=STATUS_PENDING, verbose_name="Status")
+    mode = models.CharField(max_length=20, choices=MODE_CHOICES, default=MODE_INSERT, verbose_name="Mode")
+    file_path = models.CharField(max_length=255, verbose_name="Spooled file")
+    file_name = models.CharField(max_length=255, blank=True, verbose_name="Original file name")
+    processed_rows = models.IntegerField(default=0, verbose_name="Processed rows")
+    created_count = models.IntegerField(default=0, verbose_name="Created")
+    updated_count = models.IntegerField(default=0, verbose_name="Updated")
+    unchanged_count = models.IntegerField(default=0, verbose_name="Unchanged")
+    error_count = models.IntegerField(default=0, verbose_name="Rows with errors")
+    error_records = models.JSONField(default=list, blank=True, verbose_name="Error report")
+    message = models.TextField(blank=True, verbose_name="Message")
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    created_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True)
+
+    class Meta:
+        verbose_name = "Import job"
+        verbose_name_plural = "Import jobs"
+
+    def __str__(self):
+        return f"{self.kind} import {self.pk} ({self.status})"
+
+    @property
+    def is_finished(self):
+        return self.status in (self.STATUS_DONE, self.STATUS_FAILED)
+
+    def as_dict(self):
+        return {
+            'id': str(self.pk),
+            'kind': self.kind,
+            'status': self.status,
+            'mode': self.mode,
+            'file_name': self.file_name,
+            'processed_rows': self.processed_rows,
+            'created_count': self.created_count,
+            'updated_count': self.updated_count,
+            'unchanged_count': self.unchanged_count,
+            'error_count': self.error_count,
+            'error_records': self.error_records if self.is_finished else [],
+            'message': self.message,
+            'finished': self.is_finished,
+        }
+
+
+class KpiCounter(models.Model):
+    model_label = models.CharField(max_length=100, verbose_name="Model")
+    dimension = models.CharField(max_length=50, verbose_name="Dimension")
+    value = models.CharField(max_length=150, blank=True, verbose_name="Value")
+    count = models.BigIntegerField(default=0, verbose_name="Count")
+
+    class Meta:
+        verbose_name = "KPI counter"
+        verbose_name_plural = "KPI counters"
+        constraints = [
+            models.UniqueConstraint(fields=['model_label', 'dimension', 'value'], name='kpi_counter_unique'),
+        ]
+
+    def __str__(self):
+        return f"{self.model_label}.{self.dimension}={self.value}: {self.count}"
+
+
+class ChangeRecord(models.Model):
+    ACTION_CREATE = 'create'
+    ACTION_UPDATE = 'update'
+    ACTION_DELETE = 'delete'
+    ACTION_CHOICES = [
+        (ACTION_CREATE, 'Created'),
+        (ACTION_UPDATE, 'Updated'),
+        (ACTION_DELETE, 'Deleted'),
+    ]
+
+    model_label = models.CharField(max_length=100, verbose_name="Model")
+    object_pk = models.CharField(max_length=64, verbose_name="Object ID")
+    action = models.CharField(max_length=10, choices=ACTION_CHOICES, verbose_name="Action")
+    # {field: [old, new]}; old is None on create, new is None on delete
+    changes = models.JSONField(default=dict, blank=True, encoder=DjangoJSONEncoder, verbose_name="Changes")
+    # No FK constraint: records are written later and the user may be gone by then
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True, db_constraint=False,
+    )
+    # When the change was made, not when the buffered record was written
+    changed_at = models.DateTimeField(verbose_name="Changed at")
+
+    class Meta:
+        verbose_name = "change record"
+        verbose_name_plural = "change records"
+        ordering = ['-changed_at']
+        indexes = [
+            models.Index(fields=['model_label', 'object_pk'], name='change_record_object'),
+            models.Index(fields=['changed_at'], name='change_record_changed_at'),
+        ]
+
+    def __str__(self):
+        return f"{self.action} {self.model_label} {self.object_pk}"
+
+
+class LookupQuerySet(models.QuerySet):
+
+    def delete(self):
+        from .lookups import protect
+
+        # Checked before deleting, like on_delete=PROTECT
+        protect(self)
+        return super().delete()
+
+
+class Lookup(models.Model):
+    """
+    One value of a small enumeration (a status, a unit, a currency...).
+
+    Records store the id in a core.lookups.LookupField, a small integer,
+    instead of repeating the name in every row, so values still stored by a
+    row can't be deleted. See core/lookups.py.
+    """
+
+    KIND_STATUS = 'status'
+    KIND_UNIT = 'unit'
+    KIND_MATERIAL_TYPE = 'material_type'
+    KIND_CATEGORY = 'category'
+    KIND_PAYMENT_TERMS = 'payment_terms'
+    KIND_CURRENCY = 'currency'
+    KIND_PAYMENT_METHOD = 'payment_method'
+    KIND_CHOICES = [
+        (KIND_STATUS, 'Status'),
+        (KIND_UNIT, 'Unit measure'),
+        (KIND_MATERIAL_TYPE, 'Material type'),
+        (KIND_CATEGORY, 'Category'),
+        (KIND_PAYMENT_TERMS, 'Payment terms'),
+        (KIND_CURRENCY, 'Currency'),
+        (KIND_PAYMENT_METHOD, 'Payment method'),
+    ]
+
+    id = models.SmallAutoField(primary_key=True)
+    kind = models.CharField(max_length=30, choices=KIND_CHOICES, verbose_name="Kind")
+    name = models.CharField(max_length=150, verbose_name="Name")
+
+    objects = LookupQuerySet.as_manager()
+
+    class Meta:
+        verbose_name = "lookup value"
+        verbose_name_plural = "lookup values"
+        ordering = ['kind', 'name']
+        constraints = [
+            models.UniqueConstraint(fields=['kind', 'name'], name='lookup_kind_name_unique'),
+        ]
+
+    def __str__(self):
+        return self.name
+
+    def delete(self, *args, **kwargs):
+        from .lookups import protect
+
+        protect([self])
+        return super().delete(*args, **kwargs)
+
+
+class SoftDeleteQuerySet(models.QuerySet):
+
+    def _flag(self, deleted, signal):
+        instances = list(self.filter(is_deleted=not deleted))
+        if not instances:
+            return 0
+        deleted_at = timezone.now() if deleted else None
+        with transaction.atomic():
+            self.model.all_objects.filter(pk__in=[instance.pk for instance in instances]).update(
+                is_deleted=deleted, deleted_at=deleted_at,
+            )
+            for instance in instances:
+                instance.is_deleted = deleted
+                instance.deleted_at = deleted_at
+            signal.send(sender=self.model, instances=instances)
+        return len(instances)
+
+    def soft_delete(self):
+        """Flag the rows as deleted with a single UPDATE and return how many were."""
+        return self._flag(True, soft_deleted)
+
+    def restore(self):
+        """Undo soft_delete() and return the number of rows restored."""
+        return self._flag(False, restored)
+
+
+class LiveManager(models.Manager.from_queryset(SoftDeleteQuerySet)):
+    """Manager hiding soft-deleted rows."""
+
+    def get_queryset(self):
+        return super().get_queryset().filter(is_deleted=False)
+
+
+class SoftDeleteModel(models.Model):
+    """
+    Abstract model whose rows are flagged as deleted instead of being removed.
+
+    `objects` only returns live rows, `all_objects` returns every row.
+    Deleted rows keep their unique values until `manage.py purge_deleted`
+    removes them, so a deleted record can be restored.
+    """
+
+    is_deleted = models.BooleanField(default=False, editable=False, verbose_name="Deleted")
+    deleted_at = models.DateTimeField(null=True, blank=True, editable=False, verbose_name="Deleted at")
+
+    objects = LiveManager()
+    all_objects = SoftDeleteQuerySet.as_manager()
+
+    class Meta:
+        abstract = True
+
+    def soft_delete(self):
+        return type(self).all_objects.filter(pk=self.pk).soft_delete()
+
+    def restore(self):
+        return type(self).all_objects.filter(pk=self.pk).restore()
+
+    def validate_unique(self, exclude=None):
+        super().validate_unique(exclude)
+        # The default manager used by the checks above doesn't see deleted rows
+        errors = {}
+        for field in self._meta.fields:
+            if not field.unique or field.primary_key or (exclude and field.name in exclude):
+                continue
+            value = getattr(self, field.attname)
+            if value is None:
+                continue
+            taken = type(self).all_objects.filter(is_deleted=True, **{field.attname: value}).exclude(pk=self.pk)
+            if taken.exists():
+                errors[field.name] = [
+                    f"A deleted {self._meta.verbose_name} with this {field.verbose_name} exists; restore it instead."
+                ]
+        if errors:
+            raise ValidationError(errors)
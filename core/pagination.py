@@ -0,0 +1,174 @@
+"""
+Pagination helpers shared by the list views.
+
+Two modes are available:
+
+- Offset mode (default): Django's Paginator with a cached row count and a
+  windowed page-link range, so templates don't render one link per page.
+- Keyset mode (opt-in): pages are addressed by the primary key of the first
+  or last row shown (?after=<pk> / ?before=<pk>), which an index answers
+  directly, so a deep page costs the same as the first one. The total shown
+  in the template is an approximate, cached count.
+
+Keyset mode is used when settings.KEYSET_PAGINATION is True or when the
+request already carries a cursor.
+"""
+
+import hashlib
+import math
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import EmptyResultSet
+from django.core.paginator import Paginator
+from django.utils.functional import cached_property
+
+from .generations import get_generation
+
+
+def cached_count(queryset, timeout=None):
+    """
+    Return queryset.count(), cached for a short time.
+
+    The key is derived from the SQL of the queryset, so every filter
+    combination gets its own entry, and from the generation of the model
+    (see core.generations), so writes to it invalidate the counts at once.
+    """
+    if timeout is None:
+        timeout = getattr(settings, 'PAGINATION_COUNT_TIMEOUT', 60)
+    try:
+        sql = str(queryset.query).encode('utf-8')
+    except EmptyResultSet:
+        # queryset.none(), e.g. a filter on a lookup value that doesn't exist
+        return 0
+    generation = get_generation(queryset.model)
+    key = f'count:{queryset.db}:{queryset.model._meta.label_lower}:{generation}:{hashlib.md5(sql).hexdigest()}'
+    count = cache.get(key)
+    if count is None:
+        count = queryset.count()
+        cache.set(key, count, timeout)
+    return count
+
+
+class CachedCountPaginator(Paginator):
+    """Paginator whose COUNT(*) is served from the cache when possible."""
+
+    @cached_property
+    def count(self):
+        return cached_count(self.object_list)
+
+
+class KeysetPage:
+    """A page of a KeysetPaginator, exposing the attributes the templates use."""
+
+    is_keyset = True
+
+    def __init__(self, object_list, number, paginator, has_previous, has_next, key):
+        self.object_list = object_list
+        self.number = number
+        self.paginator = paginator
+        self._has_previous = has_previous
+        self._has_next = has_next
+        self._key = key
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def has_previous(self):
+        return self._has_previous
+
+    def has_next(self):
+        return self._has_next
+
+    def has_other_pages(self):
+        return self._has_previous or self._has_next
+
+    def previous_page_number(self):
+        return max(self.number - 1, 1)
+
+    def next_page_number(self):
+        return self.number + 1
+
+    @property
+    def start_cursor(self):
+        return getattr(self.object_list[0], self._key) if self.object_list else None
+
+    @property
+    def end_cursor(self):
+        return getattr(self.object_list[-1], self._key) if self.object_list else None
+
+
+class KeysetPaginator:
+    """
+    Paginate a queryset by seeking on an indexed, unique key.
+
+    Args:
+        object_list: QuerySet to paginate
+        per_page: Rows per page
+        key: Unique, indexed field to order and seek on (default 'pk')
+    """
+
+    def __init__(self, object_list, per_page, key='pk'):
+        self.object_list = object_list
+        self.per_page = per_page
+        self.key = key
+
+    @cached_property
+    def count(self):
+        return cached_count(self.object_list)
+
+    @cached_property
+    def num_pages(self):
+        return max(math.ceil(self.count / self.per_page), 1)
+
+    def page(self, after=None, before=None, number=1):
+        """Return the page following `after`, preceding `before`, or the first one."""
+        queryset = self.object_list
+        if before is not None:
+            rows = list(queryset.filter(**{f'{self.key}__lt': before}).order_by(f'-{self.key}')[:self.per_page + 1])
+            has_previous = len(rows) > self.per_page
+            rows = rows[:self.per_page][::-1]
+            has_next = True
+        else:
+            if after is not None:
+                queryset = queryset.filter(**{f'{self.key}__gt': after})
+            rows = list(queryset.order_by(self.key)[:self.per_page + 1])
+            has_next = len(rows) > self.per_page
+            rows = rows[:self.per_page]
+            has_previous = after is not None
+
+        if not has_previous:
+            number = 1
+        return KeysetPage(rows, number, self, has_previous, has_next, self.key)
+
+
+def _int_param(request, name):
+    try:
+        return int(request.GET.get(name))
+    except (TypeError, ValueError):
+        return None
+
+
+def paginate(request, queryset, per_page=10):
+    """
+    Return the requested page of a queryset, in offset or keyset mode.
+
+    Offset pages get a `page_links` attribute with a windowed page range
+    (with Paginator.ELLIPSIS gaps) for the template to render.
+    """
+    after = _int_param(request, 'after')
+    before = _int_param(request, 'before')
+    keyset = getattr(settings, 'KEYSET_PAGINATION', False) or after is not None or before is not None
+
+    if keyset:
+        paginator = KeysetPaginator(queryset, per_page)
+        return paginator.page(after=after, before=before, number=_int_param(request, 'page') or 1)
+
+    paginator = CachedCountPaginator(queryset.order_by('pk'), per_page)
+    page_obj = paginator.get_page(request.GET.get('page'))
+    page_obj.is_keyset = False
+    page_obj.page_links = list(paginator.get_elided_page_range(page_obj.number, on_each_side=2, on_ends=1))
+    return page_obj
@@ -0,0 +1,79 @@
+"""
+Read-replica routing.
+
+Views decorated with @use_replica send their reads to one of the aliases in
+settings.DATABASE_REPLICAS, chosen once per request so all the queries of a
+page (its count and its rows, say) see the same replica. Only the models in
+settings.REPLICA_READ_MODELS are read there: sessions, users, roles and
+import jobs must not lag behind, so they, everything else and every write
+use 'default'. A client that has just written something
+is pinned to 'default' for settings.REPLICA_PIN_SECONDS (see
+core.middleware.ReplicaPinMiddleware) so it reads its own writes despite
+replication lag.
+"""
+
+import contextvars
+import random
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+
+PIN_COOKIE = 'pin_primary'
+
+# Alias the current request reads from, or None for 'default'
+_read_replica = contextvars.ContextVar('read_replica', default=None)
+
+
+def replicas():
+    return getattr(settings, 'DATABASE_REPLICAS', [])
+
+
+def is_pinned(request):
+    return PIN_COOKIE in request.COOKIES
+
+
+def choose_replica(request):
+    if replicas() and not is_pinned(request):
+        return random.choice(replicas())
+    return None
+
+
+def use_replica(view):
+    """Route the reads of a read-only view to a replica, unless the client is pinned."""
+    if iscoroutinefunction(view):
+        @wraps(view)
+        async def wrapper(request, *args, **kwargs):
+            token = _read_replica.set(choose_replica(request))
+            try:
+                return await view(request, *args, **kwargs)
+            finally:
+                _read_replica.reset(token)
+    else:
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            token = _read_replica.set(choose_replica(request))
+            try:
+                return view(request, *args, **kwargs)
+            finally:
+                _read_replica.reset(token)
+    return wrapper
+
+
+class ReplicaRouter:
+
+    def db_for_read(self, model, **hints):
+        alias = _read_replica.get()
+        if alias and model._meta.label in getattr(settings, 'REPLICA_READ_MODELS', ()):
+            return alias
+        return None
+
+    def db_for_write(self, model, **hints):
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same data as 'default'
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return None
@@ -0,0 +1,155 @@
+"""
+Index-backed free-text search for the list filters.
+
+The list filters match substrings (`icontains`), which a regular B-tree index
+can't answer, so each searchable table gets a trigram index instead:
+
+- SQLite: an external-content FTS5 table using the trigram tokenizer
+  (`<table>_fts`), kept in sync with the base table by triggers, so rows
+  written with bulk_create() or queryset.update() are indexed as well.
+- PostgreSQL: a pg_trgm GIN index on UPPER(column), which is the expression
+  Django generates for `icontains`, so the ORM lookup uses it directly.
+
+Models list their indexed columns in a SEARCH_FIELDS class attribute; the
+migrations that create the indexes call create_search_index() and
+drop_search_index() with the same list.
+"""
+
+from django.db import connections
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+
+# Trigram indexes can only answer terms of at least this many characters
+MIN_TERM_LENGTH = 3
+
+_fts_tables = {}
+
+
+def _fts_table(table):
+    return f'{table}_fts'
+
+
+def create_search_index(schema_editor, table, fields):
+    """Create the trigram index for `fields` of `table` (used from migrations)."""
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        fts = _fts_table(table)
+        columns = ', '.join(fields)
+        new_values = ', '.join(f'new.{field}' for field in fields)
+        old_values = ', '.join(f'old.{field}' for field in fields)
+        schema_editor.execute(
+            f"CREATE VIRTUAL TABLE {fts} USING fts5({columns}, content='{table}', "
+            f"content_rowid='id', tokenize='trigram')"
+        )
+        schema_editor.execute(
+            f"CREATE TRIGGER {fts}_ai AFTER INSERT ON {table} BEGIN "
+            f"INSERT INTO {fts}(rowid, {columns}) VALUES (new.id, {new_values}); END"
+        )
+        schema_editor.execute(
+            f"CREATE TRIGGER {fts}_ad AFTER DELETE ON {table} BEGIN "
+            f"INSERT INTO {fts}({fts}, rowid, {columns}) VALUES ('delete', old.id, {old_values}); END"
+        )
+        schema_editor.execute(
+            f"CREATE TRIGGER {fts}_au AFTER UPDATE OF {columns} ON {table} BEGIN "
+            f"INSERT INTO {fts}({fts}, rowid, {columns}) VALUES ('delete', old.id, {old_values}); "
+            f"INSERT INTO {fts}(rowid, {columns}) VALUES (new.id, {new_values}); END"
+        )
+        schema_editor.execute(f"INSERT INTO {fts}({fts}) VALUES ('rebuild')")
+    elif vendor == 'postgresql':
+        schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+        for field in fields:
+            schema_editor.execute(
+                f'CREATE INDEX IF NOT EXISTS {table}_{field}_trgm ON {table} '
+                f'USING gin (UPPER({field}) gin_trgm_ops)'
+            )
+    _fts_tables.clear()
+
+
+def drop_search_index(schema_editor, table, fields):
+    """Drop the trigram index created by create_search_index()."""
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        fts = _fts_table(table)
+        for suffix in ('ai', 'ad', 'au'):
+            schema_editor.execute(f'DROP TRIGGER IF EXISTS {fts}_{suffix}')
+        schema_editor.execute(f'DROP TABLE IF EXISTS {fts}')
+    elif vendor == 'postgresql':
+        for field in fields:
+            schema_editor.execute(f'DROP INDEX IF EXISTS {table}_{field}_trgm')
+    _fts_tables.clear()
+
+
+def has_fts_table(alias, table):
+    """Return True if the FTS5 shadow table of `table` exists in database `alias`."""
+    key = (alias, table)
+    if key not in _fts_tables:
+        connection = connections[alias]
+        _fts_tables[key] = (
+            connection.vendor == 'sqlite'
+            and _fts_table(table) in connection.introspection.table_names()
+        )
+    return _fts_tables[key]
+
+
+def _quote(term):
+    return '"' + term.replace('"', '""') + '"'
+
+
+def search(queryset, terms):
+    """
+    Filter a queryset by substring matches, using the trigram index when possible.
+
+    Args:
+        queryset: QuerySet to filter
+        terms: Dict mapping field names to search terms; empty terms are ignored
+
+    Terms on fields listed in the model's SEARCH_FIELDS are combined into a
+    single FTS5 MATCH on SQLite. Everything else, including terms shorter than
+    a trigram, falls back to `icontains` (which PostgreSQL serves from its
+    trigram indexes).
+    """
+    model = queryset.model
+    indexed = getattr(model, 'SEARCH_FIELDS', ())
+    use_fts = has_fts_table(queryset.db, model._meta.db_table)
+
+    match = []
+    for field, term in terms.items():
+        if not term:
+            continue
+        if use_fts and field in indexed and len(term) >= MIN_TERM_LENGTH:
+            match.append(f'{field} : {_quote(term)}')
+        else:
+            queryset = queryset.filter(**{f'{field}__icontains': term})
+
+    if match:
+        fts = _fts_table(model._meta.db_table)
+        queryset = queryset.filter(pk__in=RawSQL(
+            f'SELECT rowid FROM {fts} WHERE {fts} MATCH %s', [' AND '.join(match)]
+        ))
+    return queryset
+
+
+def search_any(queryset, fields, term):
+    """
+    Filter a queryset to rows where any of `fields` contains `term`, from the trigram index only.
+
+    Only fields in the model's SEARCH_FIELDS are searched. Returns None when
+    the index can't answer (term shorter than a trigram, no indexed field,
+    no index on this database) rather than scanning the table.
+    """
+    model = queryset.model
+    fields = [field for field in fields if field in getattr(model, 'SEARCH_FIELDS', ())]
+    if not fields or len(term) < MIN_TERM_LENGTH:
+        return None
+    vendor = connections[queryset.db].vendor
+    if has_fts_table(queryset.db, model._meta.db_table):
+        fts = _fts_table(model._meta.db_table)
+        return queryset.filter(pk__in=RawSQL(
+            f'SELECT rowid FROM {fts} WHERE {fts} MATCH %s', [f'{{{" ".join(fields)}}} : {_quote(term)}']
+        ))
+    if vendor == 'postgresql':
+        condition = Q()
+        for field in fields:
+            condition |= Q(**{f'{field}__icontains': term})
+        return queryset.filter(condition)
+    return None
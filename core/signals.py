@@ -0,0 +1,25 @@
+"""
+Signals for bulk writes, which bypass the per-instance model signals.
+
+Code that writes with bulk_create() or bulk_update() sends these so that
+derived data (KPI counters, caches) stays in sync:
+
+    bulk_created.send(sender=Material, instances=materials)
+    bulk_updated.send(sender=Material, changes=[(old_values, new_values), ...])
+
+`old_values` and `new_values` are dicts of field values before and after
+the update.
+
+Soft-deletable models (core.models.SoftDeleteModel) announce rows flagged
+as deleted or restored by their queryset methods the same way:
+
+    soft_deleted.send(sender=Material, instances=materials)
+    restored.send(sender=Material, instances=materials)
+"""
+
+from django.dispatch import Signal
+
+bulk_created = Signal()
+bulk_updated = Signal()
+soft_deleted = Signal()
+restored = Signal()
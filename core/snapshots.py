@@ -0,0 +1,35 @@
+"""
+Stored values of a row about to be updated, read once per save.
+
+Several modules compare an update with the row it replaces (core.counters,
+core.audit). Each declares the fields it needs with watch(); one pre_save
+handler reads all of them with a single query and leaves them on the
+instance, where the post_save handlers find them with previous_values():
+
+    watch(Material, ['status', 'material_type'])
+    ...
+    previous = previous_values(instance)  # None for a new row
+"""
+
+from collections import defaultdict
+
+from django.db.models.signals import pre_save
+
+_fields = defaultdict(list)
+
+
+def watch(model, fields):
+    """Read `fields` of the stored row before each save of a `model` instance."""
+    _fields[model].extend(field for field in fields if field not in _fields[model])
+    pre_save.connect(_remember, sender=model, dispatch_uid='snapshots')
+
+
+def _remember(sender, instance, raw=False, **kwargs):
+    instance._previous_values = None
+    if not raw and not instance._state.adding and instance.pk is not None:
+        instance._previous_values = sender._base_manager.filter(pk=instance.pk).values(*_fields[sender]).first()
+
+
+def previous_values(instance):
+    """{field: stored value} of the row `instance` updates, None when it is new."""
+    return getattr(instance, '_previous_values', None)
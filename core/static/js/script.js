@@ -28,3 +28,192 @@ document.addEventListener('DOMContentLoaded', () => {
         userMenuDropdown.classList.add('hidden');
     }   
 });
+
+// Live filtering and paging of the list pages: the filter form (data-live-filter)
+// and the pagination links fetch only the table fragment and swap it in place.
+const liveFilterForm = document.querySelector('form[data-live-filter]');
+const listTable = liveFilterForm ? document.querySelector(liveFilterForm.dataset.liveFilter) : null;
+const exportLink = document.getElementById('export-link');
+const FILTER_DELAY = 300;
+
+if (liveFilterForm && listTable) {
+    let pending = null;
+    let timer = null;
+
+    const filterQuery = () => {
+        const params = new URLSearchParams();
+        for (const [key, value] of new FormData(liveFilterForm)) {
+            if (value) {
+                params.append(key, value);
+            }
+        }
+        return params.toString();
+    };
+
+    const loadTable = async (query, push) => {
+        const url = `${window.location.pathname}${query ? `?${query}` : ''}`;
+        if (pending) {
+            pending.abort();
+        }
+        pending = new AbortController();
+        try {
+            const response = await fetch(url, {
+                headers: { 'X-Fragment': '1' },
+                signal: pending.signal,
+            });
+            // Logged out or no longer allowed: let the server handle a full page load
+            if (!response.ok || response.redirected) {
+                window.location.assign(url);
+                return;
+            }
+            listTable.innerHTML = await response.text();
+        } catch (error) {
+            if (error.name !== 'AbortError') {
+                window.location.assign(url);
+            }
+            return;
+        }
+        if (push) {
+            window.history.pushState(null, '', url);
+        } else {
+            window.history.replaceState(null, '', url);
+        }
+        if (exportLink) {
+            const params = new URLSearchParams(query);
+            params.delete('page');
+            params.delete('after');
+            params.delete('before');
+            params.set('export', 'csv');
+            exportLink.href = `?${params}`;
+        }
+    };
+
+    const filterSoon = () => {
+        clearTimeout(timer);
+        timer = setTimeout(() => loadTable(filterQuery(), false), FILTER_DELAY);
+    };
+
+    liveFilterForm.addEventListener('input', filterSoon);
+    liveFilterForm.addEventListener('change', filterSoon);
+    liveFilterForm.addEventListener('submit', (event) => {
+        event.preventDefault();
+        clearTimeout(timer);
+        loadTable(filterQuery(), false);
+    });
+
+    listTable.addEventListener('click', (event) => {
+        const link = event.target.closest('nav[aria-label="Pagination"] a[href]');
+        if (!link || event.ctrlKey || event.metaKey || event.shiftKey) {
+            return;
+        }
+        event.preventDefault();
+        loadTable(new URL(link.href).search.slice(1), true);
+    });
+
+    window.addEventListener('popstate', () => {
+        loadTable(window.location.search.slice(1), false);
+    });
+}
+
+// Typeahead of the navigation search box: suggestions come from the in-memory
+// prefix index of the server (core/autocomplete.py), limited to readable modules.
+const searchInput = document.getElementById('transaction-input');
+const searchResults = document.getElementById('search-results');
+const SEARCH_DELAY = 150;
+
+if (searchInput && searchResults && searchInput.dataset.autocompleteUrl) {
+    let pending = null;
+    let timer = null;
+    let active = -1;
+
+    const options = () => Array.from(searchResults.querySelectorAll('a'));
+
+    const closeResults = () => {
+        searchResults.classList.add('hidden');
+        searchInput.setAttribute('aria-expanded', 'false');
+        active = -1;
+    };
+
+    const highlight = (index) => {
+        const links = options();
+        links.forEach((link, position) => link.classList.toggle('bg-gray-100', position === index));
+        active = index;
+    };
+
+    const showResults = (results) => {
+        searchResults.replaceChildren(...results.map((result) => {
+            const item = document.createElement('li');
+            const link = document.createElement('a');
+            const type = document.createElement('span');
+            link.href = result.url;
+            link.setAttribute('role', 'option');
+            link.className = 'flex justify-between gap-4 px-4 py-2 hover:bg-gray-100';
+            link.append(result.label);
+            type.className = 'text-xs text-gray-500';
+            type.textContent = result.type;
+            link.append(type);
+            item.append(link);
+            return item;
+        }));
+        if (results.length) {
+            searchResults.classList.remove('hidden');
+            searchInput.setAttribute('aria-expanded', 'true');
+            active = -1;
+        } else {
+            closeResults();
+        }
+    };
+
+    const suggest = async () => {
+        const query = searchInput.value.trim();
+        if (pending) {
+            pending.abort();
+        }
+        if (!query) {
+            closeResults();
+            return;
+        }
+        pending = new AbortController();
+        try {
+            const response = await fetch(`${searchInput.dataset.autocompleteUrl}?${new URLSearchParams({ q: query })}`, {
+                signal: pending.signal,
+            });
+            if (!response.ok || response.redirected) {
+                closeResults();
+                return;
+            }
+            showResults((await response.json()).results);
+        } catch (error) {
+            if (error.name !== 'AbortError') {
+                closeResults();
+            }
+        }
+    };
+
+    searchInput.addEventListener('input', () => {
+        clearTimeout(timer);
+        timer = setTimeout(suggest, SEARCH_DELAY);
+    });
+
+    searchInput.addEventListener('keydown', (event) => {
+        const links = options();
+        if (event.key === 'ArrowDown' && links.length) {
+            event.preventDefault();
+            highlight((active + 1) % links.length);
+        } else if (event.key === 'ArrowUp' && links.length) {
+            event.preventDefault();
+            highlight((active - 1 + links.length) % links.length);
+        } else if (event.key === 'Enter' && links.length) {
+            event.preventDefault();
+            window.location.assign(links[Math.max(active, 0)].href);
+        } else if (event.key === 'Escape') {
+            closeResults();
+        }
+    });
+
+    document.addEventListener('click', (event) => {
+        if (!searchInput.contains(event.target) && !searchResults.contains(event.target)) {
+            closeResults();
+        }
+    });
+}
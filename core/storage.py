@@ -0,0 +1,65 @@
+"""
+Static files storage: content-hashed names plus precompressed copies.
+
+collectstatic stores every file under a name carrying a hash of its
+content (css/app.3f2a9c1e0b7d.css, see ManifestStaticFilesStorage), so a
+browser can cache it forever and a new build simply gets a new URL. Next
+to every text file it writes a .gz copy, and a .br copy when the optional
+brotli package is installed; core.middleware.StaticFilesMiddleware sends
+those to clients that accept them instead of compressing on each request.
+"""
+
+import gzip
+from pathlib import Path
+
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+
+try:
+    import brotli
+except ImportError:  # optional: only gzip copies are written
+    brotli = None
+
+COMPRESSIBLE_EXTENSIONS = ('.css', '.js', '.map', '.svg', '.json', '.txt', '.html', '.xml')
+# Smaller files gain nothing once the headers are counted
+MIN_COMPRESS_SIZE = 256
+
+
+def compressed_variants(data):
+    """Yield (extension, compressed bytes) for every encoding that shrinks `data`."""
+    encoders = [('.gz', lambda content: gzip.compress(content, compresslevel=9, mtime=0))]
+    if brotli is not None:
+        encoders.insert(0, ('.br', lambda content: brotli.compress(content, quality=11)))
+    for extension, encode in encoders:
+        compressed = encode(data)
+        if len(compressed) < len(data) * 0.95:
+            yield extension, compressed
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    """ManifestStaticFilesStorage that also writes .gz/.br copies of the collected text files."""
+
+    def stored_name(self, name):
+        # Without a manifest (collectstatic not run: development, tests) keep the plain names
+        if not self.hashed_files:
+            return name
+        return super().stored_name(name)
+
+    def post_process(self, paths, dry_run=False, **options):
+        collected = set()
+        for name, hashed_name, processed in super().post_process(paths, dry_run, **options):
+            if not isinstance(processed, Exception):
+                collected.update((name, hashed_name))
+            yield name, hashed_name, processed
+        if dry_run:
+            return
+        for name in sorted(filter(None, collected)):
+            if name.endswith(COMPRESSIBLE_EXTENSIONS):
+                self.compress(name)
+
+    def compress(self, name):
+        path = Path(self.path(name))
+        data = path.read_bytes()
+        if len(data) < MIN_COMPRESS_SIZE:
+            return
+        for extension, compressed in compressed_variants(data):
+            path.with_name(path.name + extension).write_bytes(compressed)
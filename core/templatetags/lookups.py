@@ -0,0 +1,21 @@
+from django import template
+
+from core.lookups import registry
+
+register = template.Library()
+
+
+@register.inclusion_tag('core/lookup_options.html')
+def lookup_options(kind, selected=None, blank='---------'):
+    """
+    Render the <option>s of every value of lookup `kind` from the in-process
+    registry (no query), preselecting `selected` (an id or a name).
+
+    Options post the name, which forms and filters resolve unambiguously
+    even when a name is made of digits.
+    """
+    return {
+        'blank': blank,
+        'options': registry.choices(kind),
+        'selected': registry.id(kind, selected),
+    }
@@ -0,0 +1,214 @@
+"""
+Helpers for the query-count and latency regression suite.
+
+Each app's tests.py seeds data with the fast fixtures below and wraps the
+request under test in BenchmarkTestCase.benchmark(), which asserts upper
+bounds on queries and wall-clock time and records the measurements.
+
+Volumes scale with the BENCHMARK_SCALE environment variable (default 1,
+i.e. 2,000 materials and 1,000 suppliers; BENCHMARK_SCALE=500 seeds 1M
+materials). When BENCHMARK_RESULTS names a file, the measurements are
+merged into it as JSON so runs can be diffed between releases:
+
+    BENCHMARK_SCALE=50 BENCHMARK_RESULTS=bench.json python manage.py test
+"""
+
+import json
+import os
+import tempfile
+import time
+from contextlib import contextmanager
+
+from django.contrib.auth.hashers import make_password
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from core import autocomplete
+from core.lookups import ensure, registry
+from core.models import Lookup
+from core.signals import bulk_created
+from materials.models import Material
+from suppliers.models import Suppliers
+from users.models import Role, User, UserRole
+
+SCALE = int(os.environ.get('BENCHMARK_SCALE', '1'))
+RESULTS_FILE = os.environ.get('BENCHMARK_RESULTS')
+
+MATERIALS = 2000 * SCALE
+SUPPLIERS = 1000 * SCALE
+SEED_BATCH_SIZE = 5000
+
+PASSWORD = 'bench-password-123'
+
+SUPPLIER_HEADERS = [
+    'id_supplier', 'legal_name', 'name', 'tax_id', 'country', 'state_province', 'city',
+    'address', 'zip_code', 'phone', 'email', 'contact_name', 'contact_role', 'category',
+    'payment_terms', 'currency', 'payment_method', 'bank_account', 'status',
+]
+COUNTRIES = ['Mexico', 'Colombia', 'Chile', 'Peru', 'Argentina', 'Spain']
+MATERIAL_TYPES = ['Raw', 'Finished', 'Packaging', 'Spare part']
+# Lookup values the fixtures use, by kind
+LOOKUP_VALUES = {
+    Lookup.KIND_STATUS: ['Active', 'Inactive'],
+    Lookup.KIND_UNIT: ['kg'],
+    Lookup.KIND_MATERIAL_TYPE: MATERIAL_TYPES,
+    Lookup.KIND_CATEGORY: ['General'],
+    Lookup.KIND_PAYMENT_TERMS: ['30 days'],
+    Lookup.KIND_CURRENCY: ['USD'],
+    Lookup.KIND_PAYMENT_METHOD: ['Transfer'],
+}
+
+
+def _batched(objects, size=SEED_BATCH_SIZE):
+    batch = []
+    for obj in objects:
+        batch.append(obj)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def seed_user(username, roles=(), **role_permissions):
+    """
+    Create a user with a real (PBKDF2) password and the given roles.
+
+    Args:
+        username: Username, also used to name a role built from role_permissions
+        roles: Existing Role instances to assign
+        role_permissions: Module levels for an extra role, e.g. materials=2
+    """
+    user = User.objects.create(username=username, password=make_password(PASSWORD))
+    roles = list(roles)
+    if role_permissions:
+        roles.append(Role.objects.create(role_name=f'{username}-role', **role_permissions))
+    UserRole.objects.bulk_create([UserRole(user_id=user, role=role) for role in roles])
+    return user
+
+
+def seed_lookups():
+    """Create the lookup values used by the fixtures (rows refer to them by name)."""
+    # Values created by earlier test classes were rolled back
+    registry.clear()
+    for kind, names in LOOKUP_VALUES.items():
+        for name in names:
+            ensure(kind, name)
+
+
+def seed_materials(count, user):
+    seed_lookups()
+    for batch in _batched(
+        Material(
+            id_material=f'MAT-{i:07d}',
+            name=f'Material {i}',
+            description=f'Description of material {i}',
+            unit='kg',
+            material_type=MATERIAL_TYPES[i % len(MATERIAL_TYPES)],
+            status='Active' if i % 5 else 'Inactive',
+            created_by=user,
+        )
+        for i in range(count)
+    ):
+        Material.objects.bulk_create(batch)
+        bulk_created.send(sender=Material, instances=batch)
+
+
+def supplier_row(i, prefix='SUP'):
+    return {
+        'id_supplier': f'{prefix}-{i:07d}',
+        'legal_name': f'Supplier {i} S.A.',
+        'name': f'Supplier {i}',
+        'tax_id': f'TAX{i:09d}',
+        'country': COUNTRIES[i % len(COUNTRIES)],
+        'state_province': '',
+        'city': 'City',
+        'address': f'Street {i}',
+        'zip_code': 10000 + i % 90000,
+        'phone': 5550000 + i,
+        'email': f'supplier{i}@example.com',
+        'contact_name': 'Contact',
+        'contact_role': 'Sales',
+        'category': 'General',
+        'payment_terms': '30 days',
+        'currency': 'USD',
+        'payment_method': 'Transfer',
+        'bank_account': f'ACC{i:09d}',
+        'status': 'Active' if i % 4 else 'Inactive',
+    }
+
+
+def seed_suppliers(count, user):
+    seed_lookups()
+    for batch in _batched(Suppliers(created_by=user, **supplier_row(i)) for i in range(count)):
+        Suppliers.objects.bulk_create(batch)
+        bulk_created.send(sender=Suppliers, instances=batch)
+
+
+def supplier_csv(count, prefix='NEW'):
+    lines = [','.join(SUPPLIER_HEADERS)]
+    for i in range(count):
+        row = supplier_row(i, prefix)
+        lines.append(','.join(str(row[header]) for header in SUPPLIER_HEADERS))
+    return ('\n'.join(lines) + '\n').encode('utf-8')
+
+
+# Measure the primary database path even when replicas are configured
+@override_settings(DATABASE_REPLICAS=[])
+class BenchmarkTestCase(TestCase):
+    """TestCase that measures and bounds queries and time per benchmark."""
+
+    results = {}
+
+    def setUp(self):
+        super().setUp()
+        # Start every benchmark from a cold cache so results don't depend on test order
+        cache.clear()
+        registry.clear()
+        autocomplete.clear()
+
+    def use_shared_cache(self):
+        """
+        For the rest of the test, run like a deployment whose processes share a
+        cache (CACHE_URL), with cached sessions and users; a file cache stands
+        in for Redis.
+        """
+        location = self.enterContext(tempfile.TemporaryDirectory())
+        self.enterContext(override_settings(
+            CACHES={'default': {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': location}},
+            SESSION_ENGINE='django.contrib.sessions.backends.cached_db',
+            AUTHENTICATION_BACKENDS=['users.backends.CachedModelBackend'],
+        ))
+
+    @contextmanager
+    def benchmark(self, name, max_queries=None, max_seconds=None):
+        """Measure the enclosed block, record it under `name` and assert the bounds."""
+        with CaptureQueriesContext(connection) as context:
+            start = time.perf_counter()
+            yield
+            seconds = time.perf_counter() - start
+        queries = len(context.captured_queries)
+
+        BenchmarkTestCase.results[name] = {
+            'queries': queries,
+            'seconds': round(seconds, 4),
+            'scale': SCALE,
+        }
+        if max_queries is not None:
+            self.assertLessEqual(queries, max_queries, f'{name} ran {queries} queries')
+        if max_seconds is not None:
+            self.assertLessEqual(seconds, max_seconds, f'{name} took {seconds:.3f}s')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        if RESULTS_FILE and BenchmarkTestCase.results:
+            existing = {}
+            if os.path.exists(RESULTS_FILE):
+                with open(RESULTS_FILE) as results_file:
+                    existing = json.load(results_file)
+            existing.update(BenchmarkTestCase.results)
+            with open(RESULTS_FILE, 'w') as results_file:
+                json.dump(existing, results_file, indent=2, sort_keys=True)
@@ -1,3 +1,602 @@
-from django.test import TestCase
+import csv
+import gzip
+import io
+import os
+import tempfile
+import time
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.sessions.models import Session
+from django.contrib.admin import site
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.management import call_command
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.db import connection, connections
+from django.db.models import Count, ProtectedError
+from django.urls import reverse
+from django.utils import timezone, translation
+
+from core import autocomplete, instrumentation
+from core.admin import LookupAdmin
+from core.chunks import split_records
+from core.lookups import ensure, registry
+from core.middleware import StaticFilesMiddleware
+from core.routers import PIN_COOKIE, ReplicaRouter, use_replica
+from core.signals import bulk_created, bulk_updated
+from core.audit import AuditBuffer
+from core.models import ChangeRecord, ImportJob, KpiCounter, Lookup
+from core.validation import RowValidator
+from core.testing import MATERIALS, BenchmarkTestCase, seed_materials, seed_suppliers, seed_user
+from materials.forms import MaterialForm
+from materials.models import Material
+from suppliers.models import Suppliers
+from users.models import Role, User
+
+
+class DashboardBenchmarkTests(BenchmarkTestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        roles = [
+            Role.objects.create(role_name=f'role-{i}', materials=i % 3, suppliers=(i + 1) % 3, reporting=1)
+            for i in range(5)
+        ]
+        cls.user = seed_user('dashboard-bench', roles=roles)
+        seed_materials(200, cls.user)
+        seed_suppliers(100, cls.user)
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_login(self.user)
+
+    def test_dashboard(self):
+        with self.benchmark('dashboard_view', max_queries=5, max_seconds=1):
+            response = self.client.get(reverse('dashboard'))
+        self.assertEqual(response.context['permissions']['materials'], 2)
+        self.assertEqual(response.context['roles'], [f'role-{i}' for i in range(5)])
+        self.assertEqual([kpi['total'] for kpi in response.context['kpis']], [200, 100])
+
+    def test_dashboard_cached_permissions(self):
+        self.use_shared_cache()
+        self.client.force_login(self.user)
+        self.client.get(reverse('dashboard'))
+        with self.benchmark('dashboard_view_warm', max_queries=3, max_seconds=1):
+            self.client.get(reverse('dashboard'))
+
+
+class KpiCounterTests(BenchmarkTestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = seed_user('counter-user')
+        seed_materials(100, cls.user)
+
+    def counts(self, dimension):
+        return dict(KpiCounter.objects.filter(
+            model_label='materials.material', dimension=dimension, count__gt=0,
+        ).values_list('value', 'count'))
+
+    def expected(self, dimension):
+        # Lookup fields are counted by id
+        rows = Material.objects.values_list(dimension).annotate(total=Count('pk')).order_by()
+        return {str(value): total for value, total in rows}
+
+    def test_counters_follow_saves_and_deletes(self):
+        ensure(Lookup.KIND_MATERIAL_TYPE, 'Tool')
+        material = Material.objects.create(
+            id_material='MAT-NEW', name='New', unit='kg', material_type='Tool', status='Active', created_by=self.user,
+        )
+        material.status = 'Inactive'
+        material.save()
+        Material.objects.filter(pk__in=Material.objects.filter(material_type='Raw').values('pk')[:5]).delete()
+        Material.objects.filter(status='Active').first().delete()
+
+        for dimension in ('status', 'material_type'):
+            self.assertEqual(self.counts(dimension), self.expected(dimension))
+
+    def test_rebuild_command(self):
+        Material.objects.filter(status='Inactive').update(status='Active')
+        call_command('rebuild_kpi_counters', stdout=io.StringIO())
+        self.assertEqual(self.counts('status'), {str(registry.id(Lookup.KIND_STATUS, 'Active')): 100})
+        self.assertEqual(self.counts('material_type'), self.expected('material_type'))
+
+
+class StaleImportJobTests(TestCase):
+
+    def test_jobs_of_stopped_processes_are_failed(self):
+        user = seed_user('stale-jobs', suppliers=2)
+        spooled = tempfile.NamedTemporaryFile(suffix='.csv', delete=False)
+        spooled.close()
+        lost = ImportJob.objects.create(kind='suppliers', status=ImportJob.STATUS_RUNNING, file_path=spooled.name, created_by=user)
+        queued = ImportJob.objects.create(kind='suppliers', file_path=spooled.name, created_by=user)
+        live = ImportJob.objects.create(kind='suppliers', status=ImportJob.STATUS_RUNNING, file_path=spooled.name, created_by=user)
+        ImportJob.objects.filter(pk__in=[lost.pk, queued.pk]).update(updated_at=timezone.now() - timedelta(hours=1))
+
+        call_command('fail_stale_jobs', minutes=30, stdout=io.StringIO())
+
+        statuses = dict(ImportJob.objects.values_list('pk', 'status'))
+        self.assertEqual(statuses[lost.pk], ImportJob.STATUS_FAILED)
+        self.assertEqual(statuses[queued.pk], ImportJob.STATUS_FAILED)
+        self.assertEqual(statuses[live.pk], ImportJob.STATUS_RUNNING)
+        self.assertFalse(os.path.exists(spooled.name))
+        self.client.force_login(user)
+        response = self.client.get(reverse('import_job_status', args=[lost.pk]))
+        self.assertIs(response.json()['finished'], True)
+
+
+@override_settings(AUDIT_EAGER=True)
+class ChangeHistoryTests(BenchmarkTestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = seed_user('audit-user', materials=2)
+        seed_materials(3, cls.user)
+
+    def test_edit_records_changed_fields_and_user(self):
+        self.client.force_login(self.user)
+        material = Material.objects.order_by('pk').first()
+        data = {
+            'id_material': material.id_material, 'name': 'Renamed', 'description': material.description,
+            'unit': material.unit, 'material_type': material.material_type, 'status': material.status,
+        }
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('materials:material_edit', args=[material.pk]), data)
+
+        record = ChangeRecord.objects.get(object_pk=str(material.pk))
+        self.assertEqual(record.action, ChangeRecord.ACTION_UPDATE)
+        self.assertEqual(record.changes, {'name': [material.name, 'Renamed']})
+        self.assertEqual(record.user, self.user)
+
+    def test_save_reads_the_stored_row_once(self):
+        material = Material.objects.filter(status='Active').first()
+        inactive = registry.id(Lookup.KIND_STATUS, 'Inactive')
+        before = dict(KpiCounter.objects.filter(dimension='status').values_list('value', 'count'))
+        old_name, old_status = material.name, material.status
+        material.name, material.status = 'Renamed', inactive
+        with self.captureOnCommitCallbacks(execute=True):
+            with CaptureQueriesContext(connection) as context:
+                material.save()
+        # One read shared by the KPI counters and the change history
+        reads = [query['sql'] for query in context.captured_queries if query['sql'].startswith('SELECT') and 'materials_material' in query['sql']]
+        self.assertEqual(len(reads), 1, reads)
+
+        record = ChangeRecord.objects.get(object_pk=str(material.pk))
+        self.assertEqual(record.changes, {'name': [old_name, 'Renamed'], 'status': [old_status, inactive]})
+        after = dict(KpiCounter.objects.filter(dimension='status').values_list('value', 'count'))
+        self.assertEqual(after[str(old_status)], before[str(old_status)] - 1)
+        self.assertEqual(after[str(inactive)], before.get(str(inactive), 0) + 1)
+
+    def test_bulk_update_diffs_only_written_fields(self):
+        material = Material.objects.order_by('pk').first()
+        retired = ensure(Lookup.KIND_STATUS, 'Retired')
+        old = {'pk': material.pk, 'status': material.status, 'unit': material.unit}
+        with self.captureOnCommitCallbacks(execute=True):
+            bulk_updated.send(sender=Material, changes=[(old, {'status': retired, 'unit': material.unit})])
+        record = ChangeRecord.objects.get()
+        self.assertEqual(record.changes, {'status': [material.status, retired]})
+
+    def test_full_queue_waits_for_the_writer(self):
+        written = []
+
+        def slow_write(records):
+            time.sleep(0.01)
+            written.extend(records)
+
+        records = [{'action': ChangeRecord.ACTION_CREATE, 'object_pk': str(index)} for index in range(50)]
+        with mock.patch('core.audit.write', slow_write), mock.patch('core.audit.spill') as spill:
+            buffer = AuditBuffer(maxsize=5, batch_size=5, interval=0.01)
+            buffer.start()
+            buffer.put(records)
+            buffer.stop()
+        spill.assert_not_called()
+        self.assertEqual(written, records)
+
+    def test_overflow_spills_to_fallback_file_and_replays(self):
+        material = Material.objects.order_by('pk').first()
+        records = [
+            {'model_label': 'materials.material', 'object_pk': str(material.pk), 'action': ChangeRecord.ACTION_UPDATE,
+             'changes': {'name': [str(index), str(index + 1)]}, 'user_id': self.user.pk, 'changed_at': material.updated_at}
+            for index in range(3)
+        ]
+        with tempfile.TemporaryDirectory() as directory:
+            fallback = os.path.join(directory, 'fallback.jsonl')
+            with override_settings(AUDIT_FALLBACK_FILE=fallback):
+                # No writer thread draining it: the overflow is spilled at once
+                buffer = AuditBuffer(maxsize=2)
+                with self.assertLogs('core.audit', 'WARNING'):
+                    buffer.put(records)
+                buffer.flush()
+                self.assertEqual(ChangeRecord.objects.count(), 2)
+
+                call_command('replay_audit_log', stdout=io.StringIO())
+            self.assertFalse(os.path.exists(fallback))
+        self.assertEqual(ChangeRecord.objects.count(), 3)
+        self.assertEqual(ChangeRecord.objects.order_by('-pk').first().changed_at, material.updated_at)
+
+
+class LookupTests(BenchmarkTestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = seed_user('lookup-user', materials=2)
+        seed_materials(10, cls.user)
+
+    def test_rows_store_ids_and_accept_names(self):
+        active = registry.id(Lookup.KIND_STATUS, 'Active')
+        self.assertEqual(registry.id(Lookup.KIND_STATUS, ' active '), active)
+        material = Material.objects.create(
+            id_material='MAT-NEW', name='New', unit='kg', material_type='Raw', status='Active', created_by=self.user,
+        )
+        self.assertEqual(material.status, active)
+        self.assertEqual(material.get_status_display(), 'Active')
+        self.assertEqual(Material.objects.filter(status='Active').count(), Material.objects.filter(status=active).count())
+
+        form = MaterialForm({'id_material': 'MAT-BAD', 'name': 'Bad', 'unit': 'kg', 'material_type': 'Raw', 'status': 'Lost'})
+        self.assertIn('status', form.errors)
+
+    def test_values_in_use_cannot_be_deleted(self):
+        raw = Lookup.objects.get(kind=Lookup.KIND_MATERIAL_TYPE, name='Raw')
+        Material.objects.filter(material_type=raw.pk).soft_delete()
+        # Soft-deleted rows still refer to it
+        with self.assertRaises(ProtectedError):
+            raw.delete()
+        with self.assertRaises(ProtectedError):
+            Lookup.objects.filter(kind=Lookup.KIND_MATERIAL_TYPE).delete()
+        self.assertTrue(Lookup.objects.filter(pk=raw.pk).exists())
+
+        admin = LookupAdmin(Lookup, site)
+        request = RequestFactory().get('/')
+        request.user = User(is_staff=True, is_superuser=True)
+        self.assertFalse(admin.has_delete_permission(request, raw))
+        self.assertFalse(admin.has_delete_permission(request))
+        unused = Lookup.objects.create(kind=Lookup.KIND_MATERIAL_TYPE, name='Unused')
+        self.assertTrue(admin.has_delete_permission(request, unused))
+        unused.delete()
+
+    def test_digit_names_are_names_first(self):
+        active = registry.id(Lookup.KIND_STATUS, 'Active')
+        named = Lookup.objects.create(kind=Lookup.KIND_STATUS, name=str(active))
+        material = Material.objects.create(
+            id_material='MAT-NEW', name='New', unit='kg', material_type='Raw', status=str(active), created_by=self.user,
+        )
+        self.assertEqual(material.status, named.pk)
+        self.assertEqual(Material.objects.get(status=str(active)), material)
+        self.assertEqual(Material._meta.get_field('status').clean(str(active), material), named.pk)
+
+        form = MaterialForm({'id_material': 'MAT-FORM', 'name': 'Form', 'unit': 'kg', 'material_type': 'Raw', 'status': str(active)})
+        self.assertTrue(form.is_valid(), form.errors)
+        self.assertEqual(form.cleaned_data['status'], named.pk)
+
+    def test_rename_reaches_the_list(self):
+        self.client.force_login(self.user)
+        url = reverse('materials:materials')
+        # Warm the table cache and get the validators of the page
+        etag = self.client.get(url)['ETag']
+        lookup = Lookup.objects.get(kind=Lookup.KIND_STATUS, name='Active')
+        lookup.name = 'In use'
+        lookup.save()
+
+        response = self.client.get(url, headers={'if-none-match': etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, '>In use</span>')
+        self.assertNotContains(response, '>Active</span>')
+        response = self.client.get(url, {'status': 'In use'})
+        self.assertEqual(len(response.context['page_obj']), Material.objects.filter(status=lookup.pk).count())
+
+    def test_unknown_filter_value_matches_nothing(self):
+        self.client.force_login(self.user)
+        for params in ({'status': 'Bogus'}, {'status': '9999'}, {'status': 'Bogus', 'after': 1}):
+            response = self.client.get(reverse('materials:materials'), params)
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(len(response.context['page_obj']), 0)
+
+
+class DefaultLookupTests(TestCase):
+
+    def test_new_database_offers_values_in_the_forms(self):
+        # No fixtures: the values come from the migrations
+        self.assertEqual(
+            set(Lookup.objects.values_list('kind', flat=True)), {kind for kind, _ in Lookup.KIND_CHOICES},
+        )
+        self.client.force_login(seed_user('lookup-defaults', materials=2))
+        response = self.client.get(reverse('materials:materials_create'))
+        self.assertContains(response, '>Active</option>')
+        self.assertContains(response, '>kg</option>')
+
+
+@override_settings(AUDIT_EAGER=True)
+class AutocompleteTests(BenchmarkTestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = seed_user('autocomplete-user', materials=1)
+        seed_materials(MATERIALS, cls.user)
+        seed_suppliers(20, cls.user)
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_login(self.user)
+        self.url = reverse('autocomplete')
+
+    def labels(self, query):
+        return [result['label'] for result in self.client.get(self.url, {'q': query}).json()['results']]
+
+    def test_matches_codes_and_words_of_readable_modules(self):
+        response = self.client.get(self.url, {'q': 'mat-0000012'})
+        results = response.json()['results']
+        self.assertEqual(results[0], {
+            'type': 'Material', 'label': 'MAT-0000012 · Material 12',
+            'url': reverse('materials:materials') + '?id_material=MAT-0000012',
+        })
+        self.assertTrue(all(result['label'].startswith('MAT-0000012') for result in results))
+        # Word suffixes match too; suppliers need read access to their module
+        self.assertIn('MAT-0000007 · Material 7', self.labels('7'))
+        self.assertEqual(self.labels('supplier'), [])
+
+    def test_index_follows_writes(self):
+        self.labels('mat')
+        with self.captureOnCommitCallbacks(execute=True):
+            material = Material.objects.create(
+                id_material='NEW-1', name='Zinc plate', unit='kg', material_type='Raw', status='Active', created_by=self.user,
+            )
+        self.assertEqual(self.labels('plate'), ['NEW-1 · Zinc plate'])
+        with self.captureOnCommitCallbacks(execute=True):
+            material.delete()
+        self.assertEqual(self.labels('plate'), [])
+
+    def test_index_dropped_during_a_search_is_rebuilt(self):
+        index = autocomplete._indexes[Material]
+        refresh = index._refresh
+
+        def refresh_then_drop():
+            # A concurrent apply() drops the index between the refresh and the lock
+            refresh()
+            with index._lock:
+                index._drop()
+
+        with mock.patch.object(index, '_refresh', refresh_then_drop):
+            self.assertEqual(self.labels('mat-0000012')[0], 'MAT-0000012 · Material 12')
+
+    def test_bulk_writes_are_merged(self):
+        self.labels('mat')
+        materials = [
+            Material(id_material=f'BULK-{i}', name=f'Copper wire {i}', unit='kg', material_type='Raw',
+                     status='Active', created_by=self.user)
+            for i in range(40)
+        ]
+        with self.captureOnCommitCallbacks(execute=True):
+            Material.objects.bulk_create(materials)
+            bulk_created.send(sender=Material, instances=materials)
+        self.assertEqual(self.labels('wire 17'), ['BULK-17 · Copper wire 17'])
+        with self.captureOnCommitCallbacks(execute=True):
+            Material.objects.filter(name__startswith='Material 1').soft_delete()
+        self.assertEqual(self.labels('material 1'), [])
+        self.assertEqual(len(self.labels('material 2')), 10)
+
+    def test_writes_of_other_processes_are_not_skipped(self):
+        self.labels('mat')
+        # Another process renames a material (its signals only reach its own index)
+        Material.objects.filter(id_material='MAT-0000005').update(name='Foreign name')
+        autocomplete.bump_version(Material)
+        with self.captureOnCommitCallbacks(execute=True):
+            Material.objects.create(
+                id_material='NEW-1', name='Zinc plate', unit='kg', material_type='Raw', status='Active', created_by=self.user,
+            )
+        self.assertEqual(self.labels('foreign'), ['MAT-0000005 · Foreign name'])
+        self.assertEqual(self.labels('zinc'), ['NEW-1 · Zinc plate'])
+
+    @override_settings(AUTOCOMPLETE_MAX_ROWS=100)
+    def test_large_tables_are_searched_through_the_trigram_index(self):
+        permissions = {'materials': 1}
+        self.assertEqual(autocomplete.search('ma', permissions), [])
+        with CaptureQueriesContext(connection) as context:
+            with self.benchmark('autocomplete_search_database', max_queries=2, max_seconds=1):
+                results = autocomplete.search('material 12', permissions)
+        # Candidates come from the trigram index, not a scan of the table
+        self.assertTrue(any(' MATCH ' in query['sql'] for query in context.captured_queries))
+        self.assertEqual(results[0]['label'], 'MAT-0000012 · Material 12')
+        self.assertTrue(all(' 12' in result['label'] for result in results))
+
+    def test_search_uses_no_queries(self):
+        permissions = {'materials': 1}
+        autocomplete.search('mat', permissions)
+        # Served from the in-memory index: no query and no database fallback
+        with mock.patch.object(autocomplete.PrefixIndex, '_search_database') as search_database:
+            with self.benchmark('autocomplete_search', max_queries=0, max_seconds=1):
+                results = autocomplete.search('material 1', permissions)
+        search_database.assert_not_called()
+        self.assertEqual(len(results), 10)
+
+
+@override_settings(DATABASE_REPLICAS=['replica1', 'replica2'])
+class ReplicaRouterTests(SimpleTestCase):
+    """Two SQLite files stand in for the replicas, each holding a different row."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        # Added once the test case has checked its databases against settings.DATABASES
+        cls.databases = frozenset({'replica1', 'replica2'})
+        cls.directory = tempfile.TemporaryDirectory()
+        for alias in ('replica1', 'replica2'):
+            connections.settings[alias] = dict(
+                connection.settings_dict, NAME=os.path.join(cls.directory.name, f'{alias}.sqlite3'), TEST={},
+            )
+            with connections[alias].schema_editor() as editor:
+                editor.create_model(KpiCounter)
+            KpiCounter.objects.using(alias).create(model_label=alias, dimension='status')
+
+    @classmethod
+    def tearDownClass(cls):
+        for alias in ('replica1', 'replica2'):
+            connections[alias].close()
+            del connections[alias]
+            del connections.settings[alias]
+        cls.directory.cleanup()
+        super().tearDownClass()
+
+    def test_all_reads_of_a_request_use_one_replica(self):
+        @use_replica
+        def view(request):
+            # Several queries, like the count and the page of a list
+            return [KpiCounter.objects.get().model_label for _ in range(5)]
+
+        request = RequestFactory().get('/')
+        seen = set()
+        for _ in range(40):
+            names = view(request)
+            self.assertEqual(len(set(names)), 1, names)
+            seen.add(names[0])
+        self.assertEqual(seen, {'replica1', 'replica2'})
+
+    def test_pinned_clients_other_views_and_other_models_read_default(self):
+        router = ReplicaRouter()
+        request = RequestFactory().get('/')
+        self.assertIn(use_replica(lambda request: router.db_for_read(Material))(request), ('replica1', 'replica2'))
+        # Sessions, users and jobs must not lag behind
+        for model in (Session, User, ImportJob):
+            self.assertIsNone(use_replica(lambda request: router.db_for_read(model))(request))
+        request.COOKIES[PIN_COOKIE] = '1'
+        self.assertIsNone(use_replica(lambda request: router.db_for_read(Material))(request))
+        self.assertIsNone(router.db_for_read(Material))
+
+
+@override_settings(INSTRUMENTATION_ENABLED=True, INSTRUMENTATION_SERVER_TIMING=True)
+class InstrumentationTests(TestCase):
+
+    def setUp(self):
+        instrumentation.store.clear()
+        self.user = seed_user('instrumented', materials=1)
+        self.client.force_login(self.user)
+
+    def test_requests_are_measured_and_reported_to_staff(self):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(reverse('dashboard'))
+        queries = len(context.captured_queries)
+        self.assertIn(f'desc="{queries} queries"', response['Server-Timing'])
+        self.assertRegex(response['Server-Timing'], r'^db;dur=[\d.]+;desc="\d+ queries", tpl;dur=[\d.]+, total;dur=[\d.]+$')
+
+        self.assertEqual(self.client.get(reverse('instrumentation')).status_code, 403)
+        self.user.is_staff = True
+        self.user.save()
+        report = self.client.get(reverse('instrumentation')).json()
+        self.assertTrue(report['enabled'])
+        dashboard = report['views']['dashboard']
+        self.assertEqual(dashboard['requests'], 1)
+        self.assertEqual(dashboard['queries']['max'], queries)
+
+
+class RowValidatorTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        seed_suppliers(3, seed_user('validator-user', suppliers=2))
+
+    def setUp(self):
+        self.enterContext(translation.override('en'))
+        self.validator = RowValidator(Suppliers, ['id_supplier', 'name', 'zip_code', 'email'])
+
+    def row(self, id_supplier, **values):
+        return {'id_supplier': id_supplier, 'name': 'Name', 'zip_code': '1000', 'email': 'a@example.com', **values}
+
+    def test_clean_converts_values_and_keeps_the_fields_that_cleaned(self):
+        cleaned, errors = self.validator.clean([
+            self.row('NEW-1'),
+            self.row('NEW-2', zip_code='ten', email='not an email', name=''),
+        ])
+        self.assertEqual(cleaned[0], {'id_supplier': 'NEW-1', 'name': 'Name', 'zip_code': 1000, 'email': 'a@example.com'})
+        self.assertEqual(errors[0], {})
+        self.assertEqual(cleaned[1], {'id_supplier': 'NEW-2'})
+        self.assertEqual(errors[1], {
+            'name': 'This field is required.',
+            'zip_code': 'Enter a whole number.',
+            'email': 'Enter a valid email address.',
+        })
+
+    def test_check_unique_tells_stored_values_from_duplicates_in_the_file(self):
+        rows = [self.row('SUP-0000001'), self.row('NEW-1'), self.row('NEW-1'), self.row('NEW-2', zip_code='x')]
+        with self.assertNumQueries(1):
+            results = self.validator.check_unique(*self.validator.clean(rows))
+        message = 'Supplier with this Supplier ID already exists.'
+        self.assertEqual([errors for _, errors in results], [
+            {'id_supplier': message}, {}, {'id_supplier': message}, {'zip_code': 'Enter a whole number.'},
+        ])
+        self.assertIsNone(results[0][0])
+        self.assertEqual(results[1][0]['id_supplier'], 'NEW-1')
+
+        # Values accepted by earlier batches count as duplicates too; stored ones are skipped on updates
+        results = self.validator.validate([self.row('NEW-1'), self.row('SUP-0000002')], check_existing=False)
+        self.assertEqual([errors for _, errors in results], [{'id_supplier': message}, {}])
+
+
+class SplitRecordsTests(SimpleTestCase):
+
+    def test_ranges_end_on_record_boundaries(self):
+        lines = ['id,notes']
+        for i in range(300):
+            notes = f'"line one\nline ""{i}"" two"' if i % 7 == 0 else f'plain {i}'
+            lines.append(f'{i},{notes}')
+        data = ('\r\n'.join(lines) + '\r\n').encode('utf-8')
+        expected = list(csv.reader(io.StringIO(data.decode('utf-8'), newline='')))
+
+        for chunk_bytes in (0, 1, 64, 1000, len(data)):
+            rows = []
+            ranges = list(split_records(data, 0, chunk_bytes))
+            self.assertEqual(ranges[-1][1], len(data))
+            for start, end in ranges:
+                rows.extend(csv.reader(io.StringIO(data[start:end].decode('utf-8'), newline='')))
+            self.assertEqual(rows, expected)
+
+
+class StaticFilesTests(SimpleTestCase):
+
+    def test_collected_files_are_hashed_compressed_and_cached(self):
+        with tempfile.TemporaryDirectory() as root, override_settings(STATIC_ROOT=root, DEBUG=False):
+            call_command('collectstatic', interactive=False, verbosity=0)
+            hashed = staticfiles_storage.stored_name('css/app.css')
+            self.assertNotEqual(hashed, 'css/app.css')
+            self.assertTrue(os.path.exists(os.path.join(root, hashed + '.gz')))
+
+            middleware = StaticFilesMiddleware(lambda request: HttpResponse(status=404))
+            factory = RequestFactory()
+            response = middleware(factory.get(f'/static/{hashed}', HTTP_ACCEPT_ENCODING='gzip, deflate'))
+            self.assertEqual(response['Content-Encoding'], 'gzip')
+            self.assertIn('immutable', response['Cache-Control'])
+            self.assertTrue(response['Content-Type'].startswith('text/css'))
+            with open(os.path.join(root, hashed), 'rb') as original:
+                self.assertEqual(gzip.decompress(b''.join(response.streaming_content)), original.read())
+            response.close()
+
+            response = middleware(factory.get('/static/css/app.css'))
+            self.assertNotIn('Content-Encoding', response)
+            self.assertNotIn('immutable', response['Cache-Control'])
+            response.close()
+            self.assertEqual(middleware(factory.get('/static/css/missing.css')).status_code, 404)
+
+            # Streamed, not read into memory
+            response = middleware(factory.get(f'/static/{hashed}'))
+            self.assertTrue(response.streaming)
+            self.assertNotIn('Content-Disposition', response)
+            with open(os.path.join(root, hashed), 'rb') as original:
+                self.assertEqual(b''.join(response.streaming_content), original.read())
+            response.close()
+
+    def test_encodings_refused_with_q_zero_are_not_sent(self):
+        accepted = StaticFilesMiddleware.accepted_encodings
+        self.assertEqual(accepted('gzip;q=0, br;q=0.5, deflate'), {'gzip': 0.0, 'br': 0.5, 'deflate': 1.0})
+        self.assertEqual(accepted(''), {})
+        with tempfile.TemporaryDirectory() as root, override_settings(STATIC_ROOT=root, DEBUG=False):
+            call_command('collectstatic', interactive=False, verbosity=0)
+            hashed = staticfiles_storage.stored_name('css/app.css')
+            middleware = StaticFilesMiddleware(lambda request: HttpResponse(status=404))
+            factory = RequestFactory()
+            for header in ('gzip;q=0', 'gzip; q=0.0, identity', '*;q=0', 'identity'):
+                response = middleware(factory.get(f'/static/{hashed}', HTTP_ACCEPT_ENCODING=header))
+                self.assertNotIn('Content-Encoding', response, header)
+                response.close()
+            response = middleware(factory.get(f'/static/{hashed}', HTTP_ACCEPT_ENCODING='*'))
+            self.assertIn(response['Content-Encoding'], ('br', 'gzip'))
+            response.close()
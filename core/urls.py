@@ -3,4 +3,7 @@ from . import views
 
 urlpatterns = [
     path('dashboard/', views.dashboard_view, name='dashboard'),
-]
\ No newline at end of file
+    path('jobs/<uuid:pk>/status/', views.import_job_status, name='import_job_status'),
+    path('autocomplete/', views.autocomplete_view, name='autocomplete'),
+    path('instrumentation/', views.instrumentation_view, name='instrumentation'),
+]
@@ -0,0 +1,128 @@
+"""
+Schema-driven batch validation for bulk writes.
+
+Building a ModelForm per row is expensive (field deep copies, widgets,
+model full_clean and one uniqueness query per unique field). RowValidator
+compiles the form fields and model validators of a model once, then
+validates batches of plain dicts column by column. Unique fields are
+checked with one set-based query per batch, plus a running set that catches
+duplicates inside the same upload.
+
+Errors use the same format as the bulk upload report: a dict mapping each
+field to its messages joined with ', '.
+"""
+
+from django.core.exceptions import ValidationError
+from django.utils.text import capfirst
+
+
+class RowValidator:
+    """
+    Validate rows for `model` restricted to `fields`.
+
+    Args:
+        model: Model class the rows are meant for
+        fields: Names of the model fields present in a row
+        unique_fields: Fields whose values must not already exist. Defaults
+            to every field in `fields` declared unique=True.
+    """
+
+    def __init__(self, model, fields, unique_fields=None):
+        self.model = model
+        self.fields = list(fields)
+        self.columns = []
+        for name in self.fields:
+            model_field = model._meta.get_field(name)
+            form_field = model_field.formfield()
+            # Model validators not already enforced by the form field (e.g. integer ranges)
+            extra_validators = [v for v in model_field.validators if v not in form_field.validators]
+            self.columns.append((name, form_field.clean, extra_validators))
+
+        if unique_fields is None:
+            unique_fields = [name for name in self.fields if model._meta.get_field(name).unique]
+        self.unique_fields = list(unique_fields)
+        self.seen = {name: set() for name in self.unique_fields}
+
+    def unique_message(self, name):
+        field = self.model._meta.get_field(name)
+        return field.error_messages['unique'] % {
+            'model_name': capfirst(self.model._meta.verbose_name),
+            'field_label': capfirst(field.verbose_name),
+        }
+
+    def existing_values(self, name, values):
+        """Return which of `values` are already stored for field `name`."""
+        queryset = self.model._base_manager.filter(**{f'{name}__in': values})
+        return set(queryset.values_list(name, flat=True))
+
+    def clean(self, rows):
+        """
+        Clean and validate each field of a batch of rows, without uniqueness.
+
+        Only uses the compiled fields, never the database, so it can run in
+        a worker process (see core.importers).
+
+        Returns:
+            tuple: (cleaned_rows, errors), two lists with one dict per row.
+            Rows with errors keep the fields that did clean, so that
+            check_unique() can still report their duplicates.
+        """
+        cleaned_rows = [{} for _ in rows]
+        errors = [{} for _ in rows]
+
+        for name, clean, extra_validators in self.columns:
+            for i, row in enumerate(rows):
+                try:
+                    value = clean(row.get(name))
+                    if value not in (None, ''):
+                        for validator in extra_validators:
+                            validator(value)
+                except ValidationError as exc:
+                    errors[i][name] = ', '.join(exc.messages)
+                else:
+                    cleaned_rows[i][name] = value
+
+        return cleaned_rows, errors
+
+    def check_unique(self, cleaned_rows, errors, check_existing=True):
+        """
+        Add uniqueness errors to the output of clean() and return the results.
+
+        Uses one query per unique field for the whole batch, plus the values
+        accepted from earlier batches of this validator. Returns the same
+        list of (cleaned, errors) pairs as validate().
+        """
+        for name in self.unique_fields:
+            values = {row[name] for row in cleaned_rows if row.get(name) not in (None, '')}
+            existing = self.existing_values(name, values) if check_existing and values else set()
+            seen = self.seen[name]
+            for i, row in enumerate(cleaned_rows):
+                value = row.get(name)
+                if value in (None, '') or name in errors[i]:
+                    continue
+                if value in existing or value in seen:
+                    errors[i][name] = self.unique_message(name)
+                elif not errors[i]:
+                    seen.add(value)
+
+        return [
+            (None, row_errors) if row_errors else (cleaned, {})
+            for cleaned, row_errors in zip(cleaned_rows, errors)
+        ]
+
+    def validate(self, rows, check_existing=True):
+        """
+        Validate a batch of rows.
+
+        Args:
+            rows: List of dicts mapping field names to raw string values
+            check_existing: Report unique values that already exist in the
+                database (disabled by callers that update existing rows)
+
+        Returns:
+            list: One (cleaned, errors) pair per row, in order. `cleaned`
+            maps field names to Python values and is None when `errors` is
+            not empty.
+        """
+        cleaned_rows, errors = self.clean(rows)
+        return self.check_unique(cleaned_rows, errors, check_existing)
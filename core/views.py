@@ -1,34 +1,75 @@
+from django.conf import settings
 from django.shortcuts import render
 from django.contrib.auth.decorators import login_required
-from users.models import UserRole
+from django.http import Http404, JsonResponse
+from users.permissions import get_permissions
+from .models import ImportJob
+from .routers import use_replica
+from . import autocomplete, counters, instrumentation
+
+# Dashboard KPI blocks: (permission module, model label, title, [(dimension, heading), ...])
+KPI_SECTIONS = [
+    ('materials', 'materials.material', 'Materials', [('status', 'Status'), ('material_type', 'Type')]),
+    ('suppliers', 'suppliers.suppliers', 'Suppliers', [('status', 'Status'), ('country', 'Country'), ('category', 'Category')]),
+]
 
 
 @login_required
+@use_replica
 def dashboard_view(request):
-    user_roles = UserRole.objects.filter(user_id= request.user)
-
-    permissions = {
-        'customers': 0,
-        'suppliers': 0,
-        'materials': 0,
-        'purchases': 0,
-        'sales': 0,
-        'inventory': 0,
-        'accounting': 0,
-        'reporting': 0,
-    }
+    permissions, roles = get_permissions(request)
+
+    # Counts come from the incrementally maintained KPI counters (see core/counters.py)
+    kpis = []
+    sections = [section for section in KPI_SECTIONS if permissions.get(section[0], 0) > 0]
+    if sections:
+        summary = counters.summary()
+        for module, label, title, dimensions in sections:
+            counts = summary.get(label, {})
+            kpis.append({
+                'title': title,
+                'total': sum(count for _, count in counts.get('status', [])),
+                'dimensions': [(heading, counts.get(dimension, [])) for dimension, heading in dimensions],
+            })
 
-    for user_role in user_roles:
-        role = user_role.role
-        for module in permissions.keys():
-            current_permission = getattr(role, module)
-            if current_permission > permissions[module]:
-                permissions[module] = current_permission
-    
     context = {
         'user': request.user,
         'permissions': permissions,
-        'roles': [ur.role.role_name for ur in user_roles],
+        'roles': roles,
+        'kpis': kpis,
     }
     
-    return render(request, 'core/dashboard.html', context)
\ No newline at end of file
+    return render(request, 'core/dashboard.html', context)
+
+
+@login_required
+async def import_job_status(request, pk):
+    # Progress and error report of a background import, polled by the upload pages
+    user = await request.auser()
+    try:
+        job = await ImportJob.objects.aget(pk=pk, created_by=user)
+    except ImportJob.DoesNotExist:
+        raise Http404
+    return JsonResponse(job.as_dict())
+
+
+@login_required
+def instrumentation_view(request):
+    # Per-view latency, query and template percentiles (see core/instrumentation.py), for staff
+    if not request.user.is_staff:
+        return JsonResponse({'error': 'Permission denied.'}, status=403)
+    return JsonResponse({
+        'enabled': getattr(settings, 'INSTRUMENTATION_ENABLED', False),
+        'views': instrumentation.store.summary(),
+    })
+
+
+@login_required
+def autocomplete_view(request):
+    # Suggestions for the search box, over the modules the user can read (see core/autocomplete.py)
+    permissions, _ = get_permissions(request)
+    try:
+        limit = min(max(int(request.GET.get('limit', '')), 1), 50)
+    except ValueError:
+        limit = None
+    return JsonResponse({'results': autocomplete.search(request.GET.get('q', ''), permissions, limit)})
@@ -1,3 +1,4 @@
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -31,19 +32,58 @@ INSTALLED_APPS = [
     'suppliers',
 ]
 
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+
+# CACHE_URL points every server process at one Redis server
+# (redis://host:6379/0). Without it each process keeps its own LocMemCache,
+# which can't see the deletes of the other processes: sessions and users are
+# then read from the database (see users/checks.py).
+CACHE_URL = os.environ.get('CACHE_URL', '')
+
+if CACHE_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': CACHE_URL,
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'erp-default',
+        }
+    }
+
+
 AUTH_USER_MODEL = 'users.User'
 
-LOGIN_URL = '/users/login'
+# With a shared cache, ModelBackend with the logged-in user cached between
+# requests (see users/backends.py)
+AUTHENTICATION_BACKENDS = [
+    'users.backends.CachedModelBackend' if CACHE_URL else 'django.contrib.auth.backends.ModelBackend',
+]
+
+# Seconds an authenticated user stays cached; saving the user drops it earlier
+USER_CACHE_TIMEOUT = 60
+
+LOGIN_URL = 'login'
 LOGIN_REDIRECT_URL = '/users/dashboard'
 LOGOUT_REDIRECT_URL = '/users/login'
 
 
 MIDDLEWARE = [
+    # First, so static files skip sessions, auth and the instrumentation
+    'core.middleware.StaticFilesMiddleware',
+    'core.middleware.InstrumentationMiddleware',
+    'core.middleware.ReplicaPinMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'core.middleware.AuditMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -72,12 +112,100 @@ WSGI_APPLICATION = 'erp_project.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+# The profile is chosen with DB_ENGINE: 'sqlite' (default) or 'postgres'.
+
+DB_ENGINE = os.environ.get('DB_ENGINE', 'sqlite')
+
+if DB_ENGINE == 'postgres':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': os.environ.get('DB_NAME', 'erp'),
+            'USER': os.environ.get('DB_USER', 'erp'),
+            'PASSWORD': os.environ.get('DB_PASSWORD', ''),
+            'HOST': os.environ.get('DB_HOST', 'localhost'),
+            'PORT': os.environ.get('DB_PORT', '5432'),
+            # Reuse connections across requests and check them before reuse
+            'CONN_MAX_AGE': int(os.environ.get('DB_CONN_MAX_AGE', '60')),
+            'CONN_HEALTH_CHECKS': True,
+            'OPTIONS': {},
+        }
     }
-}
+    if os.environ.get('DB_POOL_MAX_SIZE'):
+        # psycopg connection pool; replaces persistent connections
+        DATABASES['default']['CONN_MAX_AGE'] = 0
+        DATABASES['default']['OPTIONS']['pool'] = {
+            'min_size': int(os.environ.get('DB_POOL_MIN_SIZE', '2')),
+            'max_size': int(os.environ.get('DB_POOL_MAX_SIZE')),
+            'timeout': int(os.environ.get('DB_POOL_TIMEOUT', '10')),
+        }
+else:
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': os.environ.get('DB_NAME', BASE_DIR / 'db.sqlite3'),
+            'CONN_MAX_AGE': int(os.environ.get('DB_CONN_MAX_AGE', '60')),
+            'OPTIONS': {
+                # Seconds a writer waits for the lock before "database is locked"
+                'timeout': 20,
+                # Take the write lock when the transaction starts, so concurrent
+                # writers queue on the busy timeout instead of failing mid-transaction
+                'transaction_mode': 'IMMEDIATE',
+                # WAL lets readers run while a bulk upload writes
+                'init_command': (
+                    'PRAGMA journal_mode=WAL;'
+                    'PRAGMA synchronous=NORMAL;'
+                    'PRAGMA mmap_size=268435456;'
+                    'PRAGMA cache_size=-20000;'
+                    'PRAGMA temp_store=MEMORY;'
+                ),
+            },
+        }
+    }
+
+
+# Read replicas: DB_REPLICAS lists one SQLite file (sqlite profile) or host
+# (postgres profile) per replica. Read-only views (core.routers.use_replica)
+# read from them; writes and everything else use 'default'.
+
+DATABASE_REPLICAS = []
+for index, replica in enumerate(filter(None, os.environ.get('DB_REPLICAS', '').split(',')), start=1):
+    alias = f'replica{index}'
+    DATABASES[alias] = dict(DATABASES['default'], TEST={'MIRROR': 'default'})
+    DATABASES[alias]['OPTIONS'] = dict(DATABASES['default']['OPTIONS'])
+    if DB_ENGINE == 'postgres':
+        DATABASES[alias]['HOST'] = replica
+    else:
+        DATABASES[alias]['NAME'] = replica
+    DATABASE_REPLICAS.append(alias)
+
+DATABASE_ROUTERS = ['core.routers.ReplicaRouter']
+
+# Models those views read from a replica; the rest (sessions, users,
+# permissions, import jobs) always read 'default'
+REPLICA_READ_MODELS = ['materials.Material', 'suppliers.Suppliers', 'core.KpiCounter']
+
+# Seconds a client reads from 'default' after a write, to see its own changes
+REPLICA_PIN_SECONDS = 5
+
+
+# Sessions
+# https://docs.djangoproject.com/en/5.2/topics/http/sessions/#configuring-the-session-engine
+
+# The profile is chosen with SESSION_PROFILE:
+# - 'cached_db' (default with CACHE_URL): sessions are read from the cache and
+#   written through to the database, so most requests skip the django_session
+#   table; needs the shared cache, or a logout wouldn't reach the other processes;
+# - 'signed_cookies': the session lives in a signed cookie, with no server-side
+#   storage at all (keep sessions small; logging out can't revoke a copied cookie);
+# - 'db' (default otherwise): Django's default, one django_session query per request.
+
+SESSION_PROFILE = os.environ.get('SESSION_PROFILE', 'cached_db' if CACHE_URL else 'db')
+SESSION_ENGINE = {
+    'cached_db': 'django.contrib.sessions.backends.cached_db',
+    'signed_cookies': 'django.contrib.sessions.backends.signed_cookies',
+    'db': 'django.contrib.sessions.backends.db',
+}[SESSION_PROFILE]
 
 
 # Password validation
@@ -116,7 +244,149 @@ USE_TZ = True
 
 STATIC_URL = 'static/'
 
+# collectstatic target, served by core.middleware.StaticFilesMiddleware when DEBUG is off
+STATIC_ROOT = BASE_DIR / 'staticfiles'
+
+STORAGES = {
+    'default': {
+        'BACKEND': 'django.core.files.storage.FileSystemStorage',
+    },
+    # Content-hashed names plus .gz/.br copies (see core/storage.py)
+    'staticfiles': {
+        'BACKEND': 'core.storage.CompressedManifestStaticFilesStorage',
+    },
+}
+
+# Serve STATIC_ROOT from Django; turn off when a web server in front serves it
+STATIC_SERVE = True
+
+# Cache-Control max-age of static files requested by their unhashed name
+STATIC_MAX_AGE = 60
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
+
+
+# Permissions
+
+# Seconds a merged role permission map stays cached, with a shared cache only
+# (see users/permissions.py)
+PERMISSIONS_CACHE_TIMEOUT = 300
+
+
+# Pagination (see core/pagination.py)
+
+# Use keyset (cursor) pagination in the list views instead of page offsets
+KEYSET_PAGINATION = False
+
+# Seconds a list total (COUNT(*)) stays cached
+PAGINATION_COUNT_TIMEOUT = 60
+
+# Seconds a rendered list table stays cached; writes invalidate it earlier (see core/generations.py)
+LIST_CACHE_TIMEOUT = 300
+
+
+# JSON API (see core/api.py)
+
+# Default and maximum records per page of a list endpoint
+API_PAGE_SIZE = 100
+API_MAX_PAGE_SIZE = 1000
+
+# Maximum records per batch create/update request
+API_BATCH_LIMIT = 2000
+
+
+# Background imports (see core/jobs.py)
+
+# Directory where uploaded CSV files wait for a worker
+IMPORT_SPOOL_DIR = BASE_DIR / 'var' / 'imports'
+
+# Worker threads processing import jobs in each server process
+IMPORT_WORKERS = 2
+
+# Rows validated and inserted per transaction
+IMPORT_BATCH_SIZE = 1000
+
+# Run imports inside the request instead of a worker thread (tests, debugging)
+IMPORT_JOBS_EAGER = False
+
+# Approximate bytes of CSV parsed and validated at a time
+IMPORT_CHUNK_BYTES = 4 * 1024 * 1024
+
+# Worker processes parsing chunks of large files in parallel (1 disables the pool)
+IMPORT_PARSE_PROCESSES = 2
+
+# Smaller files are parsed inline; starting the pool costs about a second
+IMPORT_PARALLEL_MIN_BYTES = 32 * 1024 * 1024
+
+# Pending or running jobs silent this long were lost with their process;
+# fail_stale_jobs marks them failed (a batch always reports within this)
+IMPORT_JOB_STALE_MINUTES = 30
+
+
+# Soft delete (see core.models.SoftDeleteModel)
+
+# Days a deleted record can be restored before `manage.py purge_deleted` removes it
+SOFT_DELETE_RETENTION_DAYS = 30
+
+# Rows removed per transaction by purge_deleted
+PURGE_BATCH_SIZE = 500
+
+
+# Change history (see core/audit.py)
+
+# Records buffered in memory; beyond that, writers wait for the background writer
+AUDIT_QUEUE_SIZE = 10000
+
+# Seconds a writer waits for room before spilling to AUDIT_FALLBACK_FILE (writer thread stuck)
+AUDIT_PUT_TIMEOUT = 10.0
+
+# Records written per INSERT by the background writer
+AUDIT_BATCH_SIZE = 500
+
+# Seconds a partial batch waits for more records
+AUDIT_FLUSH_INTERVAL = 1.0
+
+# JSON lines file holding records that couldn't be buffered or written; load it with replay_audit_log
+AUDIT_FALLBACK_FILE = BASE_DIR / 'var' / 'audit' / 'fallback.jsonl'
+
+# Write records in the thread that made the change, once it commits (tests, debugging)
+AUDIT_EAGER = False
+
+
+# Lookup values (see core/lookups.py)
+
+# Seconds between checks of the cached lookups version; renames show up in other processes after at most this long
+LOOKUP_CHECK_INTERVAL = 1.0
+
+
+# Search box typeahead (see core/autocomplete.py)
+
+# Suggestions returned per request
+AUTOCOMPLETE_LIMIT = 10
+
+# Rows kept in memory per model; larger tables are searched through their trigram index
+AUTOCOMPLETE_MAX_ROWS = 200000
+
+# Characters of each value indexed
+AUTOCOMPLETE_TERM_LENGTH = 40
+
+# Seconds between checks for writes made by other processes
+AUTOCOMPLETE_CHECK_INTERVAL = 5.0
+
+
+# Instrumentation (see core/instrumentation.py)
+
+# Record per-view query count, SQL/template time and response size
+INSTRUMENTATION_ENABLED = False
+
+# Also return the timings to the client in a Server-Timing header
+INSTRUMENTATION_SERVER_TIMING = False
+
+# Recent requests kept per view for the percentiles
+INSTRUMENTATION_SAMPLE_SIZE = 1000
+
+# Log a warning when a request repeats this many identical queries
+INSTRUMENTATION_DUPLICATE_THRESHOLD = 5
@@ -0,0 +1,37 @@
+from django.views.decorators.http import require_GET, require_http_methods
+
+from core.api import ApiResource, api_view
+from core.routers import use_replica
+from .forms import MaterialForm
+from .models import Material
+from .views import apply_filters
+
+
+class MaterialResource(ApiResource):
+    model = Material
+    form_class = MaterialForm
+    unique_field = 'id_material'
+    module = 'materials'
+
+    def filter(self, queryset, params):
+        return apply_filters(queryset, params)
+
+
+resource = MaterialResource()
+
+
+@require_GET
+@api_view('materials')
+@use_replica
+def materials_api(request):
+    # GET ?fields=&after=&limit= plus the list filters
+    return resource.list(request)
+
+
+@require_http_methods(['POST', 'PATCH'])
+@api_view('materials')
+def materials_api_batch(request):
+    # POST creates, PATCH updates by id_material
+    if request.method == 'PATCH':
+        return resource.update(request)
+    return resource.create(request)
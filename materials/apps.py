@@ -4,3 +4,17 @@ from django.apps import AppConfig
 class MaterialsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'materials'
+
+    def ready(self):
+        from core.audit import track_changes
+        from core.autocomplete import track_autocomplete
+        from core.counters import track_counts
+        from core.generations import track_generation
+        from core.jobs import register_importer
+        from .models import Material
+        register_importer('materials', 'materials.importers.MaterialImporter')
+        track_counts(Material, ['status', 'material_type'])
+        track_generation(Material)
+        track_changes(Material)
+        track_autocomplete(Material, ['id_material', 'name'], module='materials',
+                           list_url='materials:materials', edit_url='materials:material_edit')
@@ -1,6 +1,20 @@
 from django import forms
+from core.models import ImportJob
 from .models import Material
+
 class MaterialForm(forms.ModelForm):
     class Meta:
         model = Material
-        fields = ['id_material', 'name', 'description', 'unit', 'material_type', 'status']
\ No newline at end of file
+        fields = ['id_material', 'name', 'description', 'unit', 'material_type', 'status']
+
+class CsvUploadForm(forms.Form):
+    csv_file = forms.FileField(
+        label='Materials CSV File',
+        help_text='The file content headers that match the model fields.'
+    )
+    mode = forms.ChoiceField(
+        label='Mode',
+        choices=ImportJob.MODE_CHOICES,
+        initial=ImportJob.MODE_INSERT,
+        help_text='Update existing materials matched by Material ID instead of reporting them as duplicates.'
+    )
@@ -0,0 +1,9 @@
+from core.importers import CsvImporter
+from .forms import MaterialForm
+from .models import Material
+
+
+class MaterialImporter(CsvImporter):
+    model = Material
+    form_class = MaterialForm
+    unique_field = 'id_material'
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:03
+
+from django.conf import settings
+from django.db import migrations, models
+
+from core.search import create_search_index, drop_search_index
+
+SEARCH_TABLE = 'materials_material'
+SEARCH_FIELDS = ('id_material', 'name', 'material_type')
+
+
+def forwards(apps, schema_editor):
+    create_search_index(schema_editor, SEARCH_TABLE, SEARCH_FIELDS)
+
+
+def backwards(apps, schema_editor):
+    drop_search_index(schema_editor, SEARCH_TABLE, SEARCH_FIELDS)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('materials', '0002_alter_material_id_material'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='material',
+            index=models.Index(fields=['status', 'material_type'], name='material_status_type_idx'),
+        ),
+        migrations.RunPython(forwards, backwards),
+    ]
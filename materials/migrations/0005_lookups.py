@@ -0,0 +1,91 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:50
+
+from django.db import migrations, models
+
+import core.lookups
+from core.lookups import ids_to_names, names_to_ids, recount
+from core.search import create_search_index, drop_search_index
+
+SEARCH_TABLE = 'materials_material'
+# material_type is now an integer: it's filtered by equality, not searched
+OLD_SEARCH_FIELDS = ('id_material', 'name', 'material_type')
+SEARCH_FIELDS = ('id_material', 'name')
+LOOKUPS = {'unit': 'unit', 'material_type': 'material_type', 'status': 'status'}
+COUNTED = ['status', 'material_type']
+
+
+def forwards(apps, schema_editor):
+    names_to_ids(apps, 'materials.Material', LOOKUPS)
+
+
+def backwards(apps, schema_editor):
+    ids_to_names(apps, 'materials.Material', LOOKUPS)
+
+
+def finish(apps, schema_editor):
+    # SQLite changes the column types by remaking the table, which drops the FTS triggers
+    if schema_editor.connection.vendor == 'sqlite':
+        drop_search_index(schema_editor, SEARCH_TABLE, OLD_SEARCH_FIELDS)
+        create_search_index(schema_editor, SEARCH_TABLE, SEARCH_FIELDS)
+    recount(apps, 'materials.Material', COUNTED)
+
+
+def finish_backwards(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        drop_search_index(schema_editor, SEARCH_TABLE, SEARCH_FIELDS)
+        create_search_index(schema_editor, SEARCH_TABLE, OLD_SEARCH_FIELDS)
+    elif schema_editor.connection.vendor == 'postgresql':
+        create_search_index(schema_editor, SEARCH_TABLE, OLD_SEARCH_FIELDS)
+    recount(apps, 'materials.Material', COUNTED)
+
+
+def drop_type_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        drop_search_index(schema_editor, SEARCH_TABLE, ['material_type'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('materials', '0004_soft_delete'),
+        ('core', '0005_lookups'),
+    ]
+
+    operations = [
+        # Reversing remakes the table again; this restores the index and counters afterwards
+        migrations.RunPython(migrations.RunPython.noop, finish_backwards),
+        migrations.RunPython(drop_type_search_index, migrations.RunPython.noop),
+        # Blank names become NULL
+        migrations.AlterField(
+            model_name='material',
+            name='material_type',
+            field=models.CharField(max_length=50, null=True, verbose_name='Material type'),
+        ),
+        migrations.AlterField(
+            model_name='material',
+            name='status',
+            field=models.CharField(max_length=50, null=True, verbose_name='Status'),
+        ),
+        migrations.AlterField(
+            model_name='material',
+            name='unit',
+            field=models.CharField(max_length=50, null=True, verbose_name='Unit measure'),
+        ),
+        migrations.RunPython(forwards, backwards),
+        migrations.AlterField(
+            model_name='material',
+            name='material_type',
+            field=core.lookups.LookupField(kind='material_type', null=True, verbose_name='Material type'),
+        ),
+        migrations.AlterField(
+            model_name='material',
+            name='status',
+            field=core.lookups.LookupField(kind='status', null=True, verbose_name='Status'),
+        ),
+        migrations.AlterField(
+            model_name='material',
+            name='unit',
+            field=core.lookups.LookupField(kind='unit', null=True, verbose_name='Unit measure'),
+        ),
+        migrations.RunPython(finish, migrations.RunPython.noop),
+    ]
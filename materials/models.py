@@ -1,13 +1,19 @@
 from django.db import models
 from django.conf import settings
 
-class Material(models.Model):
+from core.lookups import LookupField
+from core.models import Lookup, SoftDeleteModel
+
+class Material(SoftDeleteModel):
+    # Columns covered by the trigram search index (see core/search.py)
+    SEARCH_FIELDS = ('id_material', 'name')
+
     id_material = models.CharField(max_length=50, null=True, unique=True, verbose_name="Material ID")
     name = models.CharField(max_length=100, verbose_name="Name")
     description = models.TextField(max_length=250, blank=True, verbose_name="Description")
-    unit = models.CharField(max_length=50, verbose_name="Unit measure")
-    material_type = models.CharField(max_length=50, verbose_name="Material type")
-    status = models.CharField(max_length=50, verbose_name="Status")
+    unit = LookupField(Lookup.KIND_UNIT, null=True, verbose_name="Unit measure")
+    material_type = LookupField(Lookup.KIND_MATERIAL_TYPE, null=True, verbose_name="Material type")
+    status = LookupField(Lookup.KIND_STATUS, null=True, verbose_name="Status")
 
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
@@ -16,6 +22,12 @@ class Material(models.Model):
     class Meta:
         verbose_name = "Material"
         verbose_name_plural = "Materials"
+        indexes = [
+            models.Index(fields=['status', 'material_type'], name='material_status_type_idx'),
+            # Live rows in list order, and deleted rows in purge order
+            models.Index(fields=['id'], condition=models.Q(is_deleted=False), name='material_live_idx'),
+            models.Index(fields=['deleted_at'], condition=models.Q(is_deleted=True), name='material_deleted_idx'),
+        ]
     
     def __str__(self):
         return self.name
\ No newline at end of file
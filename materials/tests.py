@@ -1,3 +1,283 @@
-from django.test import TestCase
+import io
+from datetime import timedelta
 
-# Create your tests here.
+from django.contrib.messages import constants
+from django.contrib.messages.storage.base import Message
+from django.contrib.messages.storage.cookie import CookieStorage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.test import RequestFactory, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from core.counters import summary
+from core.models import ImportJob
+from core.testing import MATERIALS, BenchmarkTestCase, seed_materials, seed_user
+from .forms import MaterialForm
+from .models import Material
+
+
+class MaterialsListBenchmarkTests(BenchmarkTestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = seed_user('materials-bench', materials=2)
+        seed_materials(MATERIALS, cls.user)
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_login(self.user)
+        self.url = reverse('materials:materials')
+
+    def test_list_first_page(self):
+        with self.benchmark('materials_list', max_queries=8, max_seconds=1):
+            response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.context['page_obj']), 10)
+
+    def test_list_deep_page(self):
+        last_page = MATERIALS // 10
+        with self.benchmark('materials_list_deep_page', max_queries=8, max_seconds=1):
+            response = self.client.get(self.url, {'page': last_page})
+        self.assertEqual(response.context['page_obj'].number, last_page)
+
+    def test_list_keyset_page(self):
+        with self.benchmark('materials_list_keyset', max_queries=8, max_seconds=1):
+            response = self.client.get(self.url, {'after': MATERIALS // 2})
+        self.assertTrue(response.context['page_obj'].is_keyset)
+
+    def test_list_filtered(self):
+        params = {'name': 'Material 1', 'material_type': 'Raw', 'status': 'Active'}
+        with self.benchmark('materials_list_filtered', max_queries=8, max_seconds=1):
+            response = self.client.get(self.url, params)
+        for material in response.context['page_obj']:
+            self.assertIn('Material 1', material.name)
+            self.assertEqual(material.get_material_type_display(), 'Raw')
+
+    def test_list_cached(self):
+        self.client.get(self.url, {'page': 3})
+        with self.benchmark('materials_list_cached', max_queries=4, max_seconds=1):
+            response = self.client.get(self.url, {'page': 3})
+        self.assertContains(response, 'MAT-0000020')
+
+    def test_conditional_get(self):
+        response = self.client.get(self.url, {'status': 'Active'})
+        self.assertTrue(response.has_header('ETag'))
+        self.assertTrue(response.has_header('Last-Modified'))
+        with self.benchmark('materials_list_not_modified', max_queries=4, max_seconds=1):
+            response = self.client.get(self.url, {'status': 'Active'}, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+
+    def test_write_invalidates_cached_list(self):
+        first = self.client.get(self.url)
+        material = Material.objects.get(id_material='MAT-0000001')
+        material.name = 'Renamed material'
+        material.save()
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Renamed material')
+
+    def test_table_fragment(self):
+        page = self.client.get(self.url, {'page': 2})
+        with self.benchmark('materials_list_fragment', max_queries=8, max_seconds=1):
+            fragment = self.client.get(self.url, {'page': 2}, headers={'X-Fragment': '1'})
+        self.assertContains(fragment, 'MAT-0000011')
+        self.assertNotContains(fragment, 'transaction-input')
+        self.assertLess(len(fragment.content), len(page.content))
+        self.assertNotEqual(fragment['ETag'], page['ETag'])
+        self.assertIn('X-Fragment', fragment['Vary'])
+
+        # The query flag works too and stays out of the pagination links
+        flagged = self.client.get(self.url, {'page': 2, 'fragment': '1'})
+        self.assertEqual(flagged.content, fragment.content)
+        self.assertNotContains(flagged, 'fragment=')
+
+    async def test_csv_export_asgi(self):
+        await self.async_client.aforce_login(self.user)
+        response = await self.async_client.get(self.url, {'export': 'csv', 'status': 'Inactive'})
+        self.assertTrue(response.is_async)
+        content = b''.join([chunk async for chunk in response.streaming_content])
+        self.assertEqual(content.count(b'\n'), MATERIALS // 5 + 1)
+
+    def test_csv_export(self):
+        with self.benchmark('materials_export_csv', max_queries=6, max_seconds=5 + MATERIALS / 20000):
+            response = self.client.get(self.url, {'export': 'csv'})
+            content = b''.join(response.streaming_content)
+        # Header plus one line per material
+        self.assertEqual(content.count(b'\n'), MATERIALS + 1)
+
+
+@override_settings(IMPORT_JOBS_EAGER=True)
+class MaterialBulkUploadTests(BenchmarkTestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = seed_user('materials-upload', materials=2)
+        seed_materials(5, cls.user)
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_login(self.user)
+
+    def test_template_lists_the_import_columns(self):
+        response = self.client.get(reverse('materials:download_template_materials'))
+        self.assertEqual(response.content.decode(), 'id_material,name,description,unit,material_type,status\r\n')
+
+    def test_upload_runs_a_job_reported_to_its_owner_only(self):
+        rows = [
+            'id_material,name,description,unit,material_type,status',
+            'UP-1,Copper wire,,kg,Raw,Active',
+            'UP-2,Steel sheet,,kg,Finished,Active',
+            'UP-3,Bad status,,kg,Raw,Retired',
+            'MAT-0000001,Duplicate,,kg,Raw,Active',
+        ]
+        upload = SimpleUploadedFile('materials.csv', ('\n'.join(rows) + '\n').encode('utf-8'))
+        with self.benchmark('material_bulk_create', max_queries=60, max_seconds=5):
+            response = self.client.post(reverse('materials:material_bulk_create'), {'csv_file': upload, 'mode': 'insert'})
+        job = ImportJob.objects.get()
+        status_url = reverse('materials:material_bulk_status', args=[job.pk])
+        self.assertRedirects(response, status_url)
+
+        # What the upload page polls
+        polled = self.client.get(reverse('import_job_status', args=[job.pk])).json()
+        self.assertEqual((polled['finished'], polled['processed_rows'], polled['created_count']), (True, 4, 2))
+        self.assertEqual([record['row'] for record in polled['error_records']], [4, 5])
+
+        response = self.client.get(status_url)
+        self.assertTrue(response.context['report_generated'])
+        self.assertEqual((response.context['successful_count'], response.context['error_count']), (2, 2))
+        self.assertEqual(Material.objects.filter(id_material__in=['UP-1', 'UP-2']).count(), 2)
+
+        self.client.force_login(seed_user('materials-other', materials=2))
+        self.assertEqual(self.client.get(status_url).status_code, 404)
+        self.assertEqual(self.client.get(reverse('import_job_status', args=[job.pk])).status_code, 404)
+
+    def test_read_only_user_cannot_upload(self):
+        self.client.force_login(seed_user('materials-upload-reader', materials=1))
+        upload = SimpleUploadedFile('materials.csv', b'id_material,name,description,unit,material_type,status\n')
+        response = self.client.post(reverse('materials:material_bulk_create'), {'csv_file': upload, 'mode': 'insert'})
+        self.assertRedirects(response, reverse('materials:materials'), fetch_redirect_response=False)
+        self.assertFalse(ImportJob.objects.exists())
+
+
+class MaterialsApiTests(BenchmarkTestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = seed_user('materials-api', materials=2)
+        seed_materials(MATERIALS, cls.user)
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_login(self.user)
+        self.url = reverse('materials:materials_api')
+
+    def test_list_sparse_fields(self):
+        params = {'fields': 'id_material,status', 'material_type': 'Raw', 'limit': 50}
+        with self.benchmark('materials_api_list', max_queries=6, max_seconds=1):
+            response = self.client.get(self.url, params)
+        data = response.json()
+        self.assertEqual(len(data['results']), 50)
+        self.assertEqual(set(data['results'][0]), {'id_material', 'status'})
+
+        # Follow the cursor to the next page
+        response = self.client.get(data['next'])
+        self.assertNotIn(data['results'][-1], response.json()['results'])
+        self.assertIn('after=', data['next'])
+
+    def test_unknown_field(self):
+        response = self.client.get(self.url, {'fields': 'id_material,price'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_requires_login(self):
+        self.client.logout()
+        self.assertEqual(self.client.get(self.url).status_code, 401)
+
+
+class MaterialSoftDeleteTests(BenchmarkTestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = seed_user('materials-delete', materials=2)
+        seed_materials(20, cls.user)
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_login(self.user)
+        self.material = Material.objects.get(id_material='MAT-0000001')
+
+    def active_count(self):
+        return dict(summary()['materials.material']['status'])['Active']
+
+    def test_delete_is_an_update_and_can_be_undone(self):
+        active = self.active_count()
+        with self.benchmark('material_soft_delete', max_queries=15, max_seconds=1):
+            self.client.post(reverse('materials:material_delete', args=[self.material.pk]))
+        response = self.client.get(reverse('materials:materials'))
+        self.assertContains(response, reverse('materials:material_restore', args=[self.material.pk]))
+        self.assertContains(response, 'Undo')
+        self.assertNotContains(response, 'MAT-0000001<')
+        self.assertFalse(Material.objects.filter(pk=self.material.pk).exists())
+        self.assertTrue(Material.all_objects.get(pk=self.material.pk).is_deleted)
+        self.assertEqual(self.active_count(), active - 1)
+
+        self.client.post(reverse('materials:material_restore', args=[self.material.pk]))
+        self.assertTrue(Material.objects.filter(pk=self.material.pk).exists())
+        self.assertEqual(self.active_count(), active)
+
+    def test_read_only_user_cannot_delete(self):
+        for username, level in (('materials-reader', 1), ('materials-outsider', 0)):
+            self.client.force_login(seed_user(username, materials=level))
+            self.client.post(reverse('materials:material_delete', args=[self.material.pk]))
+            self.assertTrue(Material.objects.filter(pk=self.material.pk).exists())
+
+    def test_messages_show_once_without_a_stray_undo(self):
+        url = reverse('materials:materials')
+        etag = self.client.get(url)['ETag']
+        # A message with CSS tags, left by a view that wrote nothing
+        storage = CookieStorage(RequestFactory().get('/'))
+        self.client.cookies['messages'] = storage._encode([Message(constants.SUCCESS, 'Saved.', extra_tags='highlight')])
+
+        response = self.client.get(url, headers={'if-none-match': etag})
+        self.assertContains(response, 'Saved.')
+        self.assertNotContains(response, 'Undo')
+        self.assertEqual(self.client.get(url, headers={'if-none-match': etag}).status_code, 304)
+
+    def test_deleted_record_keeps_its_id(self):
+        self.material.soft_delete()
+        form = MaterialForm({
+            'id_material': 'MAT-0000001', 'name': 'Again', 'unit': 'kg', 'material_type': 'Raw', 'status': 'Active',
+        })
+        self.assertFalse(form.is_valid())
+        self.assertIn('restore it instead', form.errors['id_material'][0])
+
+    def test_purge_removes_only_expired_rows(self):
+        Material.objects.filter(material_type='Raw').soft_delete()
+        expired = Material.all_objects.filter(is_deleted=True).order_by('pk')[:3]
+        Material.all_objects.filter(pk__in=list(expired.values_list('pk', flat=True))).update(
+            deleted_at=timezone.now() - timedelta(days=31),
+        )
+        deleted = Material.all_objects.filter(is_deleted=True).count()
+        active = self.active_count()
+
+        call_command('purge_deleted', '--batch-size', '2', '--pause', '0', stdout=io.StringIO())
+        self.assertEqual(Material.all_objects.filter(is_deleted=True).count(), deleted - 3)
+        self.assertEqual(self.active_count(), active)
+
+    def test_purge_keeps_rows_restored_meanwhile(self):
+        Material.all_objects.filter(pk=self.material.pk).soft_delete()
+        Material.all_objects.filter(pk=self.material.pk).update(deleted_at=timezone.now() - timedelta(days=31))
+        restored = []
+
+        def restore_after_select(execute, sql, params, many, context):
+            result = execute(sql, params, many, context)
+            # A user restores the row between the purge's SELECT and its DELETE
+            if not restored and sql.startswith('SELECT') and 'deleted_at' in sql:
+                restored.append(True)
+                Material.all_objects.filter(pk=self.material.pk).update(is_deleted=False, deleted_at=None)
+            return result
+
+        with connection.execute_wrapper(restore_after_select):
+            call_command('purge_deleted', 'materials.Material', '--pause', '0', stdout=io.StringIO())
+        self.assertTrue(Material.objects.filter(pk=self.material.pk).exists())
@@ -1,5 +1,5 @@
 from django.urls import path
-from . import views
+from . import api, views
 
 
 app_name = 'materials'
@@ -9,4 +9,10 @@ urlpatterns = [
     path('create/', views.materials_create, name='materials_create'),
     path('<int:pk>/edit/', views.material_edit, name='material_edit'),
     path('<int:pk>/delete/', views.material_delete, name='material_delete'),
+    path('<int:pk>/restore/', views.material_restore, name='material_restore'),
+    path('bulk_create/', views.material_bulk_create, name='material_bulk_create'),
+    path('bulk_create/<uuid:pk>/', views.material_bulk_status, name='material_bulk_status'),
+    path('bulk/template/', views.download_template_materials, name='download_template_materials'),
+    path('api/', api.materials_api, name='materials_api'),
+    path('api/batch/', api.materials_api_batch, name='materials_api_batch'),
 ]
\ No newline at end of file
@@ -1,76 +1,65 @@
+from asgiref.sync import sync_to_async
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
-from django.core.paginator import Paginator
-from django.http import HttpResponse
-import csv
+from django.contrib import messages
 from users import models
-from django.db.models import Max
-from .forms import MaterialForm
-from users.models import UserRole
+from django.http import Http404, HttpResponse
+from django.urls import reverse
+from django.views.decorators.http import require_POST
+import csv
+from .forms import MaterialForm, CsvUploadForm
+from users.permissions import aget_module_permission, get_module_permission
+from core.jobs import create_job
+from core.listing import ModuleListView, offer_undo
+from core.lookups import filter_lookups
+from core.models import ImportJob
+from core.search import search
 from .models import Material
 
-@login_required
-def materials_list(request):
-    # Obtener el rol del usuario
-    max_permission = UserRole.objects.filter(user_id=request.user).aggregate(max_permission=Max('role__materials'))['max_permission'] or 0
-
-    # Redirigir si no tiene permisos
-    if max_permission == 0:
-        return redirect('dashboard')
-
-    # Obtener lista de materiales
-    materials_list = Material.objects.all()
-
-    # Filtros por parámetros GET
-    id_material = request.GET.get('id_material')
-    name = request.GET.get('name')
-    material_type = request.GET.get('material_type')
-    status = request.GET.get('status')
-
-    if id_material:
-        materials_list = materials_list.filter(id_material__icontains=id_material)
-    if name:
-        materials_list = materials_list.filter(name__icontains=name)
-    if material_type:
-        materials_list = materials_list.filter(material_type__icontains=material_type)
-    if status is not None and status != '':
-        materials_list = materials_list.filter(status=status)
-
-    if request.GET.get('export') == 'csv':
-        # Exportar a CSV
-        response = HttpResponse(content_type='text/csv')
-        response['Content-Disposition'] = 'attachment; filename="materials.csv"'
-
-        response.write('\ufeff'.encode('utf8'))
-        writer = csv.writer(response)
-        writer.writerow(['ID Material', 'Name', 'Description','Unit', 'Type',  'Status', 'Created By', 'Created At', 'Updated At'])
-
-        for material in materials_list:
-            writer.writerow([
-                material.id_material,
-                material.name,
-                material.description,
-                material.unit,
-                material.material_type,
-                material.status,
-                material.created_by.username if material.created_by else 'N/A',
-                material.created_at.strftime('%Y-%m-%d %H:%M:%S'),
-                material.updated_at.strftime('%Y-%m-%d %H:%M:%S') ,
-            ])
-        return response
-    
-    # Paginación
-    paginator = Paginator(materials_list, 10)  # 10 materiales por página
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+EXPORT_COLUMNS = [
+    ('ID Material', 'id_material'),
+    ('Name', 'name'),
+    ('Description', 'description'),
+    ('Unit', 'unit'),
+    ('Type', 'material_type'),
+    ('Status', 'status'),
+    ('Created By', 'created_by__username', 'N/A'),
+    ('Created At', 'created_at'),
+    ('Updated At', 'updated_at'),
+]
+
+def apply_filters(queryset, params):
+    # Filters shared by the list view and the JSON API
+    id_material = params.get('id_material')
+    name = params.get('name')
+
+    queryset = search(queryset, {
+        'id_material': id_material,
+        'name': name,
+    })
+    # Type and status are lookups: integer equality, by id or name
+    return filter_lookups(queryset, params, ['material_type', 'status'])
+
+class MaterialList(ModuleListView):
+    model = Material
+    module = 'materials'
+    template_name = 'materials/materials_list.html'
+    fragment_template_name = 'materials/materials_table.html'
+    # Columns shown by the table; the export reads EXPORT_COLUMNS
+    table_fields = ['id_material', 'name', 'description', 'unit', 'material_type', 'status']
+    export_columns = EXPORT_COLUMNS
+    export_filename = 'materials.csv'
+
+    def filter(self, queryset, params):
+        return apply_filters(queryset, params)
+
+materials_list = MaterialList.as_view()
 
-    return render(request, 'materials/materials_list.html', {'page_obj': page_obj})
-    
 @login_required
 def material_edit(request, pk):
     material = get_object_or_404(Material, pk=pk)
     
-    max_permission = UserRole.objects.filter(user_id=request.user).aggregate(max_permission=Max('role__materials'))['max_permission'] or 0
+    max_permission = get_module_permission(request, 'materials')
 
     if max_permission == 1:
         return redirect('materials')
@@ -94,22 +83,36 @@ def material_edit(request, pk):
     
 @login_required
 def material_delete(request, pk):
-    max_permission = UserRole.objects.filter(user_id=request.user).aggregate(max_permission=Max('role__materials'))['max_permission'] or 0
+    max_permission = get_module_permission(request, 'materials')
 
-    if max_permission > 2:
+    if max_permission < 2:
         return redirect('materials:materials')
     material = get_object_or_404(Material, pk=pk)
     if request.method == 'POST':
-        material.delete()
+        # Flag the row as deleted; manage.py purge_deleted removes it later
+        material.soft_delete()
+        # The list page shows the message with an Undo button
+        offer_undo(request, f'Material "{material}" deleted.', reverse('materials:material_restore', args=[material.pk]))
         return redirect('materials:materials')
     return redirect('materials:materials')
 
-   
-    
+
+@login_required
+@require_POST
+def material_restore(request, pk):
+    max_permission = get_module_permission(request, 'materials')
+
+    if max_permission < 2:
+        return redirect('materials:materials')
+    material = get_object_or_404(Material.all_objects, pk=pk, is_deleted=True)
+    material.restore()
+    messages.success(request, f'Material "{material}" restored.')
+    return redirect('materials:materials')
+
 
 @login_required
 def materials_create(request):
-    max_permission = UserRole.objects.filter(user_id=request.user).aggregate(max_permission=Max('role__materials'))['max_permission'] or 0
+    max_permission = get_module_permission(request, 'materials')
 
     if max_permission == 1:
         return redirect('materials')
@@ -127,4 +130,63 @@ def materials_create(request):
             return redirect('materials:materials')
     else:
         form = MaterialForm()
-    return render(request, 'materials/materials_form.html', {'form': form})
\ No newline at end of file
+    return render(request, 'materials/materials_form.html', {'form': form})
+
+
+def _spool_upload(request):
+    # Parsing the multipart body and copying the file to the spool touch the disk
+    form = CsvUploadForm(request.POST, request.FILES)
+    if not form.is_valid():
+        return form, None
+    job = create_job('materials', request.FILES['csv_file'], request.user, form.cleaned_data['mode'])
+    return form, job
+
+
+@login_required
+async def material_bulk_create(request):
+    max_permission = await aget_module_permission(request, 'materials')
+
+    if max_permission < 2:
+        return redirect('materials:materials')
+
+    if request.method == 'POST':
+        # Spool the file and hand it to a background worker
+        form, job = await sync_to_async(_spool_upload)(request)
+        if job is not None:
+            return redirect('materials:material_bulk_status', pk=job.pk)
+    else:
+        form = CsvUploadForm()
+    return await sync_to_async(render)(request, 'materials/materials_bulk_upload.html', {'form': form})
+
+
+@login_required
+async def material_bulk_status(request, pk):
+    request.user = user = await request.auser()
+    try:
+        job = await ImportJob.objects.aget(pk=pk, kind='materials', created_by=user)
+    except ImportJob.DoesNotExist:
+        raise Http404
+
+    context = {
+        'job': job,
+        'successful_count': job.created_count,
+        'updated_count': job.updated_count,
+        'unchanged_count': job.unchanged_count,
+        'error_count': job.error_count,
+        'total_rows': job.processed_rows,
+        'error_records': job.error_records,
+        'report_generated': job.is_finished,
+    }
+    return await sync_to_async(render)(request, 'materials/materials_bulk_upload.html', context)
+
+
+@login_required
+def download_template_materials(request):
+    header_fields = ['id_material', 'name', 'description', 'unit', 'material_type', 'status']
+    response = HttpResponse(content_type='text/csv')
+    response['Content-Disposition'] = 'attachment; filename="material_template.csv"'
+
+    writer = csv.writer(response)
+    writer.writerow(header_fields)
+
+    return response
@@ -0,0 +1,37 @@
+from django.views.decorators.http import require_GET, require_http_methods
+
+from core.api import ApiResource, api_view
+from core.routers import use_replica
+from .forms import SupplierForm
+from .models import Suppliers
+from .views import apply_filters
+
+
+class SupplierResource(ApiResource):
+    model = Suppliers
+    form_class = SupplierForm
+    unique_field = 'id_supplier'
+    module = 'suppliers'
+
+    def filter(self, queryset, params):
+        return apply_filters(queryset, params)
+
+
+resource = SupplierResource()
+
+
+@require_GET
+@api_view('suppliers')
+@use_replica
+def suppliers_api(request):
+    # GET ?fields=&after=&limit= plus the list filters
+    return resource.list(request)
+
+
+@require_http_methods(['POST', 'PATCH'])
+@api_view('suppliers')
+def suppliers_api_batch(request):
+    # POST creates, PATCH updates by id_supplier
+    if request.method == 'PATCH':
+        return resource.update(request)
+    return resource.create(request)
@@ -4,3 +4,17 @@ from django.apps import AppConfig
 class SuppliersConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'suppliers'
+
+    def ready(self):
+        from core.audit import track_changes
+        from core.autocomplete import track_autocomplete
+        from core.counters import track_counts
+        from core.generations import track_generation
+        from core.jobs import register_importer
+        from .models import Suppliers
+        register_importer('suppliers', 'suppliers.importers.SupplierImporter')
+        track_counts(Suppliers, ['status', 'country', 'category'])
+        track_generation(Suppliers)
+        track_changes(Suppliers)
+        track_autocomplete(Suppliers, ['id_supplier', 'name', 'tax_id'], module='suppliers',
+                           list_url='suppliers:suppliers_list', edit_url='suppliers:supplier_edit')
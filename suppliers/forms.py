@@ -1,4 +1,5 @@
 from django import forms
+from core.models import ImportJob
 from .models import Suppliers
 
 
@@ -30,4 +31,10 @@ class CsvUploadForm(forms.Form):
     csv_file = forms.FileField(
         label='Suppliers CSV File',
         help_text='The file content headers that matcj=h the model fields.'
+    )
+    mode = forms.ChoiceField(
+        label='Mode',
+        choices=ImportJob.MODE_CHOICES,
+        initial=ImportJob.MODE_INSERT,
+        help_text='Update existing suppliers matched by Supplier ID instead of reporting them as duplicates.'
     )
\ No newline at end of file
@@ -0,0 +1,9 @@
+from core.importers import CsvImporter
+from .forms import SupplierForm
+from .models import Suppliers
+
+
+class SupplierImporter(CsvImporter):
+    model = Suppliers
+    form_class = SupplierForm
+    unique_field = 'id_supplier'
@@ -0,0 +1,38 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:03
+
+from django.conf import settings
+from django.db import migrations, models
+
+from core.search import create_search_index, drop_search_index
+
+SEARCH_TABLE = 'suppliers_suppliers'
+SEARCH_FIELDS = ('id_supplier', 'name', 'country')
+
+
+def forwards(apps, schema_editor):
+    create_search_index(schema_editor, SEARCH_TABLE, SEARCH_FIELDS)
+
+
+def backwards(apps, schema_editor):
+    drop_search_index(schema_editor, SEARCH_TABLE, SEARCH_FIELDS)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('suppliers', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='suppliers',
+            name='id_supplier',
+            field=models.CharField(max_length=50, unique=True, verbose_name='Supplier ID'),
+        ),
+        migrations.AddIndex(
+            model_name='suppliers',
+            index=models.Index(fields=['status', 'country'], name='supplier_status_country_idx'),
+        ),
+        migrations.RunPython(forwards, backwards),
+    ]
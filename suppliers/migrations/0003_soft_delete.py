@@ -0,0 +1,48 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:34
+
+from django.conf import settings
+from django.db import migrations, models
+
+from core.search import create_search_index, drop_search_index
+
+SEARCH_TABLE = 'suppliers_suppliers'
+SEARCH_FIELDS = ('id_supplier', 'name', 'country')
+
+
+def recreate_search_index(apps, schema_editor):
+    # SQLite adds the NOT NULL column by remaking the table, which drops the FTS triggers
+    if schema_editor.connection.vendor == 'sqlite':
+        drop_search_index(schema_editor, SEARCH_TABLE, SEARCH_FIELDS)
+        create_search_index(schema_editor, SEARCH_TABLE, SEARCH_FIELDS)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('suppliers', '0002_search_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        # Reversing remakes the table again; the first operation restores the triggers afterwards
+        migrations.RunPython(migrations.RunPython.noop, recreate_search_index),
+        migrations.AddField(
+            model_name='suppliers',
+            name='deleted_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True, verbose_name='Deleted at'),
+        ),
+        migrations.AddField(
+            model_name='suppliers',
+            name='is_deleted',
+            field=models.BooleanField(default=False, editable=False, verbose_name='Deleted'),
+        ),
+        migrations.AddIndex(
+            model_name='suppliers',
+            index=models.Index(condition=models.Q(('is_deleted', False)), fields=['id'], name='supplier_live_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='suppliers',
+            index=models.Index(condition=models.Q(('is_deleted', True)), fields=['deleted_at'], name='supplier_deleted_idx'),
+        ),
+        migrations.RunPython(recreate_search_index, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,84 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:50
+
+from django.db import migrations, models
+
+import core.lookups
+from core.lookups import ids_to_names, names_to_ids, recount
+from core.search import create_search_index, drop_search_index
+
+SEARCH_TABLE = 'suppliers_suppliers'
+SEARCH_FIELDS = ('id_supplier', 'name', 'country')
+LOOKUPS = {
+    'category': 'category',
+    'payment_terms': 'payment_terms',
+    'currency': 'currency',
+    'payment_method': 'payment_method',
+    'status': 'status',
+}
+COUNTED = ['status', 'category']
+
+
+def forwards(apps, schema_editor):
+    names_to_ids(apps, 'suppliers.Suppliers', LOOKUPS)
+
+
+def backwards(apps, schema_editor):
+    ids_to_names(apps, 'suppliers.Suppliers', LOOKUPS)
+
+
+def finish(apps, schema_editor):
+    # SQLite changes the column types by remaking the table, which drops the FTS triggers
+    if schema_editor.connection.vendor == 'sqlite':
+        drop_search_index(schema_editor, SEARCH_TABLE, SEARCH_FIELDS)
+        create_search_index(schema_editor, SEARCH_TABLE, SEARCH_FIELDS)
+    recount(apps, 'suppliers.Suppliers', COUNTED)
+
+
+def text_field(max_length, verbose_name):
+    return models.CharField(max_length=max_length, null=True, verbose_name=verbose_name)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('suppliers', '0003_soft_delete'),
+        ('core', '0005_lookups'),
+    ]
+
+    operations = [
+        # Reversing remakes the table again; this restores the triggers and counters afterwards
+        migrations.RunPython(migrations.RunPython.noop, finish),
+        # Blank names become NULL
+        migrations.AlterField(model_name='suppliers', name='category', field=text_field(150, 'Category')),
+        migrations.AlterField(model_name='suppliers', name='payment_terms', field=text_field(150, 'Payment Terms')),
+        migrations.AlterField(model_name='suppliers', name='currency', field=text_field(150, 'Currency')),
+        migrations.AlterField(model_name='suppliers', name='payment_method', field=text_field(150, 'Payment Method')),
+        migrations.AlterField(model_name='suppliers', name='status', field=text_field(50, 'Status')),
+        migrations.RunPython(forwards, backwards),
+        migrations.AlterField(
+            model_name='suppliers',
+            name='category',
+            field=core.lookups.LookupField(kind='category', null=True, verbose_name='Category'),
+        ),
+        migrations.AlterField(
+            model_name='suppliers',
+            name='currency',
+            field=core.lookups.LookupField(kind='currency', null=True, verbose_name='Currency'),
+        ),
+        migrations.AlterField(
+            model_name='suppliers',
+            name='payment_method',
+            field=core.lookups.LookupField(kind='payment_method', null=True, verbose_name='Payment Method'),
+        ),
+        migrations.AlterField(
+            model_name='suppliers',
+            name='payment_terms',
+            field=core.lookups.LookupField(kind='payment_terms', null=True, verbose_name='Payment Terms'),
+        ),
+        migrations.AlterField(
+            model_name='suppliers',
+            name='status',
+            field=core.lookups.LookupField(kind='status', null=True, verbose_name='Status'),
+        ),
+        migrations.RunPython(finish, migrations.RunPython.noop),
+    ]
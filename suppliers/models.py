@@ -1,7 +1,13 @@
 from django.db import models
 from django.conf import settings
 
-class Suppliers(models.Model):
+from core.lookups import LookupField
+from core.models import Lookup, SoftDeleteModel
+
+class Suppliers(SoftDeleteModel):
+    # Columns covered by the trigram search index (see core/search.py)
+    SEARCH_FIELDS = ('id_supplier', 'name', 'country')
+
     id_supplier = models.CharField(max_length=50, unique=True, verbose_name="Supplier ID")
     legal_name = models.CharField(max_length=150, verbose_name="Legal Name")
     name = models.CharField(max_length=100, verbose_name="Name")
@@ -15,12 +21,12 @@ class Suppliers(models.Model):
     email = models.EmailField(max_length=50, verbose_name="Email")
     contact_name = models.CharField(max_length=150, verbose_name="Contact Name")
     contact_role = models.CharField(max_length=150, verbose_name="Contact Role")
-    category = models.CharField(max_length=150, verbose_name="Category")
-    payment_terms = models.CharField(max_length=150, verbose_name="Payment Terms")
-    currency = models.CharField(max_length=150, verbose_name="Currency")
-    payment_method= models.CharField(max_length=150, verbose_name="Payment Method")
+    category = LookupField(Lookup.KIND_CATEGORY, null=True, verbose_name="Category")
+    payment_terms = LookupField(Lookup.KIND_PAYMENT_TERMS, null=True, verbose_name="Payment Terms")
+    currency = LookupField(Lookup.KIND_CURRENCY, null=True, verbose_name="Currency")
+    payment_method = LookupField(Lookup.KIND_PAYMENT_METHOD, null=True, verbose_name="Payment Method")
     bank_account = models.CharField(max_length=150, verbose_name="Bank Account")
-    status = models.CharField(max_length=50, verbose_name="Status")
+    status = LookupField(Lookup.KIND_STATUS, null=True, verbose_name="Status")
 
 
     created_at = models.DateTimeField(auto_now_add=True)
@@ -30,6 +36,12 @@ class Suppliers(models.Model):
     class Meta:
         verbose_name = "Supplier"
         verbose_name_plural = "Supliers"
+        indexes = [
+            models.Index(fields=['status', 'country'], name='supplier_status_country_idx'),
+            # Live rows in list order, and deleted rows in purge order
+            models.Index(fields=['id'], condition=models.Q(is_deleted=False), name='supplier_live_idx'),
+            models.Index(fields=['deleted_at'], condition=models.Q(is_deleted=True), name='supplier_deleted_idx'),
+        ]
     
     def __str__(self):
         return self.name
\ No newline at end of file
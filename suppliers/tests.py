@@ -1,3 +1,187 @@
-from django.test import TestCase
+import json
+from unittest import mock
 
-# Create your tests here.
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import IntegrityError
+from django.db.models import QuerySet
+from django.test import override_settings
+from django.urls import reverse
+
+from core.models import ImportJob
+from core.testing import (
+    COUNTRIES, SUPPLIER_HEADERS, SUPPLIERS, BenchmarkTestCase, seed_suppliers, seed_user, supplier_csv, supplier_row,
+)
+from .models import Suppliers
+
+
+class SuppliersBenchmarkTests(BenchmarkTestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = seed_user('suppliers-bench', suppliers=2)
+        seed_suppliers(SUPPLIERS, cls.user)
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_login(self.user)
+        self.url = reverse('suppliers:suppliers_list')
+
+    def test_list_first_page(self):
+        with self.benchmark('suppliers_list', max_queries=8, max_seconds=1):
+            response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.context['page_obj']), 10)
+        # Only the columns of the table are read
+        supplier = response.context['page_obj'][0]
+        self.assertIn('bank_account', supplier.get_deferred_fields())
+        self.assertNotIn('country', supplier.get_deferred_fields())
+
+    def test_list_filtered(self):
+        params = {'country': 'Chile', 'status': 'Active', 'page': 2}
+        with self.benchmark('suppliers_list_filtered', max_queries=8, max_seconds=1):
+            response = self.client.get(self.url, params)
+        for supplier in response.context['page_obj']:
+            self.assertEqual(supplier.country, 'Chile')
+
+    def test_csv_export(self):
+        with self.benchmark('suppliers_export_csv', max_queries=7, max_seconds=5 + SUPPLIERS / 10000):
+            response = self.client.get(self.url, {'export': 'csv'})
+            content = b''.join(response.streaming_content)
+        self.assertEqual(content.count(b'\n'), SUPPLIERS + 1)
+
+    @override_settings(IMPORT_JOBS_EAGER=True, IMPORT_BATCH_SIZE=500)
+    def test_bulk_create(self):
+        rows = SUPPLIERS
+        upload = SimpleUploadedFile('suppliers.csv', supplier_csv(rows))
+        batches = -(-rows // 500)
+        # A few queries per batch, plus the INSERTs SQLite needs to stay under its 999-parameter limit
+        inserts_per_batch = -(-500 // (999 // 21))
+        # and one KPI counter UPDATE per distinct status, country and category value
+        counter_keys = 2 + len(COUNTRIES) + 1
+        with self.benchmark('supplier_bulk_create', max_queries=20 + (6 + inserts_per_batch + counter_keys) * batches, max_seconds=5 + rows / 2000):
+            response = self.client.post(reverse('suppliers:supplier_bulk_create'), {'csv_file': upload, 'mode': 'insert'})
+        job = ImportJob.objects.get()
+        self.assertRedirects(response, reverse('suppliers:supplier_bulk_status', args=[job.pk]))
+        self.assertEqual(job.status, ImportJob.STATUS_DONE)
+        self.assertEqual(job.created_count, rows)
+        self.assertEqual(Suppliers.objects.count(), SUPPLIERS + rows)
+
+    @override_settings(
+        IMPORT_JOBS_EAGER=True, IMPORT_PARSE_PROCESSES=2, IMPORT_PARALLEL_MIN_BYTES=0, IMPORT_CHUNK_BYTES=16 * 1024,
+    )
+    def test_bulk_create_parallel(self):
+        content = supplier_csv(1000, 'PAR').decode('utf-8').splitlines()
+        content[100] = content[100].replace('@example.com', '')  # invalid email on row 101
+        content[900] = content[900].replace('Supplier 899', '"Supplier\n899"')  # quoted newline
+        content.append(content[1])  # duplicate of row 2, reported as row 1002
+        upload = SimpleUploadedFile('suppliers.csv', ('\n'.join(content) + '\n').encode('latin-1'))
+        self.client.post(reverse('suppliers:supplier_bulk_create'), {'csv_file': upload, 'mode': 'insert'})
+
+        job = ImportJob.objects.get()
+        self.assertEqual(job.status, ImportJob.STATUS_DONE)
+        self.assertEqual(job.created_count, 999)
+        self.assertEqual([record['row'] for record in job.error_records], [101, 1002])
+        self.assertEqual(Suppliers.objects.get(id_supplier='PAR-0000899').name, 'Supplier\n899')
+
+
+@override_settings(IMPORT_JOBS_EAGER=True)
+class SupplierUpsertTests(BenchmarkTestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = seed_user('suppliers-upsert', suppliers=2)
+        seed_suppliers(10, cls.user)
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_login(self.user)
+
+    def upload(self):
+        # Rows 0-2 renamed, 3-9 as stored (3 soft-deleted meanwhile), 10-11 new
+        rows = [supplier_row(i) for i in range(12)]
+        for row in rows[:3]:
+            row['name'] += ' renamed'
+        lines = [','.join(SUPPLIER_HEADERS)] + [','.join(str(row[header]) for header in SUPPLIER_HEADERS) for row in rows]
+        upload = SimpleUploadedFile('suppliers.csv', ('\n'.join(lines) + '\n').encode('utf-8'))
+        self.client.post(reverse('suppliers:supplier_bulk_create'), {'csv_file': upload, 'mode': 'upsert'})
+        return ImportJob.objects.get()
+
+    def test_counts_created_updated_and_unchanged_rows(self):
+        Suppliers.objects.get(id_supplier='SUP-0000003').soft_delete()
+        job = self.upload()
+        self.assertEqual(job.status, ImportJob.STATUS_DONE)
+        # The soft-deleted record is restored, not created again
+        self.assertEqual((job.created_count, job.updated_count, job.unchanged_count), (2, 4, 6))
+        self.assertEqual(job.error_records, [])
+        self.assertEqual(Suppliers.objects.get(id_supplier='SUP-0000001').name, 'Supplier 1 renamed')
+        self.assertTrue(Suppliers.objects.filter(id_supplier='SUP-0000003').exists())
+        self.assertEqual(Suppliers.all_objects.count(), 12)
+
+    def test_rows_are_updated_one_by_one_when_the_batch_fails(self):
+        bulk_create = QuerySet.bulk_create
+
+        def failing_upsert(queryset, objs, *args, **kwargs):
+            if kwargs.get('update_conflicts'):
+                raise IntegrityError('simulated constraint violation')
+            return bulk_create(queryset, objs, *args, **kwargs)
+
+        update = QuerySet.update
+
+        def failing_update(queryset, **kwargs):
+            # Row 3 of the file (SUP-0000001) still fails on its own
+            if kwargs.get('name') == 'Supplier 1 renamed':
+                raise IntegrityError('simulated constraint violation')
+            return update(queryset, **kwargs)
+
+        with mock.patch.object(QuerySet, 'bulk_create', failing_upsert), mock.patch.object(QuerySet, 'update', failing_update):
+            job = self.upload()
+        self.assertEqual((job.created_count, job.updated_count, job.unchanged_count), (2, 2, 7))
+        self.assertEqual([record['row'] for record in job.error_records], [3])
+        self.assertEqual(
+            list(Suppliers.objects.filter(name__endswith='renamed').order_by('id_supplier').values_list('id_supplier', flat=True)),
+            ['SUP-0000000', 'SUP-0000002'],
+        )
+
+
+class SuppliersApiTests(BenchmarkTestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = seed_user('suppliers-api', suppliers=2)
+        seed_suppliers(SUPPLIERS, cls.user)
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_login(self.user)
+        self.url = reverse('suppliers:suppliers_api_batch')
+
+    def send(self, method, records):
+        return getattr(self.client, method)(
+            self.url, json.dumps({'records': records}), content_type='application/json',
+        )
+
+    def test_batch_create(self):
+        records = [supplier_row(i, 'API') for i in range(1000)]
+        records.append(supplier_row(1, 'SUP'))  # already exists
+        with self.benchmark('suppliers_api_batch_create', max_queries=45, max_seconds=3):
+            response = self.send('post', records)
+        self.assertEqual(response.status_code, 201)
+        data = response.json()
+        self.assertEqual(data['created'], 1000)
+        self.assertEqual([error['index'] for error in data['errors']], [1000])
+        self.assertEqual(Suppliers.objects.filter(id_supplier__startswith='API-').count(), 1000)
+
+    def test_batch_update(self):
+        records = [{'id_supplier': supplier_row(i)['id_supplier'], 'country': 'Brazil'} for i in range(500)]
+        records.append({'id_supplier': 'MISSING', 'country': 'Brazil'})
+        records.append({'id_supplier': supplier_row(1)['id_supplier'], 'email': 'not-an-email'})
+        with self.benchmark('suppliers_api_batch_update', max_queries=40, max_seconds=3):
+            response = self.send('patch', records)
+        data = response.json()
+        self.assertEqual(data['updated'], 500 - data['unchanged'])
+        self.assertEqual([error['index'] for error in data['errors']], [500, 501])
+        self.assertEqual(Suppliers.objects.filter(country='Brazil').count(), 500)
+
+    def test_read_only_user_cannot_write(self):
+        self.client.force_login(seed_user('suppliers-reader', suppliers=1))
+        self.assertEqual(self.send('post', [supplier_row(0, 'RO')]).status_code, 403)
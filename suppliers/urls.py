@@ -1,5 +1,5 @@
 from django.urls import path
-from . import views
+from . import api, views
 
 
 app_name = 'suppliers'
@@ -9,7 +9,11 @@ urlpatterns = [
     path('create/', views.suppliers_create, name='suppliers_create'),
     path('<int:pk>/edit/', views.supplier_edit, name='supplier_edit'),
     path('<int:pk>/delete/', views.supplier_delete, name='supplier_delete'),
+    path('<int:pk>/restore/', views.supplier_restore, name='supplier_restore'),
     path('bulk_create/', views.supplier_bulk_create, name='supplier_bulk_create'),
+    path('bulk_create/<uuid:pk>/', views.supplier_bulk_status, name='supplier_bulk_status'),
     path('bulk/template/', views.download_template_suppliers, name='download_template_suppliers'),
+    path('api/', api.suppliers_api, name='suppliers_api'),
+    path('api/batch/', api.suppliers_api_batch, name='suppliers_api_batch'),
     
 ]
\ No newline at end of file
@@ -1,95 +1,80 @@
+from asgiref.sync import sync_to_async
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
-from django.core.paginator import Paginator
-from django.http import HttpResponse
+from django.http import Http404, HttpResponse
+from django.urls import reverse
+from django.views.decorators.http import require_POST
 import csv
-import re
-import io
 from users import models
-from django.db.models import Max
 from .forms import SupplierForm, CsvUploadForm
-from users.models import UserRole
+from users.permissions import aget_module_permission, get_module_permission
+from core.jobs import create_job
+from core.listing import ModuleListView, offer_undo
+from core.lookups import filter_lookups
+from core.models import ImportJob
+from core.search import search
 from .models import Suppliers
 from django.contrib import messages
 
-@login_required
-def suppliers_list(request):
-    # Obtener el rol del usuario
-    max_permission = UserRole.objects.filter(user_id=request.user).aggregate(max_permission=Max('role__suppliers'))['max_permission'] or 0
-
-    # Redirigir si no tiene permisos
-    if max_permission == 0:
-        return redirect('dashboard')
+EXPORT_COLUMNS = [
+    ('ID Supplier', 'id_supplier'),
+    ('legal_name', 'legal_name'),
+    ('Name', 'name'),
+    ('Tax ID', 'tax_id'),
+    ('Country', 'country'),
+    ('State/Province', 'state_province'),
+    ('City', 'city'),
+    ('Address', 'address'),
+    ('Zip Code', 'zip_code'),
+    ('Phone', 'phone'),
+    ('Email', 'email'),
+    ('Contact Name', 'contact_name'),
+    ('Contact Role', 'contact_role'),
+    ('Category', 'category'),
+    ('Payment Terms', 'payment_terms'),
+    ('Currency', 'currency'),
+    ('Payment Method', 'payment_method'),
+    ('Bank Account', 'bank_account'),
+    ('Status', 'status'),
+    ('Created By', 'created_by__username', 'N/A'),
+    ('Created At', 'created_at'),
+    ('Updated At', 'updated_at'),
+]
+
+def apply_filters(queryset, params):
+    # Filters shared by the list view and the JSON API
+    id_supplier = params.get('id_supplier')
+    name = params.get('name')
+    country = params.get('country')
+
+    queryset = search(queryset, {
+        'id_supplier': id_supplier,
+        'name': name,
+        'country': country,
+    })
+    # Status and category are lookups: integer equality, by id or name
+    return filter_lookups(queryset, params, ['status', 'category'])
+
+class SupplierList(ModuleListView):
+    model = Suppliers
+    module = 'suppliers'
+    template_name = 'suppliers/suppliers_list.html'
+    fragment_template_name = 'suppliers/suppliers_table.html'
+    # Columns shown by the table; the export reads EXPORT_COLUMNS
+    table_fields = ['id_supplier', 'name', 'country', 'category', 'status']
+    export_columns = EXPORT_COLUMNS
+    export_filename = 'Suppliers.csv'
+
+    def filter(self, queryset, params):
+        return apply_filters(queryset, params)
+
+suppliers_list = SupplierList.as_view()
 
-    # Obtener lista de Supplieres
-    suppliers_list = Suppliers.objects.all()
-
-    # Filtros por parámetros GET
-    id_supplier = request.GET.get('id_supplier')
-    name = request.GET.get('name')
-    country = request.GET.get('country')
-    status = request.GET.get('status')
-
-    if id_supplier:
-        suppliers_list = suppliers_list.filter(id_supplier__icontains=id_supplier)
-    if name:
-        suppliers_list = suppliers_list.filter(name__icontains=name)
-    if country:
-        suppliers_list = suppliers_list.filter(country__icontains=country)
-    if status is not None and status != '':
-        suppliers_list = suppliers_list.filter(status=status)
-
-    if request.GET.get('export') == 'csv':
-        # Exportar a CSV
-        response = HttpResponse(content_type='text/csv')
-        response['Content-Disposition'] = 'attachment; filename="Suppliers.csv"'
-
-        response.write('\ufeff'.encode('utf8'))
-        writer = csv.writer(response)
-        writer.writerow(['ID Supplier', 'legal_name','Name', 'Tax ID','Country', 'State/Province',  
-                         'City', 'Address', 'Zip Code', 'Phone', 'Email', 'Contact Name', 'Contact Role', 
-                         'Category', 'Payment Terms', 'Currency', 'Payment Method', 'Bank Account', 'Status',
-                         'Created By', 'Created At', 'Updated At'])
-
-        for Supplier in suppliers_list:
-            writer.writerow([
-                Supplier.id_supplier,
-                Supplier.legal_name,
-                Supplier.name,
-                Supplier.tax_id,
-                Supplier.country,
-                Supplier.state_province,
-                Supplier.city,
-                Supplier.address,
-                Supplier.zip_code,
-                Supplier.phone,
-                Supplier.email,
-                Supplier.contact_name,
-                Supplier.contact_role,
-                Supplier.category,
-                Supplier.payment_terms,
-                Supplier.currency,
-                Supplier.payment_method,
-                Supplier.bank_account,
-                Supplier.status,
-                Supplier.created_by.username if Supplier.created_by else 'N/A',
-                Supplier.created_at.strftime('%Y-%m-%d %H:%M:%S'),
-                Supplier.updated_at.strftime('%Y-%m-%d %H:%M:%S') ,
-            ])
-        return response
-    
-    # Paginación
-    paginator = Paginator(suppliers_list, 10)  # 10 Supplieres por página
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
-
-    return render(request, 'suppliers/suppliers_list.html', {'page_obj': page_obj})
-    
 @login_required
 def supplier_edit(request, pk):
     supplier = get_object_or_404(Suppliers, pk=pk)
     
-    max_permission = UserRole.objects.filter(user_id=request.user).aggregate(max_permission=Max('role__suppliers'))['max_permission'] or 0
+    max_permission = get_module_permission(request, 'suppliers')
 
     if max_permission == 1:
         return redirect('suppliers:suppliers_list')
@@ -113,21 +98,36 @@ def supplier_edit(request, pk):
     
 @login_required
 def supplier_delete(request, pk):
-    max_permission = UserRole.objects.filter(user_id=request.user).aggregate(max_permission=Max('role__suppliers'))['max_permission'] or 0
+    max_permission = get_module_permission(request, 'suppliers')
 
-    if max_permission > 2:
+    if max_permission < 2:
         return redirect('suppliers:suppliers_list')
     supplier = get_object_or_404(Suppliers, pk=pk)
     if request.method == 'POST':
-        supplier.delete()
+        # Flag the row as deleted; manage.py purge_deleted removes it later
+        supplier.soft_delete()
+        # The list page shows the message with an Undo button
+        offer_undo(request, f'Supplier "{supplier}" deleted.', reverse('suppliers:supplier_restore', args=[supplier.pk]))
         return redirect('suppliers:suppliers_list')
     return redirect('suppliers:suppliers_list')
-       
-    
+
+
+@login_required
+@require_POST
+def supplier_restore(request, pk):
+    max_permission = get_module_permission(request, 'suppliers')
+
+    if max_permission < 2:
+        return redirect('suppliers:suppliers_list')
+    supplier = get_object_or_404(Suppliers.all_objects, pk=pk, is_deleted=True)
+    supplier.restore()
+    messages.success(request, f'Supplier "{supplier}" restored.')
+    return redirect('suppliers:suppliers_list')
+
 
 @login_required
 def suppliers_create(request):
-    max_permission = UserRole.objects.filter(user_id=request.user).aggregate(max_permission=Max('role__suppliers'))['max_permission'] or 0
+    max_permission = get_module_permission(request, 'suppliers')
 
     if max_permission == 1:
         return redirect('suppliers:suppliers_list')
@@ -148,83 +148,51 @@ def suppliers_create(request):
     return render(request, 'suppliers/suppliers_form.html', {'form': form})
 
 
+def _spool_upload(request):
+    # Parsing the multipart body and copying the file to the spool touch the disk
+    form = CsvUploadForm(request.POST, request.FILES)
+    if not form.is_valid():
+        return form, None
+    job = create_job('suppliers', request.FILES['csv_file'], request.user, form.cleaned_data['mode'])
+    return form, job
+
+
 @login_required
-def supplier_bulk_create(request):
-    max_permission = UserRole.objects.filter(user_id=request.user).aggregate(max_permission=Max('role__suppliers'))['max_permission'] or 0
-    
+async def supplier_bulk_create(request):
+    max_permission = await aget_module_permission(request, 'suppliers')
+
     if max_permission < 2:
         return redirect('suppliers:suppliers_list')
-    
+
     if request.method == 'POST':
-        form = CsvUploadForm(request.POST,request.FILES)
-        
-        if form.is_valid():
-            csv_file = request.FILES['csv_file']
-
-            try:
-                data_set = csv_file.read().decode('UTF-8')
-            except UnicodeDecodeError:
-                try:
-                    csv_file.seek(0)
-                    data_set = csv_file.read().decode('ISO-8859-1')
-                except Exception as e:
-                    return render(request, 'suppliers/suppliers_bulk_upload.html', {'form': form})
-        
-            io_string = io.StringIO(data_set)
-            reader = csv.DictReader(io_string)
-
-            if reader.fieldnames:
-                if reader.fieldnames[0].startswith('\ufeff'):
-                    reader.fieldnames[0] = reader.fieldnames[0].lstrip('\ufeff')
-
-                cleaned_fieldnames = [key.strip().lower() for key in reader.fieldnames]
-                reader.fieldnames = cleaned_fieldnames
-
-            successful_records = []
-            error_records = []
-            suppliers_to_create = []
-
-            for i, row in enumerate(reader):
-                row_number = i + 2
-                form_data = {}
-
-                for key, value in row.items():
-                    cleaned_value = value.strip() if isinstance(value, str) else value 
-                    form_data[key] = cleaned_value
-
-                form = SupplierForm(form_data)
-
-                if form.is_valid():
-                    supplier = form.save(commit=False)
-                    supplier.created_by = request.user
-                    suppliers_to_create.append(supplier)
-                    successful_records.append({'row':row, 'data':form_data})
-                else:
-                    errors = {field:', '.join(err) for field, err in form.errors.items()}
-                    error_records.append({
-                        'row': row_number,
-                        'data': form_data,
-                        'errors': errors
-                    })
-
-            if suppliers_to_create:
-                Suppliers.objects.bulk_create(suppliers_to_create)
-            messages.success(request, f'Process finished. {len(successful_records)} suppliers created successfully')
-
-            context = {
-                'form': form,
-                'successful_count': len(successful_records),
-                'error_count': len(error_records),
-                'total_rows': len(successful_records) + len(error_records),
-                'error_records': error_records,
-                'successful_records': successful_records,
-                'report_generated': True
-            }
-            return render(request, 'suppliers/suppliers_bulk_upload.html', context)
-        return render(request, 'suppliers/suppliers_bulk_upload.html', {'form': form})
+        # Spool the file and hand it to a background worker
+        form, job = await sync_to_async(_spool_upload)(request)
+        if job is not None:
+            return redirect('suppliers:supplier_bulk_status', pk=job.pk)
     else:
         form = CsvUploadForm()
-        return render(request, 'suppliers/suppliers_bulk_upload.html', {'form': form})
+    return await sync_to_async(render)(request, 'suppliers/suppliers_bulk_upload.html', {'form': form})
+
+
+@login_required
+async def supplier_bulk_status(request, pk):
+    request.user = user = await request.auser()
+    try:
+        job = await ImportJob.objects.aget(pk=pk, kind='suppliers', created_by=user)
+    except ImportJob.DoesNotExist:
+        raise Http404
+
+    context = {
+        'job': job,
+        'successful_count': job.created_count,
+        'updated_count': job.updated_count,
+        'unchanged_count': job.unchanged_count,
+        'error_count': job.error_count,
+        'total_rows': job.processed_rows,
+        'error_records': job.error_records,
+        'report_generated': job.is_finished,
+    }
+    return await sync_to_async(render)(request, 'suppliers/suppliers_bulk_upload.html', context)
 
 
 @login_required
@@ -0,0 +1,49 @@
+"""
+Authentication backend that caches the logged-in user between requests.
+
+AuthenticationMiddleware loads request.user through the backend recorded in
+the session, and ModelBackend reads the User row on every request.
+CachedModelBackend keeps that row in the default cache for
+USER_CACHE_TIMEOUT seconds, so an authenticated request normally costs no
+user query. Saving or deleting a user drops its entry (see users.signals).
+Django still compares the session hash with the password hash of the cached
+user, so a password change ends the other sessions as before. The cache
+must be shared by the server processes, or the deletes wouldn't reach the
+others (see users.checks).
+"""
+
+from django.conf import settings
+from django.contrib.auth.backends import ModelBackend
+from django.core.cache import cache
+
+
+def _timeout():
+    return getattr(settings, 'USER_CACHE_TIMEOUT', 60)
+
+
+def _cache_key(user_pk):
+    return f'auth:user:{user_pk}'
+
+
+def invalidate_user(user_pk):
+    """Drop the cached user, so the next request reads the row again."""
+    cache.delete(_cache_key(user_pk))
+
+
+class CachedModelBackend(ModelBackend):
+
+    def get_user(self, user_id):
+        key = _cache_key(user_id)
+        user = cache.get(key)
+        if user is None:
+            user = super().get_user(user_id)
+            if user is not None:
+                cache.set(key, user, _timeout())
+        return user
+
+    async def aget_user(self, user_id):
+        user = await cache.aget(_cache_key(user_id))
+        if user is None:
+            # Runs get_user() in a thread, which fills the cache
+            user = await super().aget_user(user_id)
+        return user
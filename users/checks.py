@@ -0,0 +1,43 @@
+"""
+System checks for the caches that must agree across server processes.
+
+A cached session or user is deleted from the cache on logout or on save,
+but a LocMemCache only exists in the process that did it: every other
+process keeps serving its own copy until the timeout. The cached session
+engine and CachedModelBackend therefore need a cache shared by all the
+processes (CACHE_URL in the settings).
+"""
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.checks import Error, register
+
+CACHED_SESSION_ENGINE = 'django.contrib.sessions.backends.cached_db'
+CACHED_BACKEND = 'users.backends.CachedModelBackend'
+
+
+def cache_is_shared(alias='default'):
+    """Whether the other server processes see the writes to the cache."""
+    return not isinstance(caches[alias], LocMemCache)
+
+
+@register()
+def check_shared_cache(app_configs, **kwargs):
+    alias = getattr(settings, 'SESSION_CACHE_ALIAS', 'default')
+    errors = []
+    if settings.SESSION_ENGINE == CACHED_SESSION_ENGINE and not cache_is_shared(alias):
+        errors.append(Error(
+            "The cached_db session engine needs a shared cache: with LocMemCache a logout "
+            "doesn't end the session in the other server processes.",
+            hint="Set CACHE_URL, or SESSION_PROFILE=db.",
+            id='users.E001',
+        ))
+    if CACHED_BACKEND in settings.AUTHENTICATION_BACKENDS and not cache_is_shared():
+        errors.append(Error(
+            "CachedModelBackend needs a shared cache: with LocMemCache a deactivated user "
+            "stays logged in on the other server processes.",
+            hint="Set CACHE_URL, or use django.contrib.auth.backends.ModelBackend.",
+            id='users.E002',
+        ))
+    return errors
@@ -0,0 +1,119 @@
+"""
+Measure login throughput and the cost of the authenticated requests that follow.
+
+Every simulated user logs in through the login form, then requests --path
+--pages times with its new session, like the start-of-day rush of people
+signing in and opening the dashboard. Clients run in --concurrency threads
+against the in-process handler (no server or network), so the numbers show
+the CPU of password hashing and the database work per request.
+
+    python manage.py benchmark_logins --users 200 --concurrency 20
+    CACHE_URL=redis://localhost:6379/0 python manage.py benchmark_logins --users 200 --concurrency 20
+
+Missing users (login-bench-<n>) are created on the first run.
+"""
+
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections, connection, transaction
+from django.test import Client
+from django.urls import reverse
+
+from users.models import Role, User, UserRole
+
+HOST = 'localhost'
+PREFIX = 'login-bench-'
+PASSWORD = 'bench-password-123'
+
+
+def _percentile(values, fraction):
+    values = sorted(values)
+    return values[max(int(len(values) * fraction) - 1, 0)]
+
+
+class Command(BaseCommand):
+    help = "Benchmark concurrent logins followed by authenticated page requests."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=50, help="Users logging in.")
+        parser.add_argument('--concurrency', type=int, default=10, help="Users logging in at the same time.")
+        parser.add_argument('--path', default='/dashboard/', help="Page requested after logging in.")
+        parser.add_argument('--pages', type=int, default=5, help="Page requests per user after logging in.")
+
+    def create_users(self, usernames):
+        """Create the missing benchmark users, with a real (PBKDF2) password and read access."""
+        existing = set(User.objects.filter(username__in=usernames).values_list('username', flat=True))
+        missing = [username for username in usernames if username not in existing]
+        if not missing:
+            return
+        # One hash for all of them: the logins still pay the full hashing cost
+        password = make_password(PASSWORD)
+        with transaction.atomic():
+            role, _ = Role.objects.get_or_create(role_name=f'{PREFIX}role', defaults={'materials': 1, 'suppliers': 1})
+            users = User.objects.bulk_create([User(username=username, password=password) for username in missing])
+            UserRole.objects.bulk_create([UserRole(user_id=user, role=role) for user in users])
+
+    def handle(self, *args, **options):
+        if HOST not in settings.ALLOWED_HOSTS and not settings.DEBUG:
+            raise CommandError(f"Add {HOST!r} to ALLOWED_HOSTS to run the benchmark.")
+
+        usernames = [f'{PREFIX}{index}' for index in range(options['users'])]
+        self.create_users(usernames)
+
+        login_url = reverse('login')
+        lock = threading.Lock()
+        totals = {'queries': 0, 'errors': 0}
+
+        def count_queries(execute, sql, params, many, context):
+            with lock:
+                totals['queries'] += 1
+            return execute(sql, params, many, context)
+
+        def run_user(username):
+            client = Client(HTTP_HOST=HOST)
+            try:
+                with connection.execute_wrapper(count_queries):
+                    start = time.perf_counter()
+                    response = client.post(login_url, {'username': username, 'password': PASSWORD})
+                    login_seconds = time.perf_counter() - start
+                    if response.status_code != 302:
+                        with lock:
+                            totals['errors'] += 1
+                    pages = []
+                    for _ in range(options['pages']):
+                        start = time.perf_counter()
+                        response = client.get(options['path'])
+                        pages.append(time.perf_counter() - start)
+                        if response.status_code != 200:
+                            with lock:
+                                totals['errors'] += 1
+                return login_seconds, pages
+            finally:
+                close_old_connections()
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=options['concurrency']) as pool:
+            results = list(pool.map(run_user, usernames))
+        seconds = time.perf_counter() - start
+
+        logins = [login for login, _ in results]
+        pages = [page for _, user_pages in results for page in user_pages]
+        requests = len(logins) + len(pages)
+        self.stdout.write(f"session engine: {settings.SESSION_ENGINE}")
+        self.stdout.write(f"{'':<8}{'count':>8}{'per s':>10}{'p50 s':>10}{'p90 s':>10}")
+        self.stdout.write(
+            f"{'logins':<8}{len(logins):>8}{len(logins) / seconds:>10.1f}"
+            f"{statistics.median(logins):>10.3f}{_percentile(logins, 0.9):>10.3f}"
+        )
+        if pages:
+            self.stdout.write(
+                f"{'pages':<8}{len(pages):>8}{len(pages) / seconds:>10.1f}"
+                f"{statistics.median(pages):>10.3f}{_percentile(pages, 0.9):>10.3f}"
+            )
+        self.stdout.write(f"queries per request: {totals['queries'] / requests:.1f}, errors: {totals['errors']}")
@@ -0,0 +1,120 @@
+"""
+Permission resolution service.
+
+A user can hold several roles; the effective permission for each module is the
+highest level granted by any of them. This module resolves that merged map in a
+single query, memoizes it on the request and caches it across requests in the
+Django cache. Cached entries are invalidated by bumping a version number
+whenever a Role or UserRole is saved or deleted (see users.signals).
+
+The version only reaches the other server processes through a shared cache
+(CACHE_URL): with a per-process LocMemCache a revoked role would keep being
+granted elsewhere, so the cross-request cache is then not used.
+"""
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+
+from .checks import cache_is_shared
+from .models import Role
+
+# Modules with a permission column on Role
+MODULES = (
+    'customers',
+    'suppliers',
+    'materials',
+    'purchases',
+    'sales',
+    'inventory',
+    'accounting',
+    'reporting',
+)
+
+VERSION_KEY = 'permissions:version'
+REQUEST_ATTR = '_merged_permissions'
+
+
+def _timeout():
+    return getattr(settings, 'PERMISSIONS_CACHE_TIMEOUT', 300)
+
+
+def get_version():
+    """Return the current permissions cache version, creating it if needed."""
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        cache.add(VERSION_KEY, 1, None)
+        version = cache.get(VERSION_KEY, 1)
+    return version
+
+
+def bump_version():
+    """Invalidate every cached permission map."""
+    try:
+        cache.incr(VERSION_KEY)
+    except ValueError:
+        cache.set(VERSION_KEY, 2, None)
+
+
+def _cache_key(user_pk, version):
+    return f'permissions:{version}:{user_pk}'
+
+
+def resolve_permissions(user):
+    """
+    Compute the merged permissions of a user straight from the database.
+
+    Returns:
+        tuple: (permissions, roles) where permissions maps each module name
+        to the highest level granted and roles is the list of role names.
+    """
+    permissions = dict.fromkeys(MODULES, 0)
+    roles = []
+
+    rows = Role.objects.filter(userrole__user_id=user.pk).values('role_name', *MODULES)
+    for row in rows:
+        roles.append(row['role_name'])
+        for module in MODULES:
+            if row[module] > permissions[module]:
+                permissions[module] = row[module]
+
+    return permissions, roles
+
+
+def get_user_permissions(user):
+    """Return (permissions, roles) for a user, using the cross-request cache."""
+    if not user.is_authenticated:
+        return dict.fromkeys(MODULES, 0), []
+
+    if not cache_is_shared():
+        return resolve_permissions(user)
+
+    key = _cache_key(user.pk, get_version())
+    cached = cache.get(key)
+    if cached is None:
+        cached = resolve_permissions(user)
+        cache.set(key, cached, _timeout())
+    return cached
+
+
+def get_permissions(request):
+    """Return (permissions, roles) for the request user, computed once per request."""
+    merged = getattr(request, REQUEST_ATTR, None)
+    if merged is None:
+        merged = get_user_permissions(request.user)
+        setattr(request, REQUEST_ATTR, merged)
+    return merged
+
+
+def get_module_permission(request, module):
+    """Return the permission level (0-2) the request user has on a module."""
+    permissions, _ = get_permissions(request)
+    return permissions.get(module, 0)
+
+
+async def aget_module_permission(request, module):
+    """Async get_module_permission() for async views."""
+    # Reuse the user loaded by request.auser() (login_required) for request.user,
+    # which templates read, so it isn't fetched twice
+    request.user = await request.auser()
+    return await sync_to_async(get_module_permission)(request, module)
@@ -1,3 +1,69 @@
-from django.test import TestCase
+import tempfile
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.hashers import PBKDF2PasswordHasher
+from django.db import connection
+from django.test import SimpleTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from core.testing import PASSWORD, BenchmarkTestCase, seed_user
+from users.checks import CACHED_BACKEND, CACHED_SESSION_ENGINE, check_shared_cache
+from users.models import Role
+
+
+class LoginBenchmarkTests(BenchmarkTestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = seed_user('login-bench', materials=1)
+
+    def test_login(self):
+        with mock.patch.object(PBKDF2PasswordHasher, 'verify', autospec=True, side_effect=PBKDF2PasswordHasher.verify) as verify:
+            with self.benchmark('login', max_queries=9, max_seconds=3):
+                response = self.client.post(reverse('login'), {'username': 'login-bench', 'password': PASSWORD})
+        self.assertRedirects(response, reverse('dashboard'))
+        # One PBKDF2 run per login
+        self.assertEqual(verify.call_count, 1)
+
+    def test_authenticated_request_uses_cached_session_and_user(self):
+        self.use_shared_cache()
+        self.client.post(reverse('login'), {'username': 'login-bench', 'password': PASSWORD})
+        self.client.get(reverse('dashboard'))
+        with CaptureQueriesContext(connection) as context:
+            self.client.get(reverse('dashboard'))
+        tables = ' '.join(query['sql'] for query in context.captured_queries)
+        self.assertNotIn('django_session', tables)
+        self.assertNotIn('"users_user"."password"', tables)
+
+    def test_saving_the_user_refreshes_the_cache(self):
+        self.use_shared_cache()
+        self.client.post(reverse('login'), {'username': 'login-bench', 'password': PASSWORD})
+        self.user.first_name = 'Renamed'
+        self.user.save()
+        response = self.client.get(reverse('dashboard'))
+        self.assertEqual(response.wsgi_request.user.first_name, 'Renamed')
+
+    def test_revoked_role_applies_at_once_without_a_shared_cache(self):
+        # Another process revokes the role: its version bump can't reach this one's LocMemCache
+        self.client.post(reverse('login'), {'username': 'login-bench', 'password': PASSWORD})
+        self.assertEqual(self.client.get(reverse('dashboard')).context['permissions']['materials'], 1)
+        Role.objects.filter(role_name='login-bench-role').update(materials=0)
+        self.assertEqual(self.client.get(reverse('dashboard')).context['permissions']['materials'], 0)
+
+    def test_login_wrong_password(self):
+        response = self.client.post(reverse('login'), {'username': 'login-bench', 'password': 'wrong'})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('_auth_user_id', self.client.session)
+
+
+class SharedCacheCheckTests(SimpleTestCase):
+
+    def test_cached_sessions_and_users_need_a_shared_cache(self):
+        shared = {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': tempfile.gettempdir()}
+        with override_settings(
+            CACHES={'default': shared}, SESSION_ENGINE=CACHED_SESSION_ENGINE, AUTHENTICATION_BACKENDS=[CACHED_BACKEND],
+        ):
+            self.assertEqual(check_shared_cache(None), [])
+        with override_settings(SESSION_ENGINE=CACHED_SESSION_ENGINE, AUTHENTICATION_BACKENDS=[CACHED_BACKEND]):
+            self.assertEqual([error.id for error in check_shared_cache(None)], ['users.E001', 'users.E002'])